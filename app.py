@@ -3,20 +3,32 @@
 Customer Portal - Main Flask Application
 """
 
+import logging
 from flask import Flask, session, g, redirect, url_for, flash, request
 import os
 from datetime import timedelta
 from config import Config
 import socket
-import traceback
 from utils.helpers import get_client_info
+from utils.http_middleware import init_http_middleware
+from utils.metrics import init_request_metrics
+from utils.logging_setup import init_request_ids
+from utils.tracing import init_tracing
+from utils.scheduler import init_scheduler
+from utils.bulkhead import init_bulkheads
+from utils.shared_cache import init_shared_cache
+from utils.lifecycle import init_lifecycle
 import secrets
 import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 # === NEW IMPORTS ===
-from database.connection import close_db, DatabaseConnection
+from database.connection import close_db
 from database.erp_connection_base import close_erp_db, ERPConnection
 # === END NEW IMPORTS ===
 
+logger = logging.getLogger(__name__)
+
 def create_app():
     app = Flask(__name__)
 
@@ -43,11 +55,25 @@ def create_app():
             g=g
         )
 
+    # --- Request/template timing (registered first so it wraps every other hook) ---
+    init_request_metrics(app)
+
+    # --- Request ids (stamped on log records, echoed as X-Request-ID) ---
+    init_request_ids(app)
+
+    # --- Request tracing (after request ids: traces use the same id) ---
+    init_tracing(app)
+
     # --- Register Blueprints ---
     register_blueprints(app) # Pass app
 
-    # --- Initialize Database Connections (Test on startup) ---
-    # === MODIFICATION: Pass app object ===
+    # --- Response compression and ETag/304 handling ---
+    init_http_middleware(app)
+
+    # --- Bulkheads: bound the worker threads ERP-bound routes can occupy ---
+    init_bulkheads(app)
+
+    # --- Check both databases (concurrently) and apply pending schema migrations ---
     initialize_database_connections(app)
 
     # === NEW: Register teardown functions ===
@@ -56,6 +82,15 @@ def create_app():
     app.teardown_appcontext(close_erp_db)
     # === END NEW ===
 
+    # --- Shared settings and cross-process cache invalidation ---
+    init_shared_cache(app)
+
+    # --- Background jobs (inventory prewarm) ---
+    init_scheduler(app)
+
+    # --- Shutdown hooks (drain prefetches, flush snapshot writes, close pools) ---
+    init_lifecycle(app)
+
     @app.before_request
     def load_user_from_session():
         # === FIX: Skip this entire hook for static file requests ===
@@ -77,7 +112,7 @@ def create_app():
                 session_db.prune_inactive(Config.SESSION_HOURS)
                 # === END MODIFICATION ===
             except Exception as e:
-                print(f"⚠️ Error pruning stale sessions: {e}")
+                logger.warning(f"Error pruning stale sessions: {e}")
 
         # --- Admin session handling (unchanged) ---
         if 'admin' in session:
@@ -124,12 +159,12 @@ def create_app():
         pass
         # === END MODIFICATION ===
 
-    print("✅ Customer Portal application created.")
+    logger.info("Customer Portal application created.")
     return app
 
 def register_blueprints(app):
     """Register all application blueprints"""
-    print("⏳ Registering blueprints...")
+    logger.info("Registering blueprints...")
     try:
         from routes.main import main_bp
         from routes.inventory import inventory_bp
@@ -139,6 +174,9 @@ def register_blueprints(app):
         from routes.admin.sessions import admin_sessions_bp
         # === NEW IMPORT ===
         from routes.admin.analytics import admin_analytics_bp
+        from routes.admin.metrics import admin_metrics_bp
+        from routes.admin.slow_queries import admin_slow_queries_bp
+        from routes.admin.traces import admin_traces_bp
 
         app.register_blueprint(main_bp)
         app.register_blueprint(inventory_bp, url_prefix='/inventory')
@@ -149,66 +187,68 @@ def register_blueprints(app):
         app.register_blueprint(admin_sessions_bp, url_prefix='/admin')
         # === NEW REGISTRATION ===
         app.register_blueprint(admin_analytics_bp, url_prefix='/admin')
+        app.register_blueprint(admin_metrics_bp, url_prefix='/admin')
+        app.register_blueprint(admin_slow_queries_bp, url_prefix='/admin')
+        app.register_blueprint(admin_traces_bp, url_prefix='/admin')
 
-        print("✅ Blueprints registered.")
+        logger.info("Blueprints registered.")
     except ImportError as e:
-         print(f"❌ Error importing blueprints: {e}")
-         traceback.print_exc()
+         logger.error(f"Error importing blueprints: {e}", exc_info=True)
     except Exception as e:
-         print(f"❌ Unexpected error registering blueprints: {e}")
-         traceback.print_exc()
+         logger.error(f"Unexpected error registering blueprints: {e}", exc_info=True)
 
 
-# === MODIFICATION: Pass 'app' object ===
 def initialize_database_connections(app):
-    """Initialize and test database connections on startup"""
-    print("⏳ Initializing database connections...")
-    all_ok = True
+    """
+    Checks both databases at startup, concurrently (each connection probes
+    its ODBC drivers once; later connections reuse the working one), and
+    brings the local schema up to date (one query when nothing changed).
+    """
+    logger.info("Initializing database connections...")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='startup-check') as executor:
+        local_check = executor.submit(_check_local_db, app)
+        erp_check = executor.submit(_check_erp_db, app)
+        results = [local_check.result(), erp_check.result()]
+
+    if all(results):
+        logger.info(f"All database connections initialized successfully in {time.perf_counter() - started:.2f}s.")
+    else:
+        logger.warning("Errors occurred during database initialization. Check logs and config.")
+
 
-    # === MODIFICATION: Wrap database calls in app_context ===
+def _check_local_db(app):
     with app.app_context():
         try:
-            # === MODIFICATION: Test connection without creating singleton ===
-            local_db_test = DatabaseConnection()
-            if local_db_test.test_connection():
-                print("✅ Local DB (CustomerPortalDB): Connected")
-                # Trigger table creation checks by instantiating
-                from database import customer_db, audit_db, session_db, analytics_db
-                
-                # === FIX: Corrected method names ===
-                customer_db.ensure_tables() # Plural
-                audit_db.ensure_table()     # Singular
-                session_db.ensure_table()   # Singular
-                # analytics_db has no table, so it's skipped
-                # === END FIX ===
-                
-                print("✅ Local DB Tables (Customers, AuditLog, ActiveSessions) Checked/Created.")
-            else:
-                print("❌ Local DB (CustomerPortalDB): Connection FAILED")
-                all_ok = False
+            from database import get_db
+            from database.migrations import run_migrations
+            db = get_db()
+            if db.connection is None:
+                logger.error("Local DB (CustomerPortalDB): Connection FAILED")
+                return False
+            logger.info("Local DB (CustomerPortalDB): Connected")
+            run_migrations(db)
+            return True
         except Exception as e:
-            print(f"❌ Local DB (CustomerPortalDB): Initialization Error: {e}")
-            traceback.print_exc()
-            all_ok = False
+            logger.error(f"Local DB (CustomerPortalDB): Initialization Error: {e}", exc_info=True)
+            return False
+        finally:
+            close_db()
+
 
+def _check_erp_db(app):
+    with app.app_context():
         try:
-            # === MODIFICATION: Test connection without creating singleton ===
-            erp_db_test = ERPConnection()
-            if erp_db_test.test_connection():
-                print("✅ ERP DB (Read-Only): Connected")
-            else:
-                 print("❌ ERP DB (Read-Only): Connection FAILED during setup")
-                 all_ok = False
+            erp_db = ERPConnection()
+            if erp_db.connection is None:
+                logger.error("ERP DB (Read-Only): Connection FAILED during setup")
+                return False
+            erp_db.close()
+            logger.info("ERP DB (Read-Only): Connected")
+            return True
         except Exception as e:
-            print(f"❌ ERP DB (Read-Only): Initialization Error: {e}")
-            traceback.print_exc()
-            all_ok = False
-    # === END MODIFICATION ===
-
-    if all_ok:
-        print("✅ All database connections initialized successfully.")
-    else:
-        print("⚠️ Errors occurred during database initialization. Check logs and config.")
+            logger.error(f"ERP DB (Read-Only): Initialization Error: {e}", exc_info=True)
+            return False
 
 
 def get_local_ip():
@@ -235,6 +275,13 @@ if __name__ == '__main__':
     os.makedirs(os.path.join(project_root, 'templates', 'admin'), exist_ok=True)
     os.makedirs(os.path.join(project_root, 'templates', 'email'), exist_ok=True)
 
+    debug_mode = os.getenv('FLASK_ENV') == 'development' or os.getenv('DEBUG', 'False').lower() in ('true', '1', 't')
+    if not debug_mode:
+        # Production runs on Waitress (worker processes, drain on shutdown), not the development server
+        import serve
+        serve.main([])
+        exit(0)
+
     local_ip = get_local_ip()
 
     if not Config.validate():
@@ -256,13 +303,9 @@ if __name__ == '__main__':
     print(f"   Local:   http://localhost:5001")
     print(f"   Network: http://{local_ip}:5001")
     print("\n" + "="*50)
-    debug_mode = os.getenv('FLASK_ENV') == 'development' or os.getenv('DEBUG', 'False').lower() in ('true', '1', 't')
-    if debug_mode:
-        print("⚠️ RUNNING IN DEVELOPMENT (DEBUG) MODE ⚠️")
-        print("   Do not use this for production.")
-        print("   Server will auto-reload on code changes.")
-    else:
-        print("🚀 RUNNING IN PRODUCTION MODE")
+    print("⚠️ RUNNING IN DEVELOPMENT (DEBUG) MODE ⚠️")
+    print("   Do not use this for production (run serve.py).")
+    print("   Server will auto-reload on code changes.")
     print("="*50)
     print("\n   Press CTRL+C to stop the server.\n")
 
@@ -4,31 +4,38 @@ Active Directory (LDAP3) Authentication Module
 Handles AD admin authentication and authorization
 """
 
-from ldap3 import Server, Connection, ALL, SIMPLE, SUBTREE
-import ldap3.core.exceptions
+import logging
 from config import Config
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# ldap3 is imported inside the functions: it is slow to import and only AD admin logins use it
 
 def get_ad_user_info(username):
     """Get AD groups for a user using the service account"""
+    from ldap3 import Server, Connection, ALL, SIMPLE, SUBTREE
     try:
         server = Server(Config.AD_SERVER, port=Config.AD_PORT, get_info=ALL)
         service_user = f'{Config.AD_SERVICE_ACCOUNT}@{Config.AD_DOMAIN}'
 
-        service_conn = Connection(
-            server,
-            user=service_user,
-            password=Config.AD_SERVICE_PASSWORD,
-            authentication=SIMPLE,
-            auto_bind=True
-        )
+        with span('AD bind (service account)', 'ldap'):
+            service_conn = Connection(
+                server,
+                user=service_user,
+                password=Config.AD_SERVICE_PASSWORD,
+                authentication=SIMPLE,
+                auto_bind=True
+            )
 
         search_filter = f'(&(objectClass=user)(sAMAccountName={username}))'
-        service_conn.search(
-            Config.AD_BASE_DN,
-            search_filter,
-            SUBTREE,
-            attributes=['memberOf', 'displayName', 'mail']
-        )
+        with span('AD user search', 'ldap'):
+            service_conn.search(
+                Config.AD_BASE_DN,
+                search_filter,
+                SUBTREE,
+                attributes=['memberOf', 'displayName', 'mail']
+            )
 
         if service_conn.entries:
             user_entry = service_conn.entries[0]
@@ -54,7 +61,7 @@ def get_ad_user_info(username):
         return None
 
     except Exception as e:
-        print(f"❌ [AD Auth] Error getting user groups: {str(e)}")
+        logger.error(f"[AD Auth] Error getting user groups: {str(e)}")
         return None
 
 def check_ad_admin_auth(username, password):
@@ -65,7 +72,7 @@ def check_ad_admin_auth(username, password):
 
     # --- Test Mode for Development ---
     if Config.TEST_MODE:
-        print("⚠️  [AD Auth] TEST_MODE is enabled. Simulating AD admin login.")
+        logger.warning("[AD Auth] TEST_MODE is enabled. Simulating AD admin login.")
         if password == "password": # Use a simple password for test mode
             return {
                 'username': username,
@@ -78,21 +85,24 @@ def check_ad_admin_auth(username, password):
             return None
 
     # --- Real AD Authentication ---
+    from ldap3 import Server, Connection, ALL, SIMPLE
+    import ldap3.core.exceptions
     try:
         server = Server(Config.AD_SERVER, port=Config.AD_PORT, get_info=ALL)
         user_principal = f'{username}@{Config.AD_DOMAIN}'
 
         try:
             # --- 1. Attempt user authentication (bind) ---
-            user_conn = Connection(
-                server,
-                user=user_principal,
-                password=password,
-                authentication=SIMPLE,
-                auto_bind=True
-            )
+            with span('AD bind (user)', 'ldap'):
+                user_conn = Connection(
+                    server,
+                    user=user_principal,
+                    password=password,
+                    authentication=SIMPLE,
+                    auto_bind=True
+                )
             user_conn.unbind()
-            print(f"✅ [AD Auth] User bind successful: {username}")
+            logger.info(f"[AD Auth] User bind successful: {username}")
 
             # --- 2. Get user info and check group membership ---
             user_info = get_ad_user_info(username)
@@ -102,7 +112,7 @@ def check_ad_admin_auth(username, password):
                 is_portal_admin = Config.AD_PORTAL_ADMIN_GROUP in user_info['groups']
 
                 if is_portal_admin:
-                    print(f"✅ [AD Auth] User {username} found in admin group '{Config.AD_PORTAL_ADMIN_GROUP}'.")
+                    logger.info(f"[AD Auth] User {username} found in admin group '{Config.AD_PORTAL_ADMIN_GROUP}'.")
                     return {
                         'username': username,
                         'display_name': user_info['display_name'],
@@ -111,19 +121,19 @@ def check_ad_admin_auth(username, password):
                         'auth_method': 'ad'
                     }
                 else:
-                    print(f"⚠️  [AD Auth] User {username} authenticated but is not in the required admin group.")
+                    logger.warning(f"[AD Auth] User {username} authenticated but is not in the required admin group.")
                     return None
 
         except ldap3.core.exceptions.LDAPBindError:
-            print(f"ℹ️  [AD Auth] Invalid AD credentials for user: {username}")
+            logger.info(f"[AD Auth] Invalid AD credentials for user: {username}")
             return None # Failed AD auth, and wasn't local admin
         
         except Exception as e:
-            print(f"❌ [AD Auth] AD Authentication error: {str(e)}")
+            logger.error(f"[AD Auth] AD Authentication error: {str(e)}")
             return None
 
     except Exception as e:
-        print(f"❌ [AD Auth] AD Server connection error: {str(e)}")
+        logger.error(f"[AD Auth] AD Server connection error: {str(e)}")
         return None
 
     return None
\ No newline at end of file
@@ -4,6 +4,7 @@ Customer Portal Authentication Module
 Handles customer and admin login/authorization.
 """
 
+import logging
 from flask import session, redirect, url_for, flash, request, g
 from functools import wraps
 from werkzeug.security import check_password_hash
@@ -11,6 +12,8 @@ from database.customer_data import customer_db # Import the instance
 from config import Config
 from .ad_auth import check_ad_admin_auth
 
+logger = logging.getLogger(__name__)
+
 # --- Customer Authentication ---
 
 def authenticate_customer(email, password):
@@ -56,31 +59,31 @@ def authenticate_admin(username, password):
     # --- 1. Try Local Admin (from .env) ---
     if username == Config.ADMIN_USERNAME and Config.ADMIN_PASSWORD_HASH:
         if check_password_hash(Config.ADMIN_PASSWORD_HASH, password):
-            print(f"✅ [Admin Auth] Local admin logged in: {username}")
+            logger.info(f"[Admin Auth] Local admin logged in: {username}")
             return {'username': username, 'display_name': 'Local Admin', 'is_admin': True, 'auth_method': 'local'}
     
     # --- 2. Try Active Directory Admin ---
     # Only try AD if AD_SERVER is configured (to avoid errors)
     if Config.AD_SERVER:
-        print(f"ℹ️  [Admin Auth] Local auth failed for {username}. Trying Active Directory...")
+        logger.info(f"[Admin Auth] Local auth failed for {username}. Trying Active Directory...")
         
         ad_username = username.strip() # Start with the stripped, entered username
         
         if '@' in ad_username:
             original_username = ad_username
             ad_username = ad_username.split('@')[0]
-            print(f"ℹ️  [Admin Auth] Trimmed email input '{original_username}' to AD username: {ad_username}")
+            logger.info(f"[Admin Auth] Trimmed email input '{original_username}' to AD username: {ad_username}")
 
         ad_admin_info = check_ad_admin_auth(ad_username, password) 
         
         if ad_admin_info:
-            print(f"✅ [Admin Auth] AD admin logged in: {ad_username}")
+            logger.info(f"[Admin Auth] AD admin logged in: {ad_username}")
             return ad_admin_info # This dict already contains 'is_admin': True
         else:
-            print(f"ℹ️  [Admin Auth] AD login failed for: {ad_username}.")
+            logger.info(f"[Admin Auth] AD login failed for: {ad_username}.")
     
     # --- 3. If both fail ---
-    print(f"❌ [Admin Auth] All auth methods failed for: {username}")
+    logger.error(f"[Admin Auth] All auth methods failed for: {username}")
     return None
 
 def admin_required(f):
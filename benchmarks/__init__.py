@@ -0,0 +1,8 @@
+# customer_portal/benchmarks/__init__.py
+"""
+Offline benchmark harness for the Customer Portal.
+Runs the portal's hot paths against in-memory fakes of the local DB and
+the ERP, so performance can be measured without live SQL Server instances.
+
+Usage: python -m benchmarks.run_benchmarks --help
+"""
@@ -0,0 +1,452 @@
+# customer_portal/benchmarks/fakes.py
+"""
+In-memory stand-ins for the pyodbc connections behind DatabaseConnection
+(local DB) and ERPConnection. They answer the portal's queries with synthetic
+data shaped like the real tables, so routes can be driven through the Flask
+test client offline.
+"""
+
+import itertools
+import random
+import zlib
+from datetime import datetime, timedelta
+from database.connection import DatabaseConnection
+from database.erp_connection_base import ERPConnection
+
+# --- Synthetic data generation ---
+
+STATUSES = [
+    'Approved QC', 'Approved QC', 'Approved QC', 'Available', 'Pending QC',
+    'Quarantined', 'Issued to Job', 'Sales Reserved', 'Staged to Job', 'Failed QC',
+]
+UNITS = ['EA', 'CS', 'LB', 'KG', 'GAL', 'RL', 'PLT']
+
+
+def generate_inventory_rows(lots, customers=25, seed=42):
+    """
+    Generates synthetic inventory rows shaped like the output of the
+    dtfifo inventory query in ERPInventoryQueries.get_inventory_by_customer.
+    Args: lots: number of lot rows, customers: number of distinct ERP customers, seed: RNG seed
+    About one lot in ten is split over two bins (same Customer, Part and User_Lot).
+    Returns: list of dicts, sorted like the 'All' query (Customer, Part, User_Lot, BIN)
+    """
+    rng = random.Random(seed)
+    customer_names = [f"Customer {i:03d}" for i in range(customers)]
+    parts_per_customer = max(1, lots // (customers * 8))
+    bins = [f"{aisle}{rack:02d}-{level}" for aisle in 'ABCDEFGH' for rack in range(1, 21) for level in 'ABC']
+    base_date = datetime(2024, 1, 1)
+
+    rows = []
+    for i in range(lots):
+        if rows and rng.random() < 0.1: # The rest of the previous lot, stored in another bin
+            previous = rows[-1]
+            other_bin = bins[(bins.index(previous['BIN']) + rng.randrange(1, len(bins))) % len(bins)]
+            rows.append(dict(previous, BIN=other_bin, On_Hand_Qty=round(rng.uniform(1, 25000), 2)))
+            continue
+        customer = customer_names[i % customers]
+        part_no = rng.randrange(parts_per_customer)
+        rec_date = base_date + timedelta(days=rng.randrange(0, 600))
+        exp_date = rec_date + timedelta(days=rng.randrange(90, 1100))
+        tran_date = rec_date + timedelta(days=rng.randrange(0, 60))
+        has_po = rng.random() < 0.6
+        rows.append({
+            'Customer': customer,
+            'Part': f"{customer[-3:]}-{part_no:05d}",
+            'Customer_Part': '',
+            'Description': f"Synthetic product {part_no} for {customer} - {rng.choice(['bottle', 'carton', 'label', 'pouch', 'tray'])}",
+            'On_Hand_Qty': round(rng.uniform(1, 25000), 2),
+            'Unit': rng.choice(UNITS),
+            'BIN': rng.choice(bins),
+            'Reference': f"REF{rng.randrange(100000):06d}",
+            'User_Lot': f"L{i:07d}",
+            'Exp_Date': exp_date,
+            'Last_Transaction_Date': tran_date,
+            'Last_Rec_Date': rec_date,
+            'PO': f"PO-{rng.randrange(10000, 99999)}" if has_po else 'N/A',
+            'Status': rng.choice(STATUSES),
+        })
+    rows.sort(key=lambda r: (r['Customer'], r['Part'], r['User_Lot'], r['BIN']))
+    return rows
+
+
+def generate_dimensions(rows):
+    """
+    Derives dmprod/dmpr1/dmunit/dmloc-shaped tables from the inventory rows.
+    Returns: (dimension tables as lists of dicts, list of (product id, location id) per row)
+    """
+    groups, units, locations, products = {}, {}, {}, {}
+    row_ids = []
+    for row in rows:
+        group_id = groups.setdefault(row['Customer'], len(groups) + 1)
+        unit_id = units.setdefault(row['Unit'], len(units) + 1)
+        location_id = locations.setdefault(row['BIN'], len(locations) + 1)
+        product_id = products.setdefault((row['Part'], row['Description'], group_id, unit_id), len(products) + 1)
+        row_ids.append((product_id, location_id))
+    tables = {
+        'dmprod': [{'pr_id': pid, 'pr_codenum': part, 'pr_descrip': descrip, 'pr_user5': gid, 'pr_unid': uid}
+                   for (part, descrip, gid, uid), pid in products.items()],
+        'dmpr1': [{'p1_id': gid, 'p1_name': name} for name, gid in groups.items()],
+        'dmunit': [{'un_id': uid, 'un_name': name} for name, uid in units.items()],
+        'dmloc': [{'lo_id': lid, 'lo_name': name} for name, lid in locations.items()],
+    }
+    return tables, row_ids
+
+
+def generate_customers(count, erp_customer_names):
+    """Generates synthetic rows for the local Customers table."""
+    customers = []
+    for i in range(1, count + 1):
+        if i == 1:
+            erp_name = 'All'
+        elif i % 5 == 0 and len(erp_customer_names) > 2:
+            erp_name = '|'.join(sorted(erp_customer_names[i % len(erp_customer_names):][:3]))
+        else:
+            erp_name = erp_customer_names[i % len(erp_customer_names)]
+        customers.append({
+            'customer_id': i,
+            'first_name': f"First{i}",
+            'last_name': f"Last{i}",
+            'email': f"customer{i}@example.com",
+            'password_hash': 'scrypt:fake',
+            'erp_customer_name': erp_name,
+            'is_active': True,
+            'created_date': datetime(2024, 1, 1),
+            'last_login_date': datetime(2024, 6, 1),
+            'must_reset_password': False,
+        })
+    return customers
+
+
+def generate_audit_log(count, customers, seed=7):
+    """Generates synthetic AuditLog rows, newest first."""
+    rng = random.Random(seed)
+    actions = ['CUSTOMER_LOGIN'] * 6 + ['CUSTOMER_LOGOUT', 'CUSTOMER_UPDATE', 'CUSTOMER_SESSION_KICK', 'CUSTOMER_CREATE']
+    now = datetime.utcnow()
+    logs = []
+    for i in range(count):
+        customer = rng.choice(customers)
+        action = rng.choice(actions)
+        logs.append({
+            'log_id': count - i,
+            'timestamp': now - timedelta(minutes=i * 7),
+            'admin_username': 'SYSTEM' if action.startswith('CUSTOMER_LOG') else rng.choice(['cp_admin', 'jdoe', 'asmith']),
+            'action_type': action,
+            'target_customer_id': customer['customer_id'],
+            'target_customer_email': customer['email'],
+            'details': f"Login from IP: 10.0.{i % 255}.{rng.randrange(255)}" if action == 'CUSTOMER_LOGIN' else 'Synthetic event',
+        })
+    return logs
+
+
+# --- Fake data store shared by all fake connections ---
+
+class FakeDataStore:
+    """Holds the synthetic tables. Configured once per benchmark run."""
+    inventory_rows = []
+    erp_customer_names = []
+    dimensions = {}
+    inventory_ids = [] # (product id, location id) per inventory row
+    customers = {}
+    sessions = {}
+    audit_log = []
+    schema_version = 1 # Applied migrations (an up-to-date database)
+
+    @classmethod
+    def configure(cls, lots, erp_customers=25, local_customers=200, audit_rows=5000, seed=42):
+        cls.inventory_rows = generate_inventory_rows(lots, customers=erp_customers, seed=seed)
+        cls.erp_customer_names = sorted({row['Customer'] for row in cls.inventory_rows})
+        cls.dimensions, cls.inventory_ids = generate_dimensions(cls.inventory_rows)
+        customers = generate_customers(local_customers, cls.erp_customer_names)
+        cls.customers = {c['customer_id']: c for c in customers}
+        cls.sessions = {}
+        cls.audit_log = generate_audit_log(audit_rows, customers)
+
+    @classmethod
+    def add_session(cls, session_id, customer_id):
+        now = datetime.utcnow()
+        cls.sessions[session_id] = {
+            'session_id': session_id,
+            'customer_id': customer_id,
+            'last_seen': now,
+            'ip_address': '127.0.0.1',
+            'user_agent': 'benchmark',
+            'created_at': now,
+        }
+
+
+# --- Fake pyodbc driver ---
+# Only the driver layer is faked: the connection classes below subclass the real
+# ones, so the instrumented execute_query / iter_query (metrics, slow-query log,
+# spans) and the row construction run exactly as in production.
+
+class FakeCursor:
+    """pyodbc-style cursor over the (columns, rows) result of a fake query handler."""
+
+    def __init__(self, handler):
+        self._handler = handler
+        self.description = None
+        self._rows = iter(())
+
+    def execute(self, sql, params=None):
+        result = self._handler(sql, list(params or []))
+        if result is None: # Statement without a result set
+            self.description = None
+            self._rows = iter(())
+        else:
+            columns, rows = result
+            self.description = [(name, None, None, None, None, None, True) for name in columns]
+            self._rows = iter(rows)
+        return self
+
+    def fetchone(self):
+        return next(self._rows, None)
+
+    def fetchmany(self, size):
+        return list(itertools.islice(self._rows, size))
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def close(self):
+        self._rows = iter(())
+
+
+class FakeDriverConnection:
+    """pyodbc-style connection handing out FakeCursors."""
+
+    def __init__(self, handler):
+        self._handler = handler
+        self.closed = False
+        self.timeout = 0
+
+    def cursor(self):
+        return FakeCursor(self._handler)
+
+    def setdecoding(self, *args, **kwargs):
+        pass
+
+    def setencoding(self, *args, **kwargs):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def _tabular(result):
+    """Converts a list of dicts to (columns, rows); anything else means no result set."""
+    if not isinstance(result, list):
+        return None
+    columns = tuple(result[0]) if result else ('result',) # An empty result set still has columns
+    return columns, [tuple(row.values()) for row in result]
+
+
+# --- Local database (CustomerPortalDB) ---
+
+def local_db_query(query, params):
+    """
+    Answers the SQL issued by the DAL classes from FakeDataStore.
+    Dispatches on recognizable fragments of the query text.
+    Returns: list of dicts for result sets, True for other statements
+    """
+    params = list(params or [])
+    q = ' '.join(query.split())
+    store = FakeDataStore
+
+    # --- Schema migrations ---
+    if "OBJECT_ID(N'dbo.SchemaVersion'" in q and q.startswith('IF') and 'SELECT' in q:
+        return [{'version': store.schema_version}]
+    if q.startswith('INSERT INTO dbo.SchemaVersion'):
+        store.schema_version = params[0]
+        return True
+    if 'EXEC @r = sp_getapplock' in q:
+        return [{'result': 0}]
+
+    if 'FROM INFORMATION_SCHEMA.TABLES' in q:
+        return [{'table_count': 1}]
+
+    # --- ActiveSessions ---
+    if q.startswith('SELECT * FROM ActiveSessions WHERE session_id'):
+        row = store.sessions.get(params[0])
+        return [dict(row)] if row else []
+    if q.startswith('MERGE INTO ActiveSessions'):
+        session_id, customer_id, ip, ua, now_utc = params
+        existing = store.sessions.get(session_id)
+        if existing:
+            existing.update(last_seen=now_utc, ip_address=ip, user_agent=ua)
+        else:
+            store.sessions[session_id] = {
+                'session_id': session_id, 'customer_id': customer_id, 'last_seen': now_utc,
+                'ip_address': ip, 'user_agent': ua, 'created_at': now_utc,
+            }
+        return True
+    if 'FROM ActiveSessions s' in q and 'WHERE s.last_seen <' in q:
+        cutoff = params[0]
+        return [
+            {'session_id': s['session_id'], 'customer_id': s['customer_id'],
+             'target_customer_email': store.customers.get(s['customer_id'], {}).get('email')}
+            for s in store.sessions.values() if s['last_seen'] < cutoff
+        ]
+    if q.startswith('DELETE FROM ActiveSessions'):
+        for session_id in params:
+            store.sessions.pop(session_id, None)
+        return True
+
+    # --- Customers ---
+    if q.startswith('SELECT * FROM Customers WHERE customer_id'):
+        row = store.customers.get(params[0])
+        return [dict(row)] if row else []
+    if q.startswith('SELECT * FROM Customers WHERE email'):
+        return [dict(c) for c in store.customers.values() if c['email'] == params[0]]
+    if q.startswith('SELECT DISTINCT erp_customer_name FROM Customers'):
+        names = {c['erp_customer_name'] for c in store.customers.values() if c['is_active'] and c['erp_customer_name']}
+        return [{'erp_customer_name': name} for name in sorted(names)]
+
+    # --- Analytics ---
+    if 'AS active_customers' in q:
+        return [{
+            'active_customers': sum(1 for c in store.customers.values() if c['is_active']),
+            'current_sessions': len(store.sessions),
+            'logins_last_7_days': sum(1 for log in store.audit_log if log['action_type'] == 'CUSTOMER_LOGIN'),
+            'unique_logins_last_7_days': len({log['target_customer_id'] for log in store.audit_log}),
+        }]
+    if 'AS login_date' in q:
+        counts = {}
+        for log in store.audit_log:
+            if log['action_type'] == 'CUSTOMER_LOGIN' and log['timestamp'] >= params[0]:
+                day = log['timestamp'].date()
+                counts[day] = counts.get(day, 0) + 1
+        return [{'login_date': day, 'login_count': n} for day, n in sorted(counts.items())]
+    if 'AS customer_email' in q:
+        counts = {}
+        for log in store.audit_log:
+            if log['action_type'] == 'CUSTOMER_LOGIN':
+                counts[log['target_customer_email']] = counts.get(log['target_customer_email'], 0) + 1
+        ranked = sorted(counts.items(), key=lambda kv: kv[1], reverse=True)[:params[0]]
+        return [{'customer_email': email, 'login_count': n} for email, n in ranked]
+    if q.startswith('SELECT TOP (?) timestamp, target_customer_email, details'):
+        logins = [log for log in store.audit_log if log['action_type'] == 'CUSTOMER_LOGIN']
+        return [dict(log) for log in logins[:params[0]]]
+
+    # --- Audit Log ---
+    if q.startswith('SELECT DISTINCT admin_username FROM AuditLog'):
+        return [{'admin_username': name} for name in sorted({log['admin_username'] for log in store.audit_log})]
+    if q.startswith('SELECT DISTINCT action_type FROM AuditLog'):
+        return [{'action_type': name} for name in sorted({log['action_type'] for log in store.audit_log})]
+    if q.startswith('SELECT log_id, timestamp, admin_username'):
+        offset, limit = params[-2], params[-1]
+        return [dict(log) for log in store.audit_log[offset:offset + limit]]
+    if q.startswith('INSERT INTO AuditLog'):
+        return True
+
+    # Anything else (UPDATE Customers, DDL, ...) succeeds without data
+    return [] if q.upper().startswith('SELECT') else True
+
+
+class FakeDatabaseConnection(DatabaseConnection):
+    """DatabaseConnection whose driver connection is a FakeDriverConnection."""
+
+    def _build_connection_string(self):
+        return 'fake-local-db'
+
+    def connect(self):
+        if self.connection is None:
+            self.connection = FakeDriverConnection(lambda sql, params: _tabular(local_db_query(sql, params)))
+        return super().connect() # Keeps the per-cursor liveness check of the real connection
+
+    def test_connection(self):
+        return True
+
+
+# --- ERP ---
+
+def erp_query(sql, params):
+    """
+    Answers the ERP queries from FakeDataStore as (columns, rows), or None.
+    Inventory rows are produced lazily so iter_query streams them like the driver would.
+    """
+    store = FakeDataStore
+    if 'FROM dmpr1' in sql and 'SELECT DISTINCT p1_name' in sql:
+        return ('p1_name',), [(name,) for name in store.erp_customer_names]
+    if 'CHECKSUM_AGG' in sql: # Dimension change-detection signature
+        return _tabular([{f"{table}_count": len(rows) for table, rows in store.dimensions.items()}])
+    for table, rows in store.dimensions.items():
+        if f"FROM {table};" in sql:
+            return _tabular(rows)
+    if 'FROM dtfifo' in sql:
+        if 'AS Product_Id' in sql: # Facts-only inventory query, optionally filtered by customer group ids
+            return _inventory_facts(set(params))
+        return _inventory_rows(params, sharded='% ? = ?' in sql)
+    return None
+
+
+def _unordered(rows):
+    """Without an ORDER BY the server may return rows in any order: hand them back reversed."""
+    return reversed(list(rows))
+
+
+def _inventory_rows(params, sharded):
+    shard = None
+    if sharded: # Sharded 'All' query: last two params are (shard count, shard number)
+        shard = (params.pop(-2), params.pop(-1))
+    wanted = set(params)
+    columns = tuple(FakeDataStore.inventory_rows[0]) if FakeDataStore.inventory_rows else ('Customer',)
+
+    def rows():
+        for row in FakeDataStore.inventory_rows:
+            if wanted and row['Customer'] not in wanted:
+                continue
+            if shard and zlib.crc32(row['Part'].encode('utf-8')) % shard[0] != shard[1]:
+                continue # Stands in for ABS(fi_prid) % N: every lot of a part lands in one shard
+            yield tuple(row.values())
+    return columns, (_unordered(rows()) if shard else rows()) # Slices have no ORDER BY
+
+
+def _inventory_facts(group_ids):
+    group_of = {g['p1_name']: g['p1_id'] for g in FakeDataStore.dimensions['dmpr1']}
+    columns = (
+        'Product_Id', 'Location_Id', 'On_Hand_Qty', 'Reference', 'User_Lot', 'Exp_Date',
+        'Last_Transaction_Date', 'Last_Rec_Date', 'PO', 'Status',
+    )
+
+    def rows():
+        for row, (product_id, location_id) in zip(FakeDataStore.inventory_rows, FakeDataStore.inventory_ids):
+            if group_ids and group_of[row['Customer']] not in group_ids:
+                continue
+            yield (
+                product_id, location_id, row['On_Hand_Qty'], row['Reference'], row['User_Lot'], row['Exp_Date'],
+                row['Last_Transaction_Date'], row['Last_Rec_Date'], row['PO'], row['Status'],
+            )
+    return columns, _unordered(rows()) # The facts query has no ORDER BY
+
+
+class FakeERPConnection(ERPConnection):
+    """ERPConnection whose driver connection is a FakeDriverConnection."""
+
+    @staticmethod
+    def _build_connection_string():
+        return 'fake-erp'
+
+    def _connect(self):
+        self.connection = FakeDriverConnection(erp_query)
+        return True
+
+    def test_connection(self):
+        return True
+
+
+def install_fakes():
+    """
+    Replaces the real connection classes with the fakes.
+    Must run before 'app' is imported, because app.py binds the names at import.
+    """
+    import database.connection as local_connection
+    import database.erp_connection_base as erp_connection
+
+    local_connection.DatabaseConnection = FakeDatabaseConnection
+    erp_connection.ERPConnection = FakeERPConnection
@@ -0,0 +1,325 @@
+# customer_portal/benchmarks/run_benchmarks.py
+"""
+Runs the portal's hot paths through the Flask test client against the
+in-memory fakes and reports latency percentiles, allocations and peak RSS.
+
+Examples:
+    python -m benchmarks.run_benchmarks --lots 1000,20000 --iterations 30
+    python -m benchmarks.run_benchmarks --lots 200000 --save-baseline nightly
+    python -m benchmarks.run_benchmarks --compare benchmarks/baselines/nightly.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource # Not available on Windows
+except ImportError:
+    resource = None
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(PROJECT_ROOT, 'benchmarks', 'baselines')
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.fakes import FakeDataStore, install_fakes
+from utils.slow_query_log import nearest_rank
+
+# Metrics compared against a baseline (higher is worse for all of them)
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'alloc_peak_kb')
+
+BENCH_CUSTOMER_SESSION = 'bench-customer-session'
+
+
+def peak_rss_mb():
+    """Returns the process's peak resident set size in MB, if measurable."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS reports bytes
+        return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+def login_customer(client, customer_id):
+    """Creates a DB-backed customer session for the test client."""
+    FakeDataStore.add_session(BENCH_CUSTOMER_SESSION, customer_id)
+    with client.session_transaction() as sess:
+        sess.clear()
+        sess['customer'] = {'customer_id': customer_id}
+        sess['customer_session_id'] = BENCH_CUSTOMER_SESSION
+
+
+def login_admin(client):
+    """Creates an admin session for the test client."""
+    with client.session_transaction() as sess:
+        sess.clear()
+        sess['admin'] = {'username': 'bench_admin', 'display_name': 'Benchmark', 'is_admin': True, 'auth_method': 'local'}
+
+
+# Body of a server-side export: the grid's view (filters, sort), rows rebuilt from the cached snapshot
+EXPORT_VIEW = {
+    'headers': ['Part', 'Description', 'On Hand Qty', 'Unit', 'Bin', 'User Lot', 'Exp Date',
+                'Reference', 'PO', 'Status', 'Last Rec Date', 'Last Tran Date'],
+    'columns': ['Part', 'Description', 'On_Hand_Qty', 'Unit', 'BIN', 'User_Lot', 'Exp_Date',
+                'Reference', 'PO', 'Status', 'Last_Rec_Date', 'Last_Transaction_Date'],
+    'filters': {'q': '', 'status': ''},
+    'sort': {'column': 'Exp_Date', 'direction': 'desc'},
+}
+
+
+def build_export_payload(limit=None):
+    """Builds the JSON body the browser posts to /inventory/api/export-xlsx."""
+    headers = ['Part', 'Description', 'On Hand Qty', 'Unit', 'Bin', 'User Lot', 'Exp Date',
+               'Reference', 'PO', 'Status', 'Last Rec Date', 'Last Tran Date']
+    rows = []
+    for row in FakeDataStore.inventory_rows[:limit]:
+        rows.append([
+            row['Part'], row['Description'], f"{row['On_Hand_Qty']:,.2f}", row['Unit'], row['BIN'],
+            row['User_Lot'], f"{row['Exp_Date']:%m/%d/%Y}", row['Reference'], row['PO'], row['Status'],
+            f"{row['Last_Rec_Date']:%m/%d/%Y}", f"{row['Last_Transaction_Date']:%m/%d/%Y}",
+        ])
+    return {'headers': headers, 'rows': rows}
+
+
+def reset_inventory_state():
+    """Drops cached inventory snapshots and in-flight fetches so the next request loads the current fake data."""
+    from database.erp_service import get_erp_service
+    from database.inventory_cache import inventory_cache
+
+    inventory_cache.clear()
+    erp_service = get_erp_service()
+    with erp_service._inflight_lock:
+        erp_service._inflight.clear()
+
+
+def build_scenarios(client):
+    """
+    Returns (name, setup, request, cache_hit) tuples. 'setup' prepares the
+    session, 'request' performs one measured call and returns the response.
+    'cache_hit' marks scenarios that measure serving the cached snapshot
+    (loaded by the warm-up requests) rather than a fresh ERP fetch.
+    """
+    all_account = 1 # generate_customers() gives customer 1 the 'All' account
+    single_account = 2
+    export_payload = build_export_payload()
+
+    return [
+        ('load_user_from_session',
+         lambda: login_customer(client, single_account),
+         lambda: client.get('/'),
+         False),
+        ('view_inventory_single',
+         lambda: login_customer(client, single_account),
+         lambda: client.get('/inventory/', headers={'Accept-Encoding': 'gzip'}),
+         False),
+        ('view_inventory_all',
+         lambda: login_customer(client, all_account),
+         lambda: client.get('/inventory/', headers={'Accept-Encoding': 'gzip'}),
+         False),
+        ('inventory_data_all',
+         lambda: login_customer(client, all_account),
+         lambda: client.get('/inventory/api/data'),
+         True),
+        ('inventory_facets_all',
+         lambda: login_customer(client, all_account),
+         lambda: client.get('/inventory/api/facets', query_string={'status': 'Pending QC', 'q': 'carton'}),
+         True),
+        ('inventory_search_all',
+         lambda: login_customer(client, all_account),
+         lambda: client.get('/inventory/api/search', query_string={'q': 'carton l0'}),
+         True),
+        ('export_inventory_xlsx',
+         lambda: login_customer(client, all_account),
+         lambda: client.post('/inventory/api/export-xlsx', json=export_payload),
+         False),
+        ('export_inventory_xlsx_view',
+         lambda: login_customer(client, all_account),
+         lambda: client.post('/inventory/api/export-xlsx', json=EXPORT_VIEW),
+         True),
+        ('admin_analytics',
+         lambda: login_admin(client),
+         lambda: client.get('/admin/analytics'),
+         False),
+        ('admin_audit',
+         lambda: login_admin(client),
+         lambda: client.get('/admin/audit?page=3'),
+         False),
+    ]
+
+
+def consume(response):
+    """Reads the whole body (streamed responses render lazily) and closes the response."""
+    response.get_data()
+    response.close()
+    return response
+
+
+def run_scenario(setup, do_request, iterations, warmup):
+    """Measures one scenario: timed loop first, then one traced pass for allocations."""
+    setup()
+    status_code = None
+    for _ in range(warmup):
+        status_code = consume(do_request()).status_code
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = consume(do_request())
+        samples.append((time.perf_counter() - start) * 1000.0)
+        status_code = response.status_code
+
+    # tracemalloc slows everything down, so allocations get their own pass
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    consume(do_request())
+    after = tracemalloc.take_snapshot()
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    alloc_blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    tracemalloc.stop()
+
+    samples.sort()
+    return {
+        'iterations': iterations,
+        'status_code': status_code,
+        'min_ms': round(samples[0], 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'p50_ms': round(nearest_rank(samples, 50), 3),
+        'p95_ms': round(nearest_rank(samples, 95), 3),
+        'p99_ms': round(nearest_rank(samples, 99), 3),
+        'max_ms': round(samples[-1], 3),
+        'alloc_peak_kb': round(alloc_peak / 1024, 1),
+        'alloc_blocks': alloc_blocks,
+        'rss_peak_mb': peak_rss_mb(),
+    }
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """
+    Compares results against a saved baseline.
+    Returns: list of regression descriptions (empty when nothing regressed)
+    """
+    regressions = []
+    for key, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(key)
+        if not previous:
+            print(f"ℹ️  [Bench] {key}: no baseline entry, skipping comparison.")
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            marker = '❌' if change > threshold else '✅'
+            print(f"   {marker} {key:<40} {metric:<14} {old:>12.2f} -> {new:>12.2f} ({change:+.1%})")
+            if change > threshold:
+                regressions.append(f"{key} {metric}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Offline Customer Portal benchmarks (fake ERP + local DB).')
+    parser.add_argument('--lots', default='1000,20000',
+                        help='Comma-separated inventory sizes (lot rows) to benchmark, e.g. 1000,50000,200000')
+    parser.add_argument('--iterations', type=int, default=20, help='Measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=2, help='Unmeasured warm-up requests per scenario')
+    parser.add_argument('--erp-customers', type=int, default=25, help='Distinct ERP customers in the synthetic data')
+    parser.add_argument('--scenario', action='append', help='Only run scenarios whose name contains this text')
+    parser.add_argument('--output', default=os.path.join(PROJECT_ROOT, 'bench_results.json'),
+                        help='Where to write the JSON report')
+    parser.add_argument('--save-baseline', metavar='NAME', help='Also save the report as benchmarks/baselines/NAME.json')
+    parser.add_argument('--compare', metavar='PATH', help='Baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.20,
+                        help='Relative increase that counts as a regression (default 0.20 = 20%%)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    lot_sizes = [int(size) for size in args.lots.split(',') if size.strip()]
+
+    install_fakes()
+    FakeDataStore.configure(lots=lot_sizes[0], erp_customers=args.erp_customers)
+    from app import create_app # Import after the fakes are installed
+    from config import Config
+    from database.inventory_cache import inventory_cache
+
+    Config.SCHEDULER_ENABLED = False # Scheduled prewarms would skew the timings
+    # Every inventory page view fetches from the ERP instead of reusing a recent (prefetched) snapshot
+    Config.INVENTORY_PREFETCH_MAX_AGE_SECONDS = Config.INVENTORY_PREWARM_MAX_AGE_SECONDS = 0
+    inventory_cache.persistence = None # Don't write (or restore) snapshot files
+    app = create_app()
+    app.testing = True
+    client = app.test_client()
+
+    results = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'lots': lot_sizes,
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'erp_customers': args.erp_customers,
+            'cache_hit_scenarios': [],
+        },
+        'scenarios': {},
+    }
+
+    for lots in lot_sizes:
+        FakeDataStore.configure(lots=lots, erp_customers=args.erp_customers)
+        reset_inventory_state() # Otherwise the snapshots of the previous size would be served
+        print(f"\n⏳ [Bench] Running scenarios with {lots:,} lots...")
+        for name, setup, do_request, cache_hit in build_scenarios(client):
+            if args.scenario and not any(s in name for s in args.scenario):
+                continue
+            key = f"{name}@{lots}"
+            stats = run_scenario(setup, do_request, args.iterations, args.warmup)
+            stats['cache_hit'] = cache_hit
+            results['scenarios'][key] = stats
+            if cache_hit and name not in results['meta']['cache_hit_scenarios']:
+                results['meta']['cache_hit_scenarios'].append(name)
+            label = f"{key} (cache hit)" if cache_hit else key
+            print(f"   {label:<52} p50={stats['p50_ms']:>9.2f}ms  p95={stats['p95_ms']:>9.2f}ms  "
+                  f"p99={stats['p99_ms']:>9.2f}ms  alloc_peak={stats['alloc_peak_kb']:>10.1f}KB  "
+                  f"rss_peak={stats['rss_peak_mb']}MB  status={stats['status_code']}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ [Bench] Results written to {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        baseline_path = os.path.join(BASELINE_DIR, f"{args.save_baseline}.json")
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ [Bench] Baseline saved to {baseline_path}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\n--- Comparing against {args.compare} (threshold {args.threshold:.0%}) ---")
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ [Bench] {len(regressions)} regression(s) detected:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("\n✅ [Bench] No regressions against the baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,12 +5,15 @@ Reads sensitive information from environment variables
 """
 
 import os
+import logging
 from dotenv import load_dotenv
 from datetime import timedelta
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class Config:
     """Application configuration"""
 
@@ -38,6 +41,93 @@ class Config:
     ERP_DB_PORT = os.getenv('ERP_DB_PORT', '1433')
     ERP_DB_DRIVER = os.getenv('ERP_DB_DRIVER', 'ODBC Driver 17 for SQL Server')
     ERP_DB_TIMEOUT = int(os.getenv('ERP_DB_TIMEOUT', '30'))
+    ERP_QUERY_TIMEOUT = int(os.getenv('ERP_QUERY_TIMEOUT', '60')) # Seconds per query, 0 = no limit
+    ERP_FETCH_BATCH_SIZE = int(os.getenv('ERP_FETCH_BATCH_SIZE', '2000')) # Rows per fetchmany() when streaming
+    ERP_POOL_SIZE = int(os.getenv('ERP_POOL_SIZE', '4')) # Max pooled ERP connections for background/parallel work
+    ERP_POOL_WAIT_TIMEOUT = int(os.getenv('ERP_POOL_WAIT_TIMEOUT', '30')) # Seconds to wait for a free pooled connection
+    ERP_ALL_QUERY_SHARDS = int(os.getenv('ERP_ALL_QUERY_SHARDS', '1')) # Parallel slices for the 'All' inventory query (1 = single query)
+    ERP_INVENTORY_QUERY_LIMIT = int(os.getenv('ERP_INVENTORY_QUERY_LIMIT', '4')) # Inventory queries running on the ERP at once (fair-queued)
+    ERP_INVENTORY_PER_CUSTOMER_LIMIT = int(os.getenv('ERP_INVENTORY_PER_CUSTOMER_LIMIT', '2')) # Concurrent inventory requests per customer
+    ERP_INVENTORY_QUEUE_TIMEOUT = int(os.getenv('ERP_INVENTORY_QUEUE_TIMEOUT', '30')) # Seconds to wait for a query slot
+    ERP_FACTS_ONLY_INVENTORY = os.getenv('ERP_FACTS_ONLY_INVENTORY', 'False').lower() == 'true' # Fetch dtfifo ids/measures only; join names from the local dimension cache
+    ERP_DIMENSION_CHECK_SECONDS = int(os.getenv('ERP_DIMENSION_CHECK_SECONDS', '300')) # Min seconds between dimension change checks
+
+    # ERP Circuit Breaker / Stale Data
+    ERP_BREAKER_FAILURE_THRESHOLD = int(os.getenv('ERP_BREAKER_FAILURE_THRESHOLD', '3'))
+    ERP_BREAKER_PROBE_INTERVAL = int(os.getenv('ERP_BREAKER_PROBE_INTERVAL', '15')) # Seconds
+    ERP_BREAKER_PROBE_TIMEOUT = int(os.getenv('ERP_BREAKER_PROBE_TIMEOUT', '5')) # Seconds
+    ERP_STALE_MAX_AGE_HOURS = int(os.getenv('ERP_STALE_MAX_AGE_HOURS', '24')) # Oldest cached inventory served while the ERP is down
+
+    # --- Inventory Cache Memory ---
+    INVENTORY_CACHE_COMPRESSION = os.getenv('INVENTORY_CACHE_COMPRESSION', 'True').lower() == 'true' # Keep cached columns zlib-compressed
+    INVENTORY_CACHE_HOT_COLUMNS_MB = int(os.getenv('INVENTORY_CACHE_HOT_COLUMNS_MB', '256')) # Budget for decompressed columns (LRU)
+
+    # --- Persistent Inventory Snapshots ---
+    INVENTORY_SNAPSHOT_DIR = os.getenv('INVENTORY_SNAPSHOT_DIR', 'data/inventory_snapshots') # Blank = memory only
+    INVENTORY_SNAPSHOT_TTL_HOURS = int(os.getenv('INVENTORY_SNAPSHOT_TTL_HOURS', '24')) # Older files are discarded
+
+    # --- Login-Time Inventory Prefetch ---
+    INVENTORY_PREFETCH_ENABLED = os.getenv('INVENTORY_PREFETCH_ENABLED', 'True').lower() == 'true'
+    INVENTORY_PREFETCH_MAX_AGE_SECONDS = int(os.getenv('INVENTORY_PREFETCH_MAX_AGE_SECONDS', '60')) # Inventory page reuses a cached result this recent
+
+    # --- Background Scheduler / Inventory Prewarm ---
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'True').lower() == 'true'
+    SCHEDULER_TIMEZONE = os.getenv('SCHEDULER_TIMEZONE', 'America/Los_Angeles') # Schedules below are in this zone
+    INVENTORY_PREWARM_SCHEDULE = os.getenv('INVENTORY_PREWARM_SCHEDULE', '30 5 * * *;*/15 6-18 * * 1-5') # Cron ('min hour dom mon dow'), ';'-separated; blank = off
+    INVENTORY_PREWARM_CONCURRENCY = int(os.getenv('INVENTORY_PREWARM_CONCURRENCY', '2')) # ERP customer sets fetched at once
+    INVENTORY_PREWARM_JITTER_SECONDS = int(os.getenv('INVENTORY_PREWARM_JITTER_SECONDS', '60')) # Random delay before each set
+    INVENTORY_PREWARM_MAX_AGE_SECONDS = int(os.getenv('INVENTORY_PREWARM_MAX_AGE_SECONDS', '1200')) # Page reuses a prewarmed result this recent
+
+    # --- Production Server (serve.py, Waitress) ---
+    SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
+    SERVER_PORT = int(os.getenv('SERVER_PORT', '5001'))
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', '1')) # Worker processes sharing the port (0 = one per CPU core)
+    SERVER_THREADS = int(os.getenv('SERVER_THREADS', '20')) # Waitress request threads per worker
+    SERVER_CONNECTION_LIMIT = int(os.getenv('SERVER_CONNECTION_LIMIT', '200')) # Open client connections per worker
+    SERVER_CHANNEL_TIMEOUT = int(os.getenv('SERVER_CHANNEL_TIMEOUT', '120')) # Seconds before an idle connection is closed
+    SERVER_SHUTDOWN_TIMEOUT = int(os.getenv('SERVER_SHUTDOWN_TIMEOUT', '30')) # Seconds a worker gets to drain and flush on shutdown
+
+    # --- Shared Cache / Invalidation Bus (multi-worker deployments) ---
+    SHARED_CACHE_URL = os.getenv('SHARED_CACHE_URL', 'sqlite:///data/shared_cache.sqlite3') # memory:// (single process) or sqlite:///path
+    SHARED_CACHE_POLL_SECONDS = float(os.getenv('SHARED_CACHE_POLL_SECONDS', '1')) # How quickly other workers see invalidations
+
+    # --- Request Bulkheads (keep login/admin responsive while the ERP is slow) ---
+    BULKHEAD_ENABLED = os.getenv('BULKHEAD_ENABLED', 'True').lower() == 'true'
+    BULKHEAD_ERP_PATHS = os.getenv('BULKHEAD_ERP_PATHS', '/inventory') # Comma-separated path prefixes of ERP-bound routes
+    BULKHEAD_ERP_MAX_CONCURRENT = int(os.getenv('BULKHEAD_ERP_MAX_CONCURRENT', '8')) # Keep below the Waitress thread count
+    BULKHEAD_ERP_MAX_QUEUE = int(os.getenv('BULKHEAD_ERP_MAX_QUEUE', '4'))
+    BULKHEAD_ERP_QUEUE_TIMEOUT = int(os.getenv('BULKHEAD_ERP_QUEUE_TIMEOUT', '10')) # Seconds
+    BULKHEAD_RETRY_AFTER = int(os.getenv('BULKHEAD_RETRY_AFTER', '5')) # Retry-After (seconds) on 503s
+
+    # --- HTTP Response Compression ---
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024')) # Bytes
+    COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', '6')) # 1 (fastest) - 9 (smallest)
+
+    # --- Slow-Query Log (local DB + ERP) ---
+    SLOW_QUERY_LOG_ENABLED = os.getenv('SLOW_QUERY_LOG_ENABLED', 'True').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = int(os.getenv('SLOW_QUERY_THRESHOLD_MS', '500'))
+    SLOW_QUERY_LOG_FILE = os.getenv('SLOW_QUERY_LOG_FILE') # Optional JSONL sink, e.g. logs/slow_queries.jsonl
+    SLOW_QUERY_MAX_FINGERPRINTS = int(os.getenv('SLOW_QUERY_MAX_FINGERPRINTS', '500'))
+    SLOW_QUERY_SAMPLE_SIZE = int(os.getenv('SLOW_QUERY_SAMPLE_SIZE', '200')) # Recent timings kept per fingerprint for p99
+
+    # --- Request Tracing (utils/tracing.py, viewable at /admin/traces) ---
+    TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'True').lower() == 'true'
+    TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '1.0')) # Fraction of requests traced
+    TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', '500')) # Recent traces kept in memory
+    TRACE_MAX_SPANS = int(os.getenv('TRACE_MAX_SPANS', '200')) # Per trace; further spans are counted, not kept
+    TRACE_LOG_FILE = os.getenv('TRACE_LOG_FILE') # Optional JSONL export, e.g. logs/traces.jsonl
+    TRACE_EXPORT_MIN_MS = int(os.getenv('TRACE_EXPORT_MIN_MS', '0')) # Only export traces at least this slow
+
+    # --- Logging (utils/logging_setup.py) ---
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_LEVELS = os.getenv('LOG_LEVELS', '') # Per-module overrides, e.g. database=WARNING,utils.scheduler=DEBUG
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower() # json | text
+    LOG_FILE = os.getenv('LOG_FILE') # Optional rotating file, e.g. logs/portal.log
+    LOG_FILE_MAX_MB = int(os.getenv('LOG_FILE_MAX_MB', '50'))
+    LOG_FILE_BACKUPS = int(os.getenv('LOG_FILE_BACKUPS', '5'))
+    LOG_SAMPLE_RATE = int(os.getenv('LOG_SAMPLE_RATE', '100')) # Keep 1 in N of the per-request messages
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000')) # Records waiting for the writer; extra ones are dropped
 
     # Email settings are now required
     SMTP_SERVER = os.getenv('SMTP_SERVER')
@@ -62,9 +152,18 @@ class Config:
     AD_PORTAL_ADMIN_GROUP = os.getenv('AD_PORTAL_ADMIN_GROUP')
 
 
+    _validated = None # Result of the first validate() call
+
+    @classmethod
+    def validate(cls, force=False):
+        """Validate required configuration (checked and reported once per process unless force=True)"""
+        if cls._validated is not None and not force:
+            return cls._validated
+        cls._validated = cls._check()
+        return cls._validated
+
     @classmethod
-    def validate(cls):
-        """Validate required configuration"""
+    def _check(cls):
         errors = []
         if not cls.SECRET_KEY or cls.SECRET_KEY == 'dev-key-change-in-production':
              errors.append("SECRET_KEY is required and should be changed for production.")
@@ -96,18 +195,21 @@ class Config:
             if not cls.AD_BASE_DN: errors.append("AD_BASE_DN is required for AD auth.")
             if not cls.AD_PORTAL_ADMIN_GROUP: errors.append("AD_PORTAL_ADMIN_GROUP is required for AD auth.")
         else:
-            print("ℹ️  AD_SERVER not found in .env, skipping Active Directory admin auth.")
+            logger.info("AD_SERVER not found in .env, skipping Active Directory admin auth.")
 
         if errors:
-            print("❌ Configuration errors:")
-            for error in errors: print(f"  - {error}")
+            logger.error("Configuration errors:\n" + "\n".join(f"  - {error}" for error in errors))
             return False
         
         if cls.TEST_MODE:
-            print("⚠️  [CONFIG] TEST_MODE is enabled. AD auth will be skipped.")
+            logger.warning("[CONFIG] TEST_MODE is enabled. AD auth will be skipped.")
             
-        print("✅ Configuration loaded successfully.")
+        logger.info("Configuration loaded successfully.")
         return True
 
+# Start the logging pipeline before anything logs (validation below, every module imported after config)
+from utils.logging_setup import init_logging
+init_logging(Config)
+
 # Ensure validation is called on import
 Config.validate()
\ No newline at end of file
@@ -5,7 +5,12 @@ Provides centralized access to database modules and service getters.
 """
 
 from .connection import DatabaseConnection, get_db
-from .erp_connection_base import get_erp_db_connection
+from .erp_connection_base import get_erp_db_connection, erp_breaker
+from .erp_circuit_breaker import ERPUnavailableError
+from .erp_connection_pool import erp_pool
+from .erp_dimensions import erp_dimensions
+from .erp_fairness import erp_fairness, ERPBusyError
+from .inventory_table import InventoryTable
 from .erp_service import get_erp_service, close_erp_connection
 from .customer_data import CustomerDataDB, customer_db
 from .audit_log import AuditLogDB, audit_db
@@ -20,6 +25,13 @@ __all__ = [
     'get_db',
     'get_erp_db_connection',
     'close_erp_connection', # Expose function to close ERP connection if needed
+    'erp_breaker',
+    'ERPUnavailableError',
+    'erp_pool',
+    'erp_dimensions',
+    'erp_fairness',
+    'ERPBusyError',
+    'InventoryTable',
 
     # Service getters
     'get_erp_service',
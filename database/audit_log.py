@@ -4,10 +4,13 @@ Audit Log database operations (Local DB)
 Manages the AuditLog table.
 """
 
+import logging
 from .connection import get_db
 from flask import session # To get admin username
 import json
 
+logger = logging.getLogger(__name__)
+
 class AuditLogDB:
     """Audit Log database operations"""
 
@@ -22,7 +25,7 @@ class AuditLogDB:
         """Ensure the AuditLog table exists."""
         db = get_db() # === ADDED ===
         if not db.check_table_exists('AuditLog'): # === MODIFIED ===
-            print("⏳ Creating AuditLog table...")
+            logger.info("Creating AuditLog table...")
             create_query = """
                 CREATE TABLE AuditLog (
                     log_id INT IDENTITY(1,1) PRIMARY KEY,
@@ -39,9 +42,9 @@ class AuditLogDB:
                 CREATE INDEX IX_AuditLog_TargetCustomer ON AuditLog(target_customer_id);
             """
             if db.execute_query(create_query): # === MODIFIED ===
-                print("✅ AuditLog table created successfully.")
+                logger.info("AuditLog table created successfully.")
             else:
-                print("❌ Failed to create AuditLog table.")
+                logger.error("Failed to create AuditLog table.")
 
     # === MODIFICATION: Added 'admin_username' parameter and context handling ===
     def log_event(self, action_type, target_customer_id=None, target_customer_email=None, details=None, admin_username=None):
@@ -77,10 +80,10 @@ class AuditLogDB:
         try:
             success = db.execute_query(query, params) # === MODIFIED ===
             if not success:
-                print(f"⚠️ [Audit Log] Failed to log event: {action_type} by {admin_username}")
+                logger.warning(f"[Audit Log] Failed to log event: {action_type} by {admin_username}")
         except Exception as e:
             # Prevent audit errors from breaking main functionality
-            print(f"❌ [Audit Log] CRITICAL ERROR logging event: {e}")
+            logger.error(f"[Audit Log] CRITICAL ERROR logging event: {e}")
 
     def get_logs(self, limit=100, offset=0, admin_filter=None, action_filter=None, customer_filter=None):
         """Retrieves audit logs with optional filtering."""
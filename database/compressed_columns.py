@@ -0,0 +1,168 @@
+# customer_portal/database/compressed_columns.py
+"""
+Compressed column storage for cached inventory tables
+Each column of a cached InventoryTable is kept as one zlib-compressed
+block. Columns are decompressed on access and the decoded arrays are kept
+in a process-wide LRU with a byte budget (hot_columns), so recently used
+columns of recently used snapshots stay fast while everything else costs
+only its compressed size. The same blocks are written to the on-disk
+snapshot store as-is.
+"""
+
+import itertools
+import json
+import sys
+import threading
+import weakref
+import zlib
+from collections import OrderedDict
+from collections.abc import Mapping
+import numpy as np
+from config import Config
+
+_COMPRESSION_LEVEL = 1 # Compression runs in the request that fetched the data; level 1 is ~4x faster than 6 for ~15% more bytes
+
+# Block encodings: raw little-endian arrays for numbers, JSON for text
+_DTYPES = {'f8': np.float64, 'i4': np.int32}
+
+
+def encode_strings(values):
+    return json.dumps(values, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def decode_strings(raw):
+    return np.array(json.loads(raw.decode('utf-8')), dtype=object)
+
+
+def encode_block(values):
+    """ndarray -> (encoding, zlib-compressed bytes)."""
+    if values.dtype == object:
+        return 'json', zlib.compress(encode_strings(values.tolist()), _COMPRESSION_LEVEL)
+    encoding = 'f8' if values.dtype.kind == 'f' else 'i4'
+    raw = np.ascontiguousarray(values, dtype=_DTYPES[encoding]).tobytes()
+    return encoding, zlib.compress(raw, _COMPRESSION_LEVEL)
+
+
+def decode_block(encoding, block):
+    """Inverse of encode_block (numeric arrays are read-only views of the decompressed bytes)."""
+    raw = zlib.decompress(block)
+    if encoding == 'json':
+        return decode_strings(raw)
+    return np.frombuffer(raw, dtype=_DTYPES[encoding])
+
+
+def array_bytes(values):
+    """Memory held by an array, including (estimated from a sample) the objects of an object array."""
+    if values.dtype != object or not len(values):
+        return values.nbytes
+    sample = values[::max(1, len(values) // 1000)]
+    return values.nbytes + len(values) * sum(sys.getsizeof(v) for v in sample) // len(sample)
+
+
+class HotColumnCache:
+    """Process-wide LRU of decompressed columns, bounded by total bytes."""
+
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self._entries = OrderedDict() # (owner token, column) -> (ndarray, bytes)
+        self._bytes = 0
+        self._lock = threading.RLock() # Re-entrant: a table's finalizer may run (via GC) while it is held
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, values):
+        size = array_bytes(values)
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (values, size)
+            self._bytes += size
+            while self._bytes > self.budget_bytes and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def discard_owner(self, token):
+        """Drops every column of a table that is gone."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == token]:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def resident_bytes(self, token=None):
+        with self._lock:
+            if token is None:
+                return self._bytes
+            return sum(size for (owner, _), (_, size) in self._entries.items() if owner == token)
+
+    def status(self):
+        """Snapshot for diagnostics."""
+        with self._lock:
+            return {
+                'budget_bytes': self.budget_bytes,
+                'resident_bytes': self._bytes,
+                'columns': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+# Singleton instance
+hot_columns = HotColumnCache(budget_bytes=Config.INVENTORY_CACHE_HOT_COLUMNS_MB * 1024 * 1024)
+
+_tokens = itertools.count()
+
+
+class CompressedColumns(Mapping):
+    """
+    Read-only name -> ndarray mapping backed by compressed blocks.
+    Used as an InventoryTable's column data; decoded arrays live in hot_columns.
+    """
+
+    def __init__(self, blocks, hot_cache=None):
+        self._blocks = blocks # name -> (encoding, compressed bytes)
+        self._hot = hot_cache or hot_columns
+        self._token = next(_tokens)
+        weakref.finalize(self, self._hot.discard_owner, self._token)
+
+    @classmethod
+    def from_arrays(cls, data, hot_cache=None):
+        """Compresses decoded arrays; they start out in the hot cache, since they are already decoded."""
+        columns = cls({name: encode_block(values) for name, values in data.items()}, hot_cache)
+        for name, values in data.items():
+            columns._hot.put((columns._token, name), values)
+        return columns
+
+    def __getitem__(self, name):
+        key = (self._token, name)
+        values = self._hot.get(key)
+        if values is None:
+            encoding, block = self._blocks[name]
+            values = decode_block(encoding, block)
+            self._hot.put(key, values)
+        return values
+
+    def __iter__(self):
+        return iter(self._blocks)
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def block(self, name):
+        """(encoding, compressed bytes) of a column, e.g. for writing to disk."""
+        return self._blocks[name]
+
+    def compressed_bytes(self):
+        return sum(len(block) for _, block in self._blocks.values())
+
+    def resident_bytes(self):
+        """Bytes of this table's columns currently decompressed in the hot cache."""
+        return self._hot.resident_bytes(self._token)
@@ -4,15 +4,21 @@ Database connection management for CustomerPortalDB
 Handles connection pooling and basic operations for the LOCAL database.
 """
 
+import logging
 import pyodbc
 from config import Config
 from contextlib import contextmanager
-import traceback
 from flask import g # === NEW IMPORT ===
+from utils.metrics import instrument_query
+
+logger = logging.getLogger(__name__)
 
 class DatabaseConnection:
     """Local Database (CustomerPortalDB) connection handler"""
 
+    # Connection string whose driver worked; later instances skip the driver probe
+    _cached_connection_string = None
+
     def __init__(self):
         self.connection = None
         # === MODIFICATION: Build connection string on init ===
@@ -24,6 +30,8 @@ class DatabaseConnection:
 
     def _build_connection_string(self):
         """Build the local database connection string"""
+        if DatabaseConnection._cached_connection_string:
+            return DatabaseConnection._cached_connection_string
         # Prioritized list of potential drivers to try (braces removed)
         drivers_to_try = [
             'ODBC Driver 17 for SQL Server', # Often preferred
@@ -61,22 +69,23 @@ class DatabaseConnection:
                 # Test connection immediately
                 test_conn = pyodbc.connect(conn_str, timeout=5)
                 test_conn.close()
-                print(f"✅ [Local DB] Connection test successful with driver: {driver}")
+                logger.info(f"[Local DB] Connection test successful with driver: {driver}")
+                DatabaseConnection._cached_connection_string = conn_str
                 return conn_str # Return the first working one
             except pyodbc.Error as e:
-                print(f"ℹ️  [Local DB] Driver '{driver}' failed: {e}. Trying next...")
+                logger.info(f"[Local DB] Driver '{driver}' failed: {e}. Trying next...")
                 continue
             except Exception as e:
-                print(f"ℹ️  [Local DB] Unexpected error testing driver '{driver}': {e}. Trying next...")
+                logger.info(f"[Local DB] Unexpected error testing driver '{driver}': {e}. Trying next...")
                 continue
 
-        print(f"❌ [Local DB] FATAL: Could not establish connection string. All attempted drivers failed.")
+        logger.error(f"[Local DB] FATAL: Could not establish connection string. All attempted drivers failed.")
         return None # Indicate failure
 
     def connect(self):
         """Establish database connection"""
         if not self._connection_string:
-            print("❌ [Local DB] Cannot connect: No valid connection string found.")
+            logger.error("[Local DB] Cannot connect: No valid connection string found.")
             return False
         try:
             # Check if connection exists and is alive
@@ -86,7 +95,7 @@ class DatabaseConnection:
                     # print("ℹ️ [Local DB] Reusing existing connection.")
                     return True
                 except (pyodbc.Error, AttributeError):
-                    print("⚠️ [Local DB] Connection lost. Reconnecting...")
+                    logger.warning("[Local DB] Connection lost. Reconnecting...")
                     self.disconnect() # Clean up old connection
 
             # print("ℹ️ [Local DB] Establishing new connection...")
@@ -98,11 +107,13 @@ class DatabaseConnection:
             # print("✅ [Local DB] New connection established.")
             return True
         except pyodbc.Error as e:
-            print(f"❌ [Local DB] Connection failed: {str(e)}")
+            logger.error(f"[Local DB] Connection failed: {str(e)}")
+            if isinstance(e, pyodbc.InterfaceError): # e.g. driver missing: probe the drivers again next time
+                DatabaseConnection._cached_connection_string = None
             self.connection = None
             return False
         except Exception as e:
-            print(f"❌ [Local DB] Unexpected connection error: {str(e)}")
+            logger.error(f"[Local DB] Unexpected connection error: {str(e)}")
             self.connection = None
             return False
 
@@ -114,7 +125,7 @@ class DatabaseConnection:
                 self.connection = None
                 # print("ℹ️ [Local DB] Connection closed.")
             except pyodbc.Error as e:
-                print(f"⚠️ [Local DB] Error disconnecting: {str(e)}")
+                logger.warning(f"[Local DB] Error disconnecting: {str(e)}")
         self.connection = None
 
     def test_connection(self):
@@ -128,7 +139,7 @@ class DatabaseConnection:
             test_conn.close()
             return True
         except Exception as e:
-            print(f"❌ [Local DB] Test connection failed: {e}")
+            logger.error(f"[Local DB] Test connection failed: {e}")
             return False
 
 
@@ -142,8 +153,7 @@ class DatabaseConnection:
             cursor = self.connection.cursor()
             yield cursor
         except pyodbc.Error as e:
-            print(f"❌ [Local DB] Database Error: {e}")
-            traceback.print_exc()
+            logger.error(f"[Local DB] Database Error: {e}", exc_info=True)
             if self.connection:
                 try: self.connection.rollback()
                 except pyodbc.Error: pass # Ignore rollback errors if connection is broken
@@ -153,6 +163,7 @@ class DatabaseConnection:
                 try: cursor.close()
                 except pyodbc.Error: pass # Ignore if cursor is already closed or invalid
 
+    @instrument_query('local_db')
     def execute_query(self, query, params=None):
         """
         Execute a query and return results.
@@ -169,15 +180,15 @@ class DatabaseConnection:
                     self.connection.commit()
                     return True
             except Exception as e: # Catch broader exceptions during execution
-                 print(f"❌ [Local DB] Query execution failed: {str(e)}")
-                 print(f"   Query: {query[:500]}{'...' if len(query) > 500 else ''}") # Log truncated query
-                 print(f"   Params: {params}")
+                 logger.error(f"[Local DB] Query execution failed: {str(e)}",
+                              extra={'sql': query[:500] + ('...' if len(query) > 500 else ''), 'params': params}) # Truncated query
                  # Rollback might not be necessary if commit wasn't reached, but doesn't hurt
                  if self.connection:
                      try: self.connection.rollback()
                      except pyodbc.Error: pass
                  return [] if query.strip().upper().startswith('SELECT') else False
 
+    @instrument_query('local_db')
     def execute_scalar(self, query, params=None):
         """Execute a query and return a single value"""
         with self.get_cursor() as cursor:
@@ -197,7 +208,7 @@ class DatabaseConnection:
             result = self.execute_scalar(query, (table_name, Config.DB_NAME))
             return result is not None and result > 0
         except Exception as e:
-            print(f"⚠️ [Local DB] Table check failed for '{table_name}': {str(e)}")
+            logger.warning(f"[Local DB] Table check failed for '{table_name}': {str(e)}")
             return False # Assume table doesn't exist if check fails
 
 
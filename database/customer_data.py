@@ -4,11 +4,14 @@ Customer database operations (Local DB)
 Manages the Customers and PasswordResetTokens tables.
 """
 
+import logging
 from .connection import get_db
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 import secrets
 
+logger = logging.getLogger(__name__)
+
 class CustomerDataDB:
     """Customer database operations"""
 
@@ -34,17 +37,17 @@ class CustomerDataDB:
             """ % (table_name, column_name, column_def) # Use % for dynamic table/col names
             
             db.execute_query(query, (table_name, column_name)) # === MODIFIED ===
-            print(f"✅ [DB] Checked/Added column '{column_name}' to '{table_name}'.")
+            logger.info(f"[DB] Checked/Added column '{column_name}' to '{table_name}'.")
             return True
         except Exception as e:
-            print(f"❌ [DB] Error adding column '{column_name}': {e}")
+            logger.error(f"[DB] Error adding column '{column_name}': {e}")
             return False
 
     def ensure_tables(self):
         """Ensure the Customers and PasswordResetTokens tables exist."""
         db = get_db() # === ADDED ===
         if not db.check_table_exists('Customers'): # === MODIFIED ===
-            print("⏳ Creating Customers table...")
+            logger.info("Creating Customers table...")
             create_customers_query = """
                 CREATE TABLE Customers (
                     customer_id INT IDENTITY(1,1) PRIMARY KEY,
@@ -64,9 +67,9 @@ class CustomerDataDB:
                 CREATE INDEX IX_Customers_Active ON Customers(is_active);
             """
             if db.execute_query(create_customers_query): # === MODIFIED ===
-                print("✅ Customers table created successfully.")
+                logger.info("Customers table created successfully.")
             else:
-                print("❌ Failed to create Customers table.")
+                logger.error("Failed to create Customers table.")
         else:
             # === NEW: Check and add the column if table exists ===
             self._add_column_if_not_exists(
@@ -76,7 +79,7 @@ class CustomerDataDB:
             )
 
         if not db.check_table_exists('PasswordResetTokens'): # === MODIFIED ===
-            print("⏳ Creating PasswordResetTokens table...")
+            logger.info("Creating PasswordResetTokens table...")
             create_tokens_query = """
                 CREATE TABLE PasswordResetTokens (
                     token_id INT IDENTITY(1,1) PRIMARY KEY,
@@ -90,9 +93,9 @@ class CustomerDataDB:
                  CREATE INDEX IX_Tokens_Used ON PasswordResetTokens(is_used);
             """
             if db.execute_query(create_tokens_query): # === MODIFIED ===
-                print("✅ PasswordResetTokens table created successfully.")
+                logger.info("PasswordResetTokens table created successfully.")
             else:
-                 print("❌ Failed to create PasswordResetTokens table.")
+                 logger.error("Failed to create PasswordResetTokens table.")
 
     def create_customer(self, first_name, last_name, email, password, erp_customer_name=""):
         """
@@ -165,6 +168,17 @@ class CustomerDataDB:
          query += " ORDER BY last_name, first_name"
          return db.execute_query(query) # === MODIFIED ===
 
+    def get_distinct_erp_customer_names(self):
+         """Distinct non-blank erp_customer_name values ('All', single names or '|' sets) of active customers."""
+         db = get_db()
+         query = """
+            SELECT DISTINCT erp_customer_name
+            FROM Customers
+            WHERE is_active = 1 AND erp_customer_name IS NOT NULL AND erp_customer_name <> ''
+         """
+         results = db.execute_query(query)
+         return [row['erp_customer_name'] for row in results or []]
+
     def update_customer(self, customer_id, first_name, last_name, email, erp_customer_name, is_active):
          """
          Updates customer details.
@@ -0,0 +1,40 @@
+# customer_portal/database/date_index.py
+"""
+Sorted date index over an InventoryTable
+For each date column it keeps the row ids ordered by date (blank dates
+left out) next to the matching sorted epoch days, so "expires within N
+days" or "received between A and B" is two binary searches and a slice
+rather than a scan of every row.
+"""
+
+import numpy as np
+from .inventory_table import DATE_COLUMNS, NO_DATE
+
+
+class DateIndex:
+    """Row ids sorted by each date column, built once per inventory snapshot."""
+
+    def __init__(self, table, columns=DATE_COLUMNS):
+        self.table = table
+        self._sorted_days = {} # column -> ascending epoch days (blanks excluded)
+        self._row_ids = {} # column -> row id of each entry in _sorted_days
+        for name in columns:
+            days = table.days(name)
+            row_ids = np.flatnonzero(days != NO_DATE)
+            order = np.argsort(days[row_ids], kind='stable')
+            self._row_ids[name] = row_ids[order].astype(np.int32)
+            self._sorted_days[name] = days[self._row_ids[name]]
+
+    def memory_bytes(self):
+        """Bytes held by the index arrays."""
+        return sum(a.nbytes for arrays in (self._sorted_days, self._row_ids) for a in arrays.values())
+
+    def rows_between(self, name, first_day=None, last_day=None):
+        """
+        Returns the sorted row ids whose date falls within [first_day, last_day]
+        (epoch days, either end open when None). Rows with a blank date never match.
+        """
+        days = self._sorted_days[name]
+        start = 0 if first_day is None else np.searchsorted(days, first_day, side='left')
+        stop = len(days) if last_day is None else np.searchsorted(days, last_day, side='right')
+        return np.sort(self._row_ids[name][start:stop])
@@ -0,0 +1,123 @@
+# customer_portal/database/erp_circuit_breaker.py
+"""
+Circuit breaker for the ERP connection.
+After repeated connection/timeout failures the breaker opens and ERP calls
+fail immediately instead of tying up a Waitress thread for the full
+connection timeout. While open, a background thread probes the ERP and
+closes the breaker as soon as it answers again.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class ERPUnavailableError(ConnectionError):
+    """Raised instead of contacting the ERP while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """A closed/open breaker with a background recovery probe."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+
+    def __init__(self, name, probe, failure_threshold=3, probe_interval=15):
+        """
+        Args:
+            name: label used in log messages
+            probe: callable returning True when the service is reachable again
+            failure_threshold: consecutive failures that open the breaker
+            probe_interval: seconds between background probes while open
+        """
+        self.name = name
+        self._probe = probe
+        self.failure_threshold = max(1, failure_threshold)
+        self.probe_interval = max(1, probe_interval)
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.last_failure = None
+        self._lock = threading.Lock()
+        self._probe_thread = None
+
+    @property
+    def is_open(self):
+        return self.state == self.OPEN
+
+    def before_call(self):
+        """Raises ERPUnavailableError if calls should not reach the ERP right now."""
+        if self.state != self.OPEN:
+            return
+        # Snapshot under the lock: a concurrent _close() resets opened_at to None
+        with self._lock:
+            state, opened_at, last_failure = self.state, self.opened_at, self.last_failure
+        if state != self.OPEN:
+            return
+        open_for = (datetime.utcnow() - opened_at).total_seconds()
+        raise ERPUnavailableError(
+            f"{self.name} is unavailable (circuit open since "
+            f"{opened_at:%Y-%m-%d %H:%M:%S} UTC, {open_for:.0f}s ago): {last_failure}"
+        )
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state == self.OPEN:
+                self._close()
+
+    def record_failure(self, error):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_failure = str(error)[:300]
+            if self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = datetime.utcnow()
+                logger.error(f"[CircuitBreaker] {self.name} circuit OPENED after "
+                             f"{self.consecutive_failures} consecutive failures: {self.last_failure}")
+                self._start_probe()
+
+    def _close(self):
+        """Closes the breaker (caller holds the lock)."""
+        downtime = (datetime.utcnow() - self.opened_at).total_seconds() if self.opened_at else 0
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        logger.info(f"[CircuitBreaker] {self.name} circuit CLOSED after {downtime:.0f}s.")
+
+    def _start_probe(self):
+        """Starts the background probe thread if it isn't running (caller holds the lock)."""
+        if self._probe_thread and self._probe_thread.is_alive():
+            return
+        self._probe_thread = threading.Thread(
+            target=self._probe_loop, name=f"{self.name}-breaker-probe", daemon=True)
+        self._probe_thread.start()
+
+    def _probe_loop(self):
+        while self.state == self.OPEN:
+            time.sleep(self.probe_interval)
+            try:
+                healthy = self._probe()
+            except Exception as e:
+                healthy = False
+                self.last_failure = str(e)[:300]
+            if healthy:
+                with self._lock:
+                    if self.state == self.OPEN:
+                        self._close()
+                return
+            logger.info(f"[CircuitBreaker] {self.name} probe failed; circuit stays open.")
+
+    def status(self):
+        """Returns a dict describing the breaker, for logs and admin pages."""
+        with self._lock:
+            return {
+                'name': self.name,
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'opened_at': self.opened_at,
+                'last_failure': self.last_failure,
+            }
@@ -3,25 +3,43 @@
 Dedicated ERP Database Connection Base.
 Handles the raw pyodbc connection logic.
 """
+import logging
 import pyodbc
-import traceback
 from config import Config
 from flask import g # === NEW IMPORT ===
+from utils.metrics import instrument_query, instrument_stream
+from .erp_circuit_breaker import CircuitBreaker, ERPUnavailableError
+from .erp_records import record_class
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the ERP is unreachable or too slow (as opposed to a bad query)
+_AVAILABILITY_ERRORS = (pyodbc.OperationalError, pyodbc.InterfaceError)
 
 class ERPConnection:
     """Handles the raw connection to the ERP database."""
+
+    # Last connection string that worked; used by the circuit breaker's recovery probe
+    _last_good_connection_string = None
+
     def __init__(self):
         self.connection = None
+        # Fail fast while the ERP is known to be down
+        erp_breaker.before_call()
         # === MODIFICATION: Build connection string on init ===
         self._connection_string = self._build_connection_string()
         if not self._connection_string:
+            erp_breaker.record_failure("All ODBC drivers failed to connect")
             raise ConnectionError("Failed to build connection string for ERP DB.")
         # === MODIFICATION: Connect on init ===
         self._connect()
 
 
-    def _build_connection_string(self):
-        """Builds the ERP connection string."""
+    @staticmethod
+    def _build_connection_string():
+        """Builds the ERP connection string (the driver probe runs once; later calls reuse its result)."""
+        if ERPConnection._last_good_connection_string:
+            return ERPConnection._last_good_connection_string
         # Prioritized list of potential drivers to try (braces removed)
         drivers_to_try = [
             Config.ERP_DB_DRIVER,  # First, try the one from .env
@@ -51,27 +69,38 @@ class ERPConnection:
                 test_conn.close()
                 # === END MODIFICATION ===
                 
-                print(f"✅ [ERP_DB] Connection successful using driver: {driver}")
+                logger.info(f"[ERP_DB] Connection successful using driver: {driver}")
+                ERPConnection._last_good_connection_string = connection_string
                 return connection_string  # Save the working string
                 
             except pyodbc.Error as e:
                 # Only print error if it's not a driver-related issue that we expect to retry
                 if 'driver' not in str(e).lower():
-                    print(f"❌ [ERP_DB] Connection Error: {e}")
-                print(f"ℹ️  [ERP_DB] Driver '{driver}' failed. Trying next...")
+                    logger.error(f"[ERP_DB] Connection Error: {e}")
+                logger.info(f"[ERP_DB] Driver '{driver}' failed. Trying next...")
                 continue # Try the next driver in the list
 
-        print(f"❌ [ERP_DB] FATAL: Connection failed. All attempted drivers were unsuccessful.")
+        logger.error(f"[ERP_DB] FATAL: Connection failed. All attempted drivers were unsuccessful.")
         return None
         
 
     def _connect(self):
         """Internal connect method."""
+        if erp_breaker.is_open:
+            logger.info("[ERP_DB] Circuit breaker is open. Skipping connection attempt.")
+            return False
         try:
             self.connection = pyodbc.connect(self._connection_string, autocommit=True)
+            # Per-query deadline. pyodbc applies Connection.timeout to every cursor
+            # (SQL_ATTR_QUERY_TIMEOUT); it has no cursor-level timeout attribute.
+            self.connection.timeout = Config.ERP_QUERY_TIMEOUT
+            erp_breaker.record_success()
             return True
         except pyodbc.Error as e:
-            print(f"❌ [ERP_DB] Connection Error: {e}")
+            logger.error(f"[ERP_DB] Connection Error: {e}")
+            if isinstance(e, pyodbc.InterfaceError): # e.g. driver missing: probe the drivers again next time
+                ERPConnection._last_good_connection_string = None
+            erp_breaker.record_failure(e)
             self.connection = None
             return False
             
@@ -84,16 +113,24 @@ class ERPConnection:
             test_conn.close()
             return True
         except Exception as e:
-            print(f"❌ [ERP_DB] Test connection failed: {e}")
+            logger.error(f"[ERP_DB] Test connection failed: {e}")
             return False
 
-    def execute_query(self, sql, params=None):
-        """Executes a SQL query and returns results as a list of dicts."""
+    @instrument_query('erp')
+    def execute_query(self, sql, params=None, raise_errors=False):
+        """
+        Executes a SQL query and returns results as a list of dicts.
+        By default errors are logged and an empty list is returned. With
+        raise_errors=True they are re-raised, so callers can tell a failed
+        query from an empty result (e.g. to fall back to cached data).
+        """
         # === MODIFICATION: Check connection and reconnect if closed ===
         if self.connection is None or getattr(self.connection, 'closed', True):
-            print("ℹ️ [ERP_DB] Connection is closed. Reconnecting...")
+            logger.info("[ERP_DB] Connection is closed. Reconnecting...")
             if not self._connect():
-                print("❌ [ERP_DB] Cannot execute query, reconnection failed.")
+                logger.error("[ERP_DB] Cannot execute query, reconnection failed.")
+                if raise_errors:
+                    raise ERPUnavailableError("Could not connect to the ERP database.")
                 return []
         # === END MODIFICATION ===
 
@@ -104,34 +141,95 @@ class ERPConnection:
                 columns = [column[0] for column in cursor.description]
                 results = [dict(zip(columns, row)) for row in cursor.fetchall()]
                 cursor.close()
+                erp_breaker.record_success()
                 return results
             cursor.close()
+            erp_breaker.record_success()
             # Handle cases like INSERT/UPDATE/DELETE where description might be None
             # If autocommit=True, changes are already committed.
             return [] # Return empty list for non-SELECT or empty results
         except pyodbc.Error as e:
-            print(f"❌ [ERP_DB] Query Failed: {e}")
-            print(f"   SQL: {sql}")
-            print(f"   Params: {params}")
-            traceback.print_exc()
+            logger.error(f"[ERP_DB] Query Failed: {e}", extra={'sql': sql, 'params': params}, exc_info=True)
+            # Timeouts and lost connections count towards opening the breaker
+            if isinstance(e, _AVAILABILITY_ERRORS):
+                erp_breaker.record_failure(e)
             # === MODIFICATION: Close connection on error to force reconnect next time ===
             self.close() 
+            if raise_errors:
+                raise
             return []
         except Exception as e:
-            print(f"❌ [ERP_DB] Unexpected error during query execution: {e}")
-            traceback.print_exc()
+            logger.error(f"[ERP_DB] Unexpected error during query execution: {e}", exc_info=True)
             self.close()
+            if raise_errors:
+                raise
             return []
 
+    @instrument_stream('erp')
+    def iter_query(self, sql, params=None, batch_size=None):
+        """
+        Executes a SQL query and yields rows as compact records (see erp_records),
+        fetching batch_size rows at a time instead of loading the whole result.
+        Unlike execute_query, errors are always raised, after the connection is closed.
+        """
+        if self.connection is None or getattr(self.connection, 'closed', True):
+            logger.info("[ERP_DB] Connection is closed. Reconnecting...")
+            if not self._connect():
+                raise ERPUnavailableError("Could not connect to the ERP database.")
+
+        batch_size = batch_size or Config.ERP_FETCH_BATCH_SIZE
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(sql, params or [])
+            if cursor.description:
+                make_record = record_class(tuple(column[0] for column in cursor.description))._make
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    for row in batch:
+                        yield make_record(row)
+            erp_breaker.record_success()
+        except pyodbc.Error as e:
+            logger.error(f"[ERP_DB] Streaming Query Failed: {e}", extra={'sql': sql, 'params': params})
+            if isinstance(e, _AVAILABILITY_ERRORS):
+                erp_breaker.record_failure(e)
+            self.close()
+            raise
+        finally:
+            try:
+                cursor.close()
+            except pyodbc.Error:
+                pass # Already gone with the connection
+
     def close(self):
         """Closes the database connection."""
         if self.connection:
             try:
                 self.connection.close()
                 self.connection = None
-                print("ℹ️ [ERP_DB] Connection closed.")
+                logger.debug("[ERP_DB] Connection closed.") # Every request teardown
             except pyodbc.Error as e:
-                print(f"⚠️ [ERP_DB] Error closing connection: {e}")
+                logger.warning(f"[ERP_DB] Error closing connection: {e}")
+
+
+def _probe_erp():
+    """Recovery probe for the circuit breaker: a short-timeout connect."""
+    connection_string = ERPConnection._last_good_connection_string or ERPConnection._build_connection_string()
+    if not connection_string:
+        return False
+    probe_conn = pyodbc.connect(connection_string, autocommit=True, timeout=Config.ERP_BREAKER_PROBE_TIMEOUT)
+    probe_conn.close()
+    return True
+
+
+# Singleton breaker shared by every ERPConnection in this process
+erp_breaker = CircuitBreaker(
+    'ERP',
+    probe=_probe_erp,
+    failure_threshold=Config.ERP_BREAKER_FAILURE_THRESHOLD,
+    probe_interval=Config.ERP_BREAKER_PROBE_INTERVAL
+)
 
 
 # === MODIFICATION: Remove global instance ===
@@ -0,0 +1,69 @@
+# customer_portal/database/erp_connection_pool.py
+"""
+ERP connection pool
+Request handlers get their ERPConnection from Flask's 'g'; work that runs
+on other threads (e.g. the slices of a sharded query) borrows connections
+from this pool instead. Connections are reused between borrowers, so the
+driver probing in ERPConnection.__init__ is paid once per connection.
+"""
+
+import threading
+from contextlib import contextmanager
+from config import Config
+from . import erp_connection_base
+from .erp_circuit_breaker import ERPUnavailableError
+
+
+class ERPConnectionPool:
+    """A bounded, thread-safe pool of ERPConnection objects."""
+
+    def __init__(self, max_size, wait_timeout):
+        self.max_size = max_size
+        self.wait_timeout = wait_timeout
+        self._idle = [] # Most recently returned last (reused first)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrows a connection for the duration of the 'with' block.
+        A connection that raised, or was closed by a failed query, is discarded.
+        Raises ERPUnavailableError if none frees up within wait_timeout.
+        """
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise ERPUnavailableError("No pooled ERP connection became free in time.")
+        db = None
+        try:
+            with self._lock:
+                db = self._idle.pop() if self._idle else None
+            if db is None or db.connection is None:
+                # Looked up at call time so the benchmark fakes can replace the class
+                db = erp_connection_base.ERPConnection()
+            yield db
+        except BaseException:
+            if db is not None:
+                db.close()
+                db = None
+            raise
+        finally:
+            if db is not None and db.connection is not None:
+                with self._lock:
+                    self._idle.append(db)
+            self._slots.release()
+
+    def close_all(self):
+        """Closes every idle connection (borrowed ones are closed when discarded)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for db in idle:
+            db.close()
+
+    def status(self):
+        """Snapshot for diagnostics."""
+        with self._lock:
+            return {'max_size': self.max_size, 'idle': len(self._idle)}
+
+
+# Singleton instance
+erp_pool = ERPConnectionPool(max_size=Config.ERP_POOL_SIZE, wait_timeout=Config.ERP_POOL_WAIT_TIMEOUT)
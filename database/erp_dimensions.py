@@ -0,0 +1,130 @@
+# customer_portal/database/erp_dimensions.py
+"""
+Local cache of the ERP's inventory dimension tables
+Keeps products (dmprod), customer groups (dmpr1), units (dmunit) and
+locations (dmloc) in memory as id -> attributes, so the facts-only
+inventory query can return just dtfifo ids and measures and the names
+are joined in-process. A cheap checksum query detects changes; the
+tables are only re-read when it differs (or when a fact references an id
+the cache hasn't seen yet).
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from config import Config
+from .erp_connection_pool import erp_pool
+from utils.shared_cache import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+Product = namedtuple('Product', 'part description group_id unit_id')
+
+# Row counts plus an order-independent checksum of the columns we cache, per table
+_SIGNATURE_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM dmprod) AS prod_count,
+        (SELECT CHECKSUM_AGG(BINARY_CHECKSUM(pr_id, pr_codenum, pr_descrip, pr_user5, pr_unid)) FROM dmprod) AS prod_sum,
+        (SELECT COUNT(*) FROM dmpr1) AS group_count,
+        (SELECT CHECKSUM_AGG(BINARY_CHECKSUM(p1_id, p1_name)) FROM dmpr1) AS group_sum,
+        (SELECT COUNT(*) FROM dmunit) AS unit_count,
+        (SELECT CHECKSUM_AGG(BINARY_CHECKSUM(un_id, un_name)) FROM dmunit) AS unit_sum,
+        (SELECT COUNT(*) FROM dmloc) AS loc_count,
+        (SELECT CHECKSUM_AGG(BINARY_CHECKSUM(lo_id, lo_name)) FROM dmloc) AS loc_sum;
+"""
+
+_PRODUCTS_SQL = "SELECT pr_id, pr_codenum, pr_descrip, pr_user5, pr_unid FROM dmprod;"
+_GROUPS_SQL = "SELECT p1_id, p1_name FROM dmpr1;"
+_UNITS_SQL = "SELECT un_id, un_name FROM dmunit;"
+_LOCATIONS_SQL = "SELECT lo_id, lo_name FROM dmloc;"
+
+
+class ERPDimensionCache:
+    """In-memory copy of the ERP dimension tables used by the inventory grid."""
+
+    def __init__(self, check_interval):
+        self.check_interval = check_interval # Seconds between change-detection checks
+        self.products = {} # pr_id -> Product
+        self.customer_groups = {} # p1_id -> p1_name
+        self.units = {} # un_id -> un_name
+        self.locations = {} # lo_id -> lo_name
+        self._signature = None
+        self._loaded_at = None # time.monotonic() of the last full load
+        self._checked_at = None # time.monotonic() of the last signature check
+        self._lock = threading.Lock() # Serializes loads; readers use the (swapped) dicts directly
+
+    @property
+    def is_loaded(self):
+        return self._loaded_at is not None
+
+    def ensure_fresh(self):
+        """Loads the dimensions if needed, re-checking for changes at most every check_interval."""
+        now = time.monotonic()
+        if self.is_loaded and now - self._checked_at < self.check_interval:
+            return
+        self.refresh()
+
+    def refresh(self, force=False):
+        """Re-reads the tables if their signature changed (always when force=True). Returns True if reloaded."""
+        with self._lock:
+            with erp_pool.connection() as db:
+                signature = self._read_signature(db)
+                self._checked_at = time.monotonic()
+                if not force and self.is_loaded and signature == self._signature:
+                    return False
+                changed = self.is_loaded
+                self._load(db)
+            self._signature = signature
+            self._loaded_at = time.monotonic()
+        if changed: # Let the other worker processes re-check now instead of at their next interval
+            invalidation_bus.publish('erp_dimensions', signature=list(signature) if signature else None)
+        logger.info(f"[ERP Dimensions] Loaded {len(self.products)} products, {len(self.customer_groups)} customer groups, "
+                    f"{len(self.units)} units, {len(self.locations)} locations.")
+        return True
+
+    def mark_stale(self, signature=None):
+        """Makes the next ensure_fresh() re-check for changes (unless already at 'signature')."""
+        if self.is_loaded and (signature is None or list(self._signature or ()) != signature):
+            self._checked_at = float('-inf')
+
+    def _read_signature(self, db):
+        rows = db.execute_query(_SIGNATURE_SQL, raise_errors=True)
+        return tuple(rows[0].values()) if rows else None
+
+    def _load(self, db):
+        # Build complete new dicts, then swap them in, so readers never see a half-loaded table
+        products = {
+            row['pr_id']: Product(row['pr_codenum'] or '', row['pr_descrip'] or '', row['pr_user5'], row['pr_unid'])
+            for row in db.execute_query(_PRODUCTS_SQL, raise_errors=True)
+        }
+        groups = {row['p1_id']: row['p1_name'] or '' for row in db.execute_query(_GROUPS_SQL, raise_errors=True)}
+        units = {row['un_id']: row['un_name'] or '' for row in db.execute_query(_UNITS_SQL, raise_errors=True)}
+        locations = {row['lo_id']: row['lo_name'] or '' for row in db.execute_query(_LOCATIONS_SQL, raise_errors=True)}
+        self.products, self.customer_groups, self.units, self.locations = products, groups, units, locations
+
+    # --- Lookups ---
+
+    def customer_group_ids(self, names):
+        """p1_ids whose name matches one of 'names' (case-insensitive, like the ERP's collation)."""
+        wanted = {name.casefold() for name in names}
+        return [group_id for group_id, name in self.customer_groups.items() if name.casefold() in wanted]
+
+    def customer_names(self):
+        """Sorted distinct non-blank customer group names (for filters and autocomplete)."""
+        return sorted({name for name in self.customer_groups.values() if name}, key=str.casefold)
+
+    def status(self):
+        """Snapshot for diagnostics."""
+        return {
+            'loaded': self.is_loaded,
+            'products': len(self.products),
+            'customer_groups': len(self.customer_groups),
+            'units': len(self.units),
+            'locations': len(self.locations),
+            'seconds_since_load': None if self._loaded_at is None else round(time.monotonic() - self._loaded_at),
+        }
+
+
+# Singleton instance
+erp_dimensions = ERPDimensionCache(check_interval=Config.ERP_DIMENSION_CHECK_SECONDS)
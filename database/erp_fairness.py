@@ -0,0 +1,137 @@
+# customer_portal/database/erp_fairness.py
+"""
+Fair scheduling of ERP inventory queries
+Two limits around ErpService's inventory fetches:
+  * admission: each customer may have at most per_requester_limit inventory
+    requests waiting on the ERP at once (duplicates of an in-flight fetch
+    included), so one user mashing refresh can't tie up the web threads;
+  * query slots: at most global_limit inventory queries run against the
+    ERP at once. Waiters are served round-robin by requester, so a customer
+    with many queued requests can't starve the others.
+Waiting longer than queue_timeout raises ERPBusyError.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from flask import g, has_app_context
+from config import Config
+from .erp_circuit_breaker import ERPUnavailableError
+
+
+class ERPBusyError(ERPUnavailableError):
+    """Raised when an inventory query can't get an ERP slot (or the customer is over its limit)."""
+
+
+def current_requester():
+    """Who is asking: 'customer:<id>', 'admin', or None for background work (prefetch, prewarm)."""
+    if not has_app_context():
+        return None
+    customer = g.get('customer')
+    if customer:
+        return f"customer:{customer.get('customer_id')}"
+    if g.get('admin'):
+        return 'admin'
+    return None
+
+
+class FairQueryGate:
+    """Per-requester admission limit plus a round-robin queue for a fixed number of query slots."""
+
+    def __init__(self, global_limit, per_requester_limit, queue_timeout):
+        self.global_limit = global_limit
+        self.per_requester_limit = per_requester_limit
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._running = 0
+        self._waiting = OrderedDict() # requester -> deque of tickets; first key is next in turn
+        self._admitted = {} # requester -> requests currently inside admit()
+
+    @contextmanager
+    def admit(self, requester):
+        """
+        Counts a request against its requester's limit for the duration of the block.
+        Raises ERPBusyError at once if the requester is already at the limit.
+        Background work (requester None) is not limited here.
+        """
+        if requester is None:
+            yield
+            return
+        with self._cond:
+            if self._admitted.get(requester, 0) >= self.per_requester_limit:
+                raise ERPBusyError(f"Too many inventory requests in progress for {requester}.")
+            self._admitted[requester] = self._admitted.get(requester, 0) + 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._admitted[requester] -= 1
+                if not self._admitted[requester]:
+                    del self._admitted[requester]
+
+    @contextmanager
+    def slot(self, requester):
+        """Holds one of the global query slots for the duration of the block."""
+        self._acquire(requester)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._cond.notify_all()
+
+    def _acquire(self, requester):
+        with self._cond:
+            if self._running < self.global_limit and not self._waiting:
+                self._running += 1
+                return
+            ticket = object()
+            self._waiting.setdefault(requester, deque()).append(ticket)
+            deadline = time.monotonic() + self.queue_timeout
+            while True:
+                if self._running < self.global_limit and self._next_ticket() is ticket:
+                    self._dequeue(requester, rotate=True)
+                    self._running += 1
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting[requester].remove(ticket)
+                    self._dequeue(requester, rotate=False)
+                    self._cond.notify_all() # The next ticket may be eligible now
+                    raise ERPBusyError("Timed out waiting for an ERP query slot.")
+                self._cond.wait(remaining)
+
+    def _next_ticket(self):
+        for tickets in self._waiting.values():
+            return tickets[0]
+        return None
+
+    def _dequeue(self, requester, rotate):
+        """Removes the granted ticket (if rotate) and gives the requester's next ticket the back of the line."""
+        tickets = self._waiting[requester]
+        if rotate:
+            tickets.popleft()
+        if not tickets:
+            del self._waiting[requester]
+        elif rotate:
+            self._waiting.move_to_end(requester)
+
+    def status(self):
+        """Snapshot for diagnostics."""
+        with self._cond:
+            return {
+                'running': self._running,
+                'global_limit': self.global_limit,
+                'queued': sum(len(tickets) for tickets in self._waiting.values()),
+                'queued_requesters': len(self._waiting),
+                'admitted': dict(self._admitted),
+            }
+
+
+# Singleton instance
+erp_fairness = FairQueryGate(
+    global_limit=Config.ERP_INVENTORY_QUERY_LIMIT,
+    per_requester_limit=Config.ERP_INVENTORY_PER_CUSTOMER_LIMIT,
+    queue_timeout=Config.ERP_INVENTORY_QUEUE_TIMEOUT
+)
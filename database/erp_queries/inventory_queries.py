@@ -2,40 +2,21 @@
 """
 ERP Queries related to Customer Inventory.
 """
+import logging
+from config import Config
 from database.erp_connection_base import get_erp_db_connection
+from database.erp_sharded_query import iter_sharded_query
+from database.erp_dimensions import erp_dimensions
+from database.erp_records import record_class
+from database.inventory_table import INVENTORY_COLUMNS
+from utils.logging_setup import SAMPLED
 
-class ERPInventoryQueries:
-    """Contains ERP query methods specific to Customer Inventory."""
+logger = logging.getLogger(__name__)
 
-    def get_inventory_by_customer(self, erp_customer_name):
-        """
-        Retrieves inventory details.
-        If erp_customer_name is 'All', fetches for all customers.
-        If erp_customer_name is a '|' delimited string, fetches for that list.
-        """
-        db = get_erp_db_connection()
-        if not db:
-            print("❌ [ERP Inventory] Failed to get ERP DB connection.")
-            return []
 
-        # === MODIFICATION: Updated SQL Query ===
-        
-        # The main SQL query provided by the user, without the customer filter
-        sql_base = """
-            SELECT
-                ISNULL(dmpr1.p1_name, '') AS Customer,
-                dmprod.pr_codenum AS Part,
-                '' AS Customer_Part, -- Placeholder, adjust if data exists
-                dmprod.pr_descrip AS Description,
-                dtfifo.fi_balance AS On_Hand_Qty,
-                ISNULL(dmunit.un_name, '') AS Unit,
-                dmloc.lo_name AS BIN,
-                dtfifo.fi_attrib2 AS Reference,
-                dtfifo.fi_userlot AS User_Lot,
-                CONVERT(VARCHAR(10), dtfifo.fi_expires, 101) AS Exp_Date,
-                CONVERT(VARCHAR(10), dtfifo.fi_date, 101) AS Last_Transaction_Date,
-                CONVERT(VARCHAR(10), dtfifo.fi_lotdate, 101) AS Last_Rec_Date,
-                CASE
+# Per-lot PO (from the job that produced the lot) and status, shared by the
+# joined inventory query and the facts-only query
+_PO_SQL = """CASE
                     WHEN EXISTS (
                         SELECT 1
                         FROM dtfifo f2
@@ -55,8 +36,9 @@ class ERPInventoryQueries:
                         ORDER BY lj.lj_jobnum DESC -- MODIFIED ORDER BY
                     ), 'N/A')
                     ELSE 'N/A'
-                END AS PO,
-                CASE 
+                END"""
+
+_STATUS_SQL = """CASE 
                     WHEN dtfifo.fi_type = 'quarantine' THEN 'Quarantined'
                     WHEN dtfifo.fi_type = 'job' THEN 'Issued to Job'
                     WHEN dtfifo.fi_type = 'sal-reserv' THEN 'Sales Reserved'
@@ -70,7 +52,72 @@ class ERPInventoryQueries:
                     WHEN dtfifo.fi_qc = 'Pending' THEN 'Pending QC'
                     WHEN (fi_qc = '' OR fi_qc IS NULL) THEN 'Approved QC'
                     ELSE 'Available'
-                END AS Status
+                END"""
+
+
+def _all_inventory_sort_key(record):
+    """
+    Case-insensitive (Customer, Part, User_Lot, BIN) order for rows sorted in Python.
+    Close to, but not the same as, the 'All' query's ORDER BY under SQL Server's
+    collation (accents and punctuation can sort differently). BIN breaks the tie
+    between the parts of a lot stored in several bins, so the order does not
+    depend on which shard or fetch returned a row first.
+    """
+    return ((record.Customer or '').casefold(), (record.Part or '').casefold(),
+            (record.User_Lot or '').casefold(), (record.BIN or '').casefold())
+
+def _single_customer_sort_key(record):
+    """Case-insensitive (Part, User_Lot, BIN) order, close to the single-customer ORDER BY."""
+    return ((record.Part or '').casefold(), (record.User_Lot or '').casefold(), (record.BIN or '').casefold())
+
+class ERPInventoryQueries:
+    """Contains ERP query methods specific to Customer Inventory."""
+
+    def get_inventory_by_customer(self, erp_customer_name, raise_errors=False):
+        """
+        Retrieves inventory details as a list of ERPRecord objects
+        (dict-style and attribute access).
+        With raise_errors=True, query failures raise instead of returning [].
+        """
+        try:
+            results = list(self.iter_inventory_by_customer(erp_customer_name))
+        except Exception as e:
+            logger.error(f"[ERP Inventory] Query failed for: {erp_customer_name} ({e})")
+            if raise_errors:
+                raise
+            return []
+        logger.info("[ERP Inventory] Found %d inventory records.", len(results), extra=SAMPLED)
+        return results
+
+    def iter_inventory_by_customer(self, erp_customer_name):
+        """
+        Streams inventory details as ERPRecord objects, without building a list.
+        If erp_customer_name is 'All', fetches for all customers.
+        If erp_customer_name is a '|' delimited string, fetches for that list.
+        Errors are raised (while iterating, for query failures).
+        """
+        if Config.ERP_FACTS_ONLY_INVENTORY and erp_customer_name:
+            return self.iter_inventory_facts_by_customer(erp_customer_name)
+
+        # === MODIFICATION: Updated SQL Query ===
+        
+        # The main SQL query provided by the user, without the customer filter
+        sql_base = f"""
+            SELECT
+                ISNULL(dmpr1.p1_name, '') AS Customer,
+                dmprod.pr_codenum AS Part,
+                '' AS Customer_Part, -- Placeholder, adjust if data exists
+                dmprod.pr_descrip AS Description,
+                dtfifo.fi_balance AS On_Hand_Qty,
+                ISNULL(dmunit.un_name, '') AS Unit,
+                dmloc.lo_name AS BIN,
+                dtfifo.fi_attrib2 AS Reference,
+                dtfifo.fi_userlot AS User_Lot,
+                dtfifo.fi_expires AS Exp_Date, -- Native dates; formatted for display in the browser
+                dtfifo.fi_date AS Last_Transaction_Date,
+                dtfifo.fi_lotdate AS Last_Rec_Date,
+                {_PO_SQL} AS PO,
+                {_STATUS_SQL} AS Status
             FROM dtfifo
             INNER JOIN dmprod ON dtfifo.fi_prid = dmprod.pr_id
             LEFT JOIN dmpr1 ON dmprod.pr_user5 = dmpr1.p1_id
@@ -83,14 +130,23 @@ class ERPInventoryQueries:
         sql_filter = ""
         
         if not erp_customer_name:
-             print("❌ [ERP Inventory] Query called with no customer name.")
-             return []
+             logger.error("[ERP Inventory] Query called with no customer name.")
+             return iter(())
         
         if erp_customer_name == "All":
             # No additional filter, but log it
-            print(f"ℹ️ [ERP Inventory] Fetching ALL inventory records for 'All' account.")
+            logger.info("[ERP Inventory] Fetching ALL inventory records for 'All' account.", extra=SAMPLED)
             # We add p1_name to the sort order for 'All' accounts
-            sql_sort = " ORDER BY dmpr1.p1_name, dmprod.pr_codenum, dtfifo.fi_userlot;"
+            sql_sort = " ORDER BY dmpr1.p1_name, dmprod.pr_codenum, dtfifo.fi_userlot, dmloc.lo_name;"
+            shards = Config.ERP_ALL_QUERY_SHARDS
+            if shards > 1:
+                # Disjoint slices by product id, run in parallel; the combined rows are sorted in Python
+                logger.info("[ERP Inventory] Running 'All' query as %d parallel shards.", shards, extra=SAMPLED)
+                shard_sql = sql_base + " AND ABS(dtfifo.fi_prid) % ? = ?;"
+                return iter_sharded_query(
+                    [(shard_sql, [shards, shard]) for shard in range(shards)],
+                    sort_key=_all_inventory_sort_key
+                )
         
         elif "|" in erp_customer_name:
             # Multiple customers
@@ -98,27 +154,104 @@ class ERPInventoryQueries:
             placeholders = ", ".join("?" for _ in customer_list)
             sql_filter = f" AND dmpr1.p1_name IN ({placeholders})"
             params.extend(customer_list)
-            print(f"ℹ️ [ERP Inventory] Fetching inventory for {len(customer_list)} customers.")
+            logger.info("[ERP Inventory] Fetching inventory for %d customers.", len(customer_list), extra=SAMPLED)
             # We add p1_name to the sort order for multi-customer accounts
-            sql_sort = " ORDER BY dmpr1.p1_name, dmprod.pr_codenum, dtfifo.fi_userlot;"
+            sql_sort = " ORDER BY dmpr1.p1_name, dmprod.pr_codenum, dtfifo.fi_userlot, dmloc.lo_name;"
         
         else:
             # Single customer (legacy or just one selected)
             sql_filter = " AND dmpr1.p1_name = ?"
             params.append(erp_customer_name)
-            print(f"ℹ️ [ERP Inventory] Fetching inventory for single customer: {erp_customer_name}")
-            sql_sort = " ORDER BY dmprod.pr_codenum, dtfifo.fi_userlot;" # Original sort
+            logger.info("[ERP Inventory] Fetching inventory for single customer: %s", erp_customer_name, extra=SAMPLED)
+            sql_sort = " ORDER BY dmprod.pr_codenum, dtfifo.fi_userlot, dmloc.lo_name;" # Original sort, BIN as tiebreak
 
         # Combine the query
         sql = sql_base + sql_filter + sql_sort
         # === END MODIFICATION ===
 
-        results = db.execute_query(sql, params)
-        if results is None: # Handle query execution failure
-             print(f"❌ [ERP Inventory] Query failed for: {erp_customer_name}")
-             return []
-        print(f"ℹ️ [ERP Inventory] Found {len(results)} inventory records.")
-        return results
+        db = get_erp_db_connection()
+        if not db:
+            logger.error("[ERP Inventory] Failed to get ERP DB connection.")
+            return iter(())
+
+        # Stream the rows straight into compact records: the full result is never
+        # held as raw driver rows and dicts at the same time.
+        return db.iter_query(sql, params)
+
+    def iter_inventory_facts_by_customer(self, erp_customer_name):
+        """
+        Same records as iter_inventory_by_customer, but the ERP only returns
+        dtfifo ids and measures; product, customer, unit and location names are
+        joined in-process from the local dimension cache. Rows are sorted with
+        the case-insensitive keys above, which can differ from the joined
+        query's collation order for accented or punctuated names.
+        """
+        erp_dimensions.ensure_fresh()
+
+        sql = f"""
+            SELECT
+                dtfifo.fi_prid AS Product_Id,
+                dtfifo.fi_loid AS Location_Id,
+                dtfifo.fi_balance AS On_Hand_Qty,
+                dtfifo.fi_attrib2 AS Reference,
+                dtfifo.fi_userlot AS User_Lot,
+                dtfifo.fi_expires AS Exp_Date,
+                dtfifo.fi_date AS Last_Transaction_Date,
+                dtfifo.fi_lotdate AS Last_Rec_Date,
+                {_PO_SQL} AS PO,
+                {_STATUS_SQL} AS Status
+            FROM dtfifo
+            WHERE dtfifo.fi_balance > 0
+        """
+        params = []
+        if erp_customer_name == "All":
+            logger.info("[ERP Inventory] Fetching ALL inventory facts for 'All' account.", extra=SAMPLED)
+            sort_key = _all_inventory_sort_key
+        else:
+            customer_list = erp_customer_name.split('|')
+            group_ids = erp_dimensions.customer_group_ids(customer_list)
+            if not group_ids:
+                # Possibly a group created since the last load: reload once before giving up
+                erp_dimensions.refresh(force=True)
+                group_ids = erp_dimensions.customer_group_ids(customer_list)
+            if not group_ids:
+                logger.info("[ERP Inventory] No ERP customer group matches: %s", erp_customer_name, extra=SAMPLED)
+                return iter(())
+            placeholders = ", ".join("?" for _ in group_ids)
+            sql += f" AND dtfifo.fi_prid IN (SELECT pr_id FROM dmprod WHERE pr_user5 IN ({placeholders}))"
+            params.extend(group_ids)
+            logger.info("[ERP Inventory] Fetching inventory facts for %d customer(s).", len(customer_list), extra=SAMPLED)
+            sort_key = _all_inventory_sort_key if len(customer_list) > 1 else _single_customer_sort_key
+
+        db = get_erp_db_connection()
+        if not db:
+            logger.error("[ERP Inventory] Failed to get ERP DB connection.")
+            return iter(())
+
+        facts = list(db.iter_query(sql, params))
+        products, locations = erp_dimensions.products, erp_dimensions.locations
+        if any(fact.Product_Id not in products or fact.Location_Id not in locations for fact in facts):
+            # Facts newer than the cached dimensions: reload once before joining
+            erp_dimensions.refresh(force=True)
+        return iter(sorted(self._join_dimensions(facts), key=sort_key))
+
+    @staticmethod
+    def _join_dimensions(facts):
+        """Yields inventory records for the facts (INNER JOIN on product/location, LEFT JOIN on group/unit)."""
+        products, locations = erp_dimensions.products, erp_dimensions.locations
+        groups, units = erp_dimensions.customer_groups, erp_dimensions.units
+        make_record = record_class(INVENTORY_COLUMNS)._make
+        for fact in facts:
+            product = products.get(fact.Product_Id)
+            location = locations.get(fact.Location_Id)
+            if product is None or location is None:
+                continue
+            yield make_record((
+                groups.get(product.group_id, ''), product.part, '', product.description,
+                fact.On_Hand_Qty, units.get(product.unit_id, ''), location,
+                fact.Reference, fact.User_Lot, fact.Exp_Date, fact.Last_Transaction_Date,
+                fact.Last_Rec_Date, fact.PO, fact.Status,
+            ))
 
     def get_all_erp_customer_names(self):
         """
@@ -126,7 +259,7 @@ class ERPInventoryQueries:
         """
         db = get_erp_db_connection()
         if not db:
-            print("❌ [ERP Customer List] Failed to get ERP DB connection.")
+            logger.error("[ERP Customer List] Failed to get ERP DB connection.")
             return []
 
         # New query to get all distinct customer names
@@ -138,7 +271,7 @@ class ERPInventoryQueries:
         """
         results = db.execute_query(sql)
         if results is None:
-             print("❌ [ERP Customer List] Query failed.")
+             logger.error("[ERP Customer List] Query failed.")
              return []
         
         # Extract just the names from the list of dicts
@@ -0,0 +1,50 @@
+# customer_portal/database/erp_records.py
+"""
+Compact row objects for ERP query results.
+One record class is created per column schema and shared by every row of
+that shape, so a row costs about as much as a tuple instead of a dict.
+Records still support the dict-style access the rest of the app uses
+(row['Part'], row.get('BIN'), row.items()) as well as attributes (row.Part).
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+
+
+class _RecordMixin:
+    """Dict-style helpers layered on top of a namedtuple."""
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise KeyError(key)
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        if key in self._fields:
+            return getattr(self, key)
+        return default
+
+    def keys(self):
+        return self._fields
+
+    def values(self):
+        return tuple(self)
+
+    def items(self):
+        return zip(self._fields, self)
+
+    def to_dict(self):
+        return dict(zip(self._fields, self))
+
+
+@lru_cache(maxsize=64)
+def record_class(columns):
+    """
+    Returns the record class for a tuple of column names.
+    Column names must be valid Python identifiers (the ERP queries alias every column).
+    """
+    base = namedtuple('ERPRecord', columns)
+    return type('ERPRecord', (_RecordMixin, base), {'__slots__': ()})
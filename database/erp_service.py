@@ -3,8 +3,26 @@
 ERP Service Layer for Customer Portal
 Acts as a facade, coordinating calls to specific ERP query modules.
 """
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from config import Config
 from .erp_connection_base import get_erp_db_connection
 from .erp_queries import ERPInventoryQueries
+from .erp_fairness import erp_fairness, current_requester, ERPBusyError
+from .inventory_cache import inventory_cache
+from .inventory_table import InventoryTable
+from .customer_data import customer_db
+from utils.metrics import timed, INVENTORY_FETCH_DURATION, INVENTORY_PREWARM_DURATION
+from utils.tracing import span
+from utils.logging_setup import SAMPLED
+
+logger = logging.getLogger(__name__)
+
+_PREFETCH_WORKERS = 4 # Concurrent login-time prefetches (further ones queue)
 
 class ErpService:
     """Contains business logic for querying the ERP database."""
@@ -12,13 +30,164 @@ class ErpService:
     def __init__(self):
         # Instantiate query classes. They use the shared connection internally.
         self.inventory_queries = ERPInventoryQueries()
+        # One ERP fetch per account at a time; concurrent callers wait for its result
+        self._inflight = {} # erp_customer_name -> Future[InventorySnapshot]
+        self._inflight_lock = threading.Lock()
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=_PREFETCH_WORKERS, thread_name_prefix='inventory-prefetch')
 
     def get_customer_inventory(self, erp_customer_name):
         """Fetches inventory filtered by customer name."""
         if not erp_customer_name:
-            print("⚠️ [ERP Service] Called get_customer_inventory without customer name.")
+            logger.warning("[ERP Service] Called get_customer_inventory without customer name.")
             return []
-        return self.inventory_queries.get_inventory_by_customer(erp_customer_name)
+        return self.get_customer_inventory_snapshot(erp_customer_name).rows
+
+    def get_customer_inventory_snapshot(self, erp_customer_name, prewarmed=False):
+        """
+        Fetches inventory and returns it as an InventorySnapshot wrapping an InventoryTable.
+        If the ERP is unavailable (circuit open, timeout, connection lost),
+        the last good snapshot for this account is returned with is_stale=True.
+        Raises the original error when there is nothing cached to fall back to.
+        If a fetch for the same account is already running (e.g. a login
+        prefetch), this waits for and returns its result instead of starting another.
+        Requests are subject to erp_fairness: a customer over its limit of
+        concurrent requests (or a query that can't get an ERP slot in time)
+        gets the last good snapshot, or ERPBusyError if there is none.
+        """
+        requester = current_requester()
+        try:
+            with erp_fairness.admit(requester):
+                return self._load_inventory_snapshot(erp_customer_name, prewarmed, requester)
+        except ERPBusyError as e:
+            stale = inventory_cache.get_stale(erp_customer_name)
+            if stale is None:
+                raise
+            logger.warning(f"[ERP Service] {e} Serving cached data for '{erp_customer_name}'.")
+            return stale
+
+    def _load_inventory_snapshot(self, erp_customer_name, prewarmed, requester):
+        """Single-flight wrapper: starts the fetch for this account or joins the one running."""
+        with self._inflight_lock:
+            future = self._inflight.get(erp_customer_name)
+            is_owner = future is None
+            if is_owner:
+                future = self._inflight[erp_customer_name] = Future()
+        if not is_owner:
+            logger.info("[ERP Service] Joining in-flight inventory fetch for '%s'.", erp_customer_name, extra=SAMPLED)
+            return future.result()
+
+        try:
+            snapshot = self._fetch_inventory_snapshot(erp_customer_name, prewarmed, requester)
+            future.set_result(snapshot)
+            return snapshot
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[erp_customer_name]
+
+    def _fetch_inventory_snapshot(self, erp_customer_name, prewarmed=False, requester=None):
+        """Queries the ERP (in a fair-queued slot) and caches the result (or falls back to the stale copy)."""
+        try:
+            with span('Inventory fetch', 'erp', account=erp_customer_name), erp_fairness.slot(requester), \
+                    timed(INVENTORY_FETCH_DURATION, account=erp_customer_name):
+                # Rows stream from the cursor straight into the columnar table
+                table = InventoryTable.from_records(self.inventory_queries.iter_inventory_by_customer(erp_customer_name))
+            logger.info("[ERP Service] Loaded %d inventory records for '%s'.", len(table), erp_customer_name, extra=SAMPLED)
+            return inventory_cache.store(erp_customer_name, table, prewarmed=prewarmed)
+        except Exception as e:
+            stale = inventory_cache.get_stale(erp_customer_name)
+            if stale is None:
+                raise
+            logger.warning(f"[ERP Service] ERP fetch failed for '{erp_customer_name}' ({e}). "
+                           f"Serving cached data from {stale.fetched_at:%Y-%m-%d %H:%M:%S} UTC.")
+            return stale
+
+    def get_cached_inventory_snapshot(self, erp_customer_name):
+        """
+        Returns the snapshot last loaded for this account (what the inventory
+        page is showing), fetching from the ERP only if nothing is cached.
+        Used by the page's API calls so they don't re-query the ERP.
+        """
+        snapshot = inventory_cache.get(erp_customer_name)
+        if snapshot is None:
+            snapshot = self.get_customer_inventory_snapshot(erp_customer_name)
+        return snapshot
+
+    def get_recent_inventory_snapshot(self, erp_customer_name):
+        """
+        Returns the cached snapshot if it was fetched within
+        INVENTORY_PREFETCH_MAX_AGE_SECONDS (typically by the login prefetch),
+        or within INVENTORY_PREWARM_MAX_AGE_SECONDS if the scheduled prewarm
+        fetched it; otherwise fetches (or joins the fetch already running).
+        """
+        snapshot = inventory_cache.get(erp_customer_name)
+        if snapshot is not None:
+            max_age = Config.INVENTORY_PREWARM_MAX_AGE_SECONDS if snapshot.prewarmed else Config.INVENTORY_PREFETCH_MAX_AGE_SECONDS
+            if datetime.utcnow() - snapshot.fetched_at <= timedelta(seconds=max_age):
+                return snapshot
+        return self.get_customer_inventory_snapshot(erp_customer_name)
+
+    def prefetch_customer_inventory(self, app, erp_customer_name):
+        """
+        Starts loading the account's inventory into the cache in the background
+        (inside an app context of 'app'). Skipped when a fetch is already
+        running or the cached copy is still recent. Returns True if started.
+        """
+        if not Config.INVENTORY_PREFETCH_ENABLED or not erp_customer_name:
+            return False
+        with self._inflight_lock:
+            if erp_customer_name in self._inflight:
+                return False
+        snapshot = inventory_cache.get(erp_customer_name)
+        if snapshot is not None and datetime.utcnow() - snapshot.fetched_at <= timedelta(seconds=Config.INVENTORY_PREFETCH_MAX_AGE_SECONDS):
+            return False
+        self._prefetch_executor.submit(self._prefetch, app, erp_customer_name)
+        return True
+
+    def _prefetch(self, app, erp_customer_name):
+        with app.app_context(): # Own 'g', so the ERP connection is opened and closed for this thread
+            try:
+                self.get_customer_inventory_snapshot(erp_customer_name)
+                logger.info(f"[ERP Service] Prefetched inventory for '{erp_customer_name}'.")
+            except Exception as e:
+                logger.warning(f"[ERP Service] Inventory prefetch failed for '{erp_customer_name}': {e}")
+
+    def prewarm_inventory(self, app):
+        """
+        Scheduled job: refreshes the cached snapshot of every distinct ERP
+        customer set of the active customers, plus 'All'. At most
+        INVENTORY_PREWARM_CONCURRENCY sets are fetched at once, each after a
+        random delay of up to INVENTORY_PREWARM_JITTER_SECONDS.
+        """
+        with app.app_context():
+            accounts = set(customer_db.get_distinct_erp_customer_names())
+        accounts.add('All')
+        logger.info(f"[Inventory Prewarm] Refreshing {len(accounts)} ERP customer sets...")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=Config.INVENTORY_PREWARM_CONCURRENCY, thread_name_prefix='inventory-prewarm') as executor:
+            results = list(executor.map(lambda account: self._prewarm_account(app, account), sorted(accounts)))
+        logger.info(f"[Inventory Prewarm] {sum(results)}/{len(results)} sets refreshed in {time.perf_counter() - started:.1f}s.")
+
+    def _prewarm_account(self, app, erp_customer_name):
+        time.sleep(random.uniform(0, Config.INVENTORY_PREWARM_JITTER_SECONDS))
+        started = time.perf_counter()
+        with app.app_context():
+            try:
+                snapshot = self.get_customer_inventory_snapshot(erp_customer_name, prewarmed=True)
+                ok = not snapshot.is_stale # Stale means the ERP fetch failed
+            except Exception as e:
+                logger.warning(f"[Inventory Prewarm] '{erp_customer_name}' failed: {e}")
+                ok = False
+        elapsed = time.perf_counter() - started
+        INVENTORY_PREWARM_DURATION.observe(elapsed, account=erp_customer_name)
+        logger.info(f"[Inventory Prewarm] '{erp_customer_name}': {'ok' if ok else 'failed'} in {elapsed:.2f}s.")
+        return ok
+
+    def shutdown(self):
+        """Cancels queued login prefetches and waits for the running ones (at process shutdown)."""
+        self._prefetch_executor.shutdown(wait=True, cancel_futures=True)
 
     def get_all_customer_names(self):
         """Fetches a list of all distinct ERP customer names."""
@@ -31,10 +200,15 @@ def get_erp_service():
     """Gets the global singleton instance of the ErpService."""
     global _erp_service_instance
     if _erp_service_instance is None:
-        print("ℹ️ Creating new ErpService instance.")
+        logger.info("Creating new ErpService instance.")
         _erp_service_instance = ErpService()
     return _erp_service_instance
 
+def shutdown_prefetch():
+    """Lets in-flight prefetches finish before the process exits (no-op if the service was never created)."""
+    if _erp_service_instance is not None:
+        _erp_service_instance.shutdown()
+
 # Optional: Function to explicitly close the connection if needed
 def close_erp_connection():
     """Explicitly closes the shared ERP database connection."""
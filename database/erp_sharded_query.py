@@ -0,0 +1,51 @@
+# customer_portal/database/erp_sharded_query.py
+"""
+Sharded ERP query execution
+Runs several disjoint slices of one query concurrently, each on its own
+pooled ERP connection, then sorts the combined rows in Python with a
+single key. The slices are not merged by their SQL ORDER BY: SQL Server's
+case-insensitive collation does not order strings the way any Python key
+does, and a k-way merge of slices sorted by a different key is not sorted.
+Each slice is fetched in full as soon as it is ready, so no slice keeps
+its cursor (and its locks) open while waiting for the others. Each slice
+is released as soon as it is copied into the combined list, which is then
+sorted in place, so there is never a second full copy of the rows.
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from .erp_connection_pool import erp_pool
+
+
+def _fetch_slice(sql, params, pool):
+    with pool.connection() as db:
+        return list(db.iter_query(sql, params))
+
+
+def iter_sharded_query(shard_queries, sort_key, pool=None):
+    """
+    Generator over the combined results of several query slices, in sort_key order.
+    Args:
+        shard_queries: list of (sql, params); the slices need no ORDER BY
+        sort_key: function mapping a record to its sort key (the only ordering applied)
+        pool: ERPConnectionPool to borrow from (defaults to the shared pool)
+    The slices only start running when iteration begins. If any slice fails,
+    the error is raised from the generator.
+    """
+    pool = pool or erp_pool
+    with ThreadPoolExecutor(max_workers=len(shard_queries), thread_name_prefix='erp-shard') as executor:
+        # Each slice runs in a copy of the caller's context, so its query span joins the request's trace
+        futures = [executor.submit(contextvars.copy_context().run, _fetch_slice, sql, params, pool)
+                   for sql, params in shard_queries]
+        rows = []
+        try:
+            for i, future in enumerate(futures):
+                rows.extend(future.result())
+                futures[i] = None # Drop the future, and with it the slice list, once copied
+        except Exception:
+            for future in futures:
+                if future is not None:
+                    future.cancel()
+            raise
+    rows.sort(key=sort_key) # In place: no sorted copy next to the combined list
+    yield from rows
@@ -0,0 +1,90 @@
+# customer_portal/database/facet_index.py
+"""
+Inverted facet index over an InventoryTable
+For each Part / BIN / Status value it keeps the sorted row ids holding that
+value (one CSR-style array per column). The options and counts left in each
+dropdown for any combination of selections come from intersecting those
+row-id lists, so the work scales with the selected rows rather than with
+the size of the inventory. With no selections the counts are precomputed.
+"""
+
+import numpy as np
+
+FACET_COLUMNS = ('Part', 'BIN', 'Status')
+
+
+class FacetIndex:
+    """Row-id postings per facet value, built once per inventory snapshot."""
+
+    def __init__(self, table, facet_columns=FACET_COLUMNS):
+        self.table = table
+        self.facet_columns = tuple(facet_columns)
+        self._row_ids = {} # column -> row ids grouped by code, ascending within each group
+        self._offsets = {} # column -> offsets[code]:offsets[code + 1] slices _row_ids
+        self._totals = {} # column -> row count per code with no filters applied
+        for name in self.facet_columns:
+            codes = table.codes(name)
+            counts = np.bincount(codes, minlength=len(table.categories(name)))
+            self._row_ids[name] = np.argsort(codes, kind='stable').astype(np.int32)
+            self._offsets[name] = np.concatenate(([0], np.cumsum(counts)))
+            self._totals[name] = counts
+
+    def memory_bytes(self):
+        """Bytes held by the index arrays."""
+        return sum(a.nbytes for arrays in (self._row_ids, self._offsets, self._totals) for a in arrays.values())
+
+    def rows_for(self, name, value):
+        """Sorted row ids whose column equals 'value' (empty if the value is unknown)."""
+        categories = self.table.categories(name)
+        code = int(np.searchsorted(categories, value))
+        if code >= len(categories) or categories[code] != value:
+            return np.empty(0, dtype=np.int32)
+        offsets = self._offsets[name]
+        return self._row_ids[name][offsets[code]:offsets[code + 1]]
+
+    @staticmethod
+    def _intersect(row_sets):
+        """Intersects sorted row-id arrays, smallest first. None means 'no constraint'."""
+        if not row_sets:
+            return None
+        row_sets = sorted(row_sets, key=len)
+        result = row_sets[0]
+        for rows in row_sets[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, rows, assume_unique=True)
+        return result
+
+    def _counts(self, name, rows):
+        if rows is None:
+            return self._totals[name]
+        return np.bincount(self.table.codes(name)[rows], minlength=len(self.table.categories(name)))
+
+    def query(self, selections, text_rows=None):
+        """
+        Computes dropdown options for the current selections.
+        Args:
+            selections: dict of facet column -> selected value ('' / None = not filtered)
+            text_rows: optional sorted row ids matching the free-text search
+        Returns: dict with 'matching' (rows matching everything) and 'facets'
+                 (column -> [[value, count], ...]). Each facet's counts apply every
+                 selection except its own, so the current choice stays listed.
+        """
+        selected = {name: self.rows_for(name, value)
+                    for name, value in selections.items() if value and name in self.facet_columns}
+        base = [] if text_rows is None else [text_rows]
+
+        facets = {}
+        for name in self.facet_columns:
+            rows = self._intersect(base + [ids for other, ids in selected.items() if other != name])
+            counts = self._counts(name, rows)
+            present = np.flatnonzero(counts)
+            values = self.table.categories(name)[present].tolist()
+            facets[name] = [[value, count] for value, count in zip(values, counts[present].tolist()) if value]
+
+        matching = self._intersect(base + list(selected.values()))
+        return {
+            'total': len(self.table),
+            'matching': len(self.table) if matching is None else len(matching),
+            'facets': facets,
+        }
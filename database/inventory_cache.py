@@ -0,0 +1,231 @@
+# customer_portal/database/inventory_cache.py
+"""
+Last-good inventory cache
+Keeps the most recent successful ERP inventory result per ERP customer
+account so it can still be shown (marked as stale) while the ERP is down.
+Snapshots are also persisted to the on-disk snapshot store (if configured)
+and restored from it on first use after a restart. Cached tables keep their
+columns compressed (see compressed_columns) and the grid payload gzipped.
+"""
+
+import gzip
+import threading
+from datetime import datetime, timedelta
+from config import Config
+from .facet_index import FacetIndex
+from .date_index import DateIndex
+from .search_index import SearchIndex, TrigramVocabulary
+from .inventory_payload import encode_inventory_payload
+from .snapshot_store import snapshot_store
+from utils.shared_cache import invalidation_bus
+
+
+class InventorySnapshot:
+    """One inventory result (as an InventoryTable) plus when it was fetched from the ERP."""
+
+    __slots__ = ('account', 'table', 'fetched_at', 'version', 'is_stale', 'vocabulary', 'prewarmed',
+                 '_facet_index', '_search_index', '_date_index', '_payload')
+
+    def __init__(self, account, table, fetched_at, version, is_stale=False, vocabulary=None):
+        self.account = account
+        self.table = table
+        self.fetched_at = fetched_at # UTC
+        self.version = version # Content hash, stable across identical results (used for ETags)
+        self.is_stale = is_stale
+        self.prewarmed = False # Last fetched by the scheduled prewarm (reused for longer by the page)
+        # Shared with this account's earlier snapshots
+        self.vocabulary = vocabulary if vocabulary is not None else TrigramVocabulary()
+        self._facet_index = None
+        self._search_index = None
+        self._date_index = None
+        self._payload = None
+
+    @property
+    def facet_index(self):
+        """The FacetIndex for this snapshot, built on first use."""
+        if self._facet_index is None:
+            self._facet_index = FacetIndex(self.table) # A racing duplicate build is harmless
+        return self._facet_index
+
+    @property
+    def search_index(self):
+        """The SearchIndex for this snapshot, built on first use (only new strings get trigram-indexed)."""
+        if self._search_index is None:
+            self._search_index = SearchIndex(self.table, self.vocabulary)
+        return self._search_index
+
+    @property
+    def date_index(self):
+        """The DateIndex (rows sorted by each date column) for this snapshot, built on first use."""
+        if self._date_index is None:
+            self._date_index = DateIndex(self.table)
+        return self._date_index
+
+    @property
+    def payload_gzip(self):
+        """The grid's column-oriented JSON payload, gzip-compressed (encoded on first use)."""
+        if self._payload is None:
+            self._payload = gzip.compress(encode_inventory_payload(self.table, self.version), compresslevel=6, mtime=0)
+        return self._payload
+
+    @property
+    def payload(self):
+        """The grid's payload as plain JSON bytes (decompressed on each call)."""
+        return gzip.decompress(self.payload_gzip)
+
+    def memory_usage(self):
+        """Approximate bytes held by this snapshot, by part (see InventoryTable.memory_usage)."""
+        usage = self.table.memory_usage()
+        usage['payload'] = len(self._payload) if self._payload is not None else 0
+        usage['indexes'] = sum(index.memory_bytes() for index in (self._facet_index, self._search_index, self._date_index)
+                               if index is not None)
+        return usage
+
+    @property
+    def rows(self):
+        """The result as a list of ERPRecords (materialized on each call)."""
+        return list(self.table)
+
+    def as_stale(self):
+        """Returns a copy flagged as stale (the table and built indexes are shared, not copied)."""
+        stale = InventorySnapshot(self.account, self.table, self.fetched_at, self.version,
+                                  is_stale=True, vocabulary=self.vocabulary)
+        stale._facet_index = self._facet_index
+        stale._search_index = self._search_index
+        stale._date_index = self._date_index
+        stale._payload = self._payload
+        return stale
+
+
+class InventoryCache:
+    """Thread-safe map of ERP account -> last successful InventorySnapshot."""
+
+    def __init__(self, max_age, persistence=None):
+        self.max_age = max_age # Snapshots older than this are never served
+        self.persistence = persistence # SnapshotStore, or None to keep snapshots in memory only
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def store(self, account, table, prewarmed=False):
+        """Records a fresh InventoryTable and returns its snapshot."""
+        version = table.content_hash()
+        if Config.INVENTORY_CACHE_COMPRESSION:
+            table = table.compressed()
+        with self._lock:
+            previous = self._snapshots.get(account)
+            if previous is not None and previous.version == version:
+                # Same data as last time: keep the built indexes, just refresh the timestamp
+                previous.fetched_at = datetime.utcnow()
+                previous.prewarmed = prewarmed
+                snapshot = previous
+            else:
+                snapshot = self._replace(account, table, version, previous, prewarmed)
+        if self.persistence is not None:
+            # Once the file is written, other worker processes drop their older copy and restore this one
+            fetched_at = snapshot.fetched_at.isoformat()
+            self.persistence.save(snapshot, on_saved=lambda: invalidation_bus.publish(
+                'inventory', account=account, version=version, fetched_at=fetched_at))
+        return snapshot
+
+    def _replace(self, account, table, version, previous, prewarmed):
+        """Stores a new snapshot for changed data (caller holds the lock)."""
+        vocabulary = previous.vocabulary if previous is not None else None
+        if vocabulary is not None and len(vocabulary) > 2 * vocabulary.live_strings + 10000:
+            vocabulary = None # Mostly strings from old snapshots; start over
+        snapshot = InventorySnapshot(account, table, datetime.utcnow(), version, vocabulary=vocabulary)
+        snapshot.prewarmed = prewarmed
+        self._snapshots[account] = snapshot
+        self._prune_expired()
+        return snapshot
+
+    def get(self, account):
+        """Returns the last snapshot stored for the account (as stored), or None if missing/expired."""
+        with self._lock:
+            snapshot = self._snapshots.get(account)
+        if snapshot is None:
+            snapshot = self._restore(account)
+        if snapshot is None or datetime.utcnow() - snapshot.fetched_at > self.max_age:
+            return None
+        return snapshot
+
+    def get_stale(self, account):
+        """
+        Returns the last good snapshot for the account flagged as stale,
+        or None if there is none younger than max_age.
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(account)
+        if snapshot is None:
+            snapshot = self._restore(account)
+            if snapshot is None:
+                return None
+        if datetime.utcnow() - snapshot.fetched_at > self.max_age:
+            with self._lock:
+                if self._snapshots.get(account) is snapshot:
+                    del self._snapshots[account]
+            return None
+        return snapshot.as_stale()
+
+    def sync(self, account, version, fetched_at):
+        """
+        Reconciles the in-memory snapshot with one another worker process
+        stored (and persisted): same data only takes the newer fetch time,
+        different data is dropped so the next request restores the new file.
+        """
+        fetched_at = datetime.fromisoformat(fetched_at)
+        with self._lock:
+            snapshot = self._snapshots.get(account)
+            if snapshot is None:
+                return
+            if snapshot.version == version:
+                snapshot.fetched_at = max(snapshot.fetched_at, fetched_at)
+            elif snapshot.fetched_at < fetched_at:
+                del self._snapshots[account]
+
+    def _restore(self, account):
+        """Loads the account's persisted snapshot (after a restart) into memory, if there is one."""
+        if self.persistence is None:
+            return None
+        loaded = self.persistence.load(account)
+        if loaded is None:
+            return None
+        table, stored = loaded
+        snapshot = InventorySnapshot(account, table, stored.fetched_at, stored.version)
+        snapshot.prewarmed = stored.prewarmed
+        with self._lock:
+            # Another thread may have stored (or restored) one meanwhile
+            return self._snapshots.setdefault(account, snapshot)
+
+    def clear(self):
+        """Drops every in-memory snapshot (persisted files are left alone)."""
+        with self._lock:
+            self._snapshots.clear()
+
+    def memory_report(self):
+        """Per-account memory accounting of the cached snapshots (bytes), largest first."""
+        with self._lock:
+            snapshots = list(self._snapshots.values())
+        report = []
+        for snapshot in snapshots:
+            usage = snapshot.memory_usage()
+            report.append({
+                'account': snapshot.account,
+                'rows': len(snapshot.table),
+                'compressed': snapshot.table.is_compressed,
+                'fetched_at': snapshot.fetched_at.isoformat() + 'Z',
+                'total_bytes': sum(usage.values()),
+                'vocabulary_bytes': snapshot.vocabulary.memory_bytes(),
+                **{f"{part}_bytes": size for part, size in usage.items()},
+            })
+        report.sort(key=lambda entry: entry['total_bytes'], reverse=True)
+        return report
+
+    def _prune_expired(self):
+        """Drops snapshots older than max_age (caller holds the lock)."""
+        cutoff = datetime.utcnow() - self.max_age
+        for account in [a for a, s in self._snapshots.items() if s.fetched_at < cutoff]:
+            del self._snapshots[account]
+
+
+# Singleton instance
+inventory_cache = InventoryCache(max_age=timedelta(hours=Config.ERP_STALE_MAX_AGE_HOURS), persistence=snapshot_store)
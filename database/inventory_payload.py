@@ -0,0 +1,64 @@
+# customer_portal/database/inventory_payload.py
+"""
+Column-oriented wire format for the inventory grid
+Encodes an InventoryTable as one JSON array per column instead of one
+object per row, so column names are sent once. Low-cardinality columns go
+out as a dictionary of distinct values plus integer codes (so does any
+other text column whose values mostly repeat), quantities as
+numbers and dates as days since 1970-01-01 (null when blank). Decoded in
+the browser by static/js/inventory_payload.js; bump PAYLOAD_FORMAT_VERSION
+whenever the layout changes so the client can refuse a format it can't read.
+"""
+
+import json
+import numpy as np
+from .inventory_table import CATEGORICAL_COLUMNS, NUMERIC_COLUMNS, DATE_COLUMNS, NO_DATE
+
+PAYLOAD_FORMAT = 'inventory-columns'
+PAYLOAD_FORMAT_VERSION = 1
+
+# Other text columns are dictionary-encoded too when their values repeat this much
+# (e.g. Description and Customer_Part, which repeat for every lot of a part)
+_DICT_MAX_DISTINCT_RATIO = 0.5
+
+
+def _encode_column(table, name):
+    if name in CATEGORICAL_COLUMNS:
+        return {
+            'name': name,
+            'encoding': 'dict',
+            'values': table.categories(name).tolist(),
+            'codes': table.codes(name).tolist(),
+        }
+    if name in DATE_COLUMNS:
+        # The table already stores epoch days
+        return {'name': name, 'encoding': 'date',
+                'data': [None if day == NO_DATE else day for day in table.days(name).tolist()]}
+    values = table.column(name)
+    if name in NUMERIC_COLUMNS:
+        return {'name': name, 'encoding': 'number', 'data': values.tolist()}
+    if len(values):
+        try:
+            distinct, codes = np.unique(values, return_inverse=True)
+        except TypeError: # Mixed types can't be ordered; send as plain text
+            distinct = None
+        if distinct is not None and len(distinct) <= len(values) * _DICT_MAX_DISTINCT_RATIO:
+            return {'name': name, 'encoding': 'dict', 'values': distinct.tolist(),
+                    'codes': codes.reshape(-1).tolist()}
+    return {'name': name, 'encoding': 'text', 'data': values.tolist()}
+
+
+def encode_inventory_payload(table, version):
+    """
+    Returns the UTF-8 JSON payload for a table:
+    {format, format_version, success, version, row_count, columns: [{name, encoding, ...}]}
+    """
+    payload = {
+        'success': True,
+        'format': PAYLOAD_FORMAT,
+        'format_version': PAYLOAD_FORMAT_VERSION,
+        'version': version,
+        'row_count': len(table),
+        'columns': [_encode_column(table, name) for name in table.columns],
+    }
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
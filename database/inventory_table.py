@@ -0,0 +1,320 @@
+# customer_portal/database/inventory_table.py
+"""
+Columnar in-memory inventory table
+Stores an ERP inventory result column-wise: quantities as a float64 array,
+low-cardinality text (Customer, Part, Unit, BIN, Status) dictionary-encoded
+as integer codes into a sorted category array, everything else as object
+arrays. Dates are stored as int32 days since 1970-01-01. Filtering,
+multi-column sorting and facet counts are vectorized; sorting orders rows
+the way the browser grid does (inventory_worker.js). A table can also keep
+its columns as compressed blocks (see compressed_columns), decoded on access.
+"""
+
+import hashlib
+from datetime import date, datetime, timedelta
+import numpy as np
+from .erp_records import record_class
+from .compressed_columns import CompressedColumns, encode_block, array_bytes
+
+# Column order produced by ERPInventoryQueries.get_inventory_by_customer
+INVENTORY_COLUMNS = (
+    'Customer', 'Part', 'Customer_Part', 'Description', 'On_Hand_Qty', 'Unit', 'BIN',
+    'Reference', 'User_Lot', 'Exp_Date', 'Last_Transaction_Date', 'Last_Rec_Date', 'PO', 'Status',
+)
+CATEGORICAL_COLUMNS = frozenset(('Customer', 'Part', 'Unit', 'BIN', 'Status'))
+NUMERIC_COLUMNS = frozenset(('On_Hand_Qty',))
+DATE_COLUMNS = frozenset(('Exp_Date', 'Last_Transaction_Date', 'Last_Rec_Date')) # Native ERP datetimes
+
+# Rows decoded per block when iterating, so iteration never materializes a whole column
+_ITER_BLOCK = 5000
+
+EPOCH = date(1970, 1, 1)
+NO_DATE = np.iinfo(np.int32).min # Epoch-day value stored for blank dates
+_BLANK_DATE_SORT = np.iinfo(np.int32).max # Blank dates sort after every real day, like the grid's NO_DATE
+
+
+def to_epoch_day(value):
+    """date/datetime (or an ISO / MM/DD/YYYY string) -> days since 1970-01-01, NO_DATE for blanks/garbage."""
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return (value - EPOCH).days
+    if isinstance(value, str) and value:
+        # Older ODBC drivers return DATE columns as strings
+        for fmt in ('%Y-%m-%d', '%m/%d/%Y'):
+            try:
+                return (datetime.strptime(value[:10], fmt).date() - EPOCH).days
+            except ValueError:
+                continue
+    return NO_DATE
+
+
+def from_epoch_day(day):
+    """Days since 1970-01-01 -> date, or None for NO_DATE."""
+    if day == NO_DATE:
+        return None
+    return EPOCH + timedelta(days=int(day))
+
+
+def _text_ranks(values):
+    """Rank of each value by its trimmed, lowercased text (equal text = equal rank; None counts as '')."""
+    lowered = ['' if value is None else str(value).strip().lower() for value in values]
+    _, ranks = np.unique(np.array(lowered, dtype=object), return_inverse=True)
+    return ranks.reshape(-1).astype(np.int64)
+
+
+class InventoryTable:
+    """An immutable, column-oriented inventory result."""
+
+    def __init__(self, columns, data, categories, length):
+        self.columns = tuple(columns)
+        self._data = data # name -> ndarray (codes for categorical columns); dict or CompressedColumns
+        self._categories = categories # name -> sorted object ndarray of distinct values
+        self._length = length
+        self._sort_keys = {} # name -> int ndarray ranking each row, built on demand
+
+    # --- Construction ---
+
+    @classmethod
+    def from_records(cls, records, columns=None):
+        """
+        Builds a table in one pass over an iterable of records or dicts
+        (e.g. the ERPConnection.iter_query stream). The records themselves
+        are not retained.
+        """
+        values = None
+        for record in records:
+            if values is None:
+                columns = tuple(record.keys())
+                values = [[] for _ in columns]
+                appenders = [column_values.append for column_values in values]
+            for append, value in zip(appenders, record.values()):
+                append(value)
+
+        columns = tuple(columns or INVENTORY_COLUMNS)
+        if values is None:
+            values = [[] for _ in columns]
+
+        data, categories = {}, {}
+        for name, column_values in zip(columns, values):
+            if name in NUMERIC_COLUMNS:
+                data[name] = np.array([v or 0 for v in column_values], dtype=np.float64)
+            elif name in DATE_COLUMNS:
+                days = {} # Dates repeat heavily: convert each distinct value once
+                for v in column_values:
+                    if v not in days:
+                        days[v] = to_epoch_day(v)
+                data[name] = np.fromiter((days[v] for v in column_values), dtype=np.int32,
+                                         count=len(column_values))
+            elif name in CATEGORICAL_COLUMNS:
+                raw = np.array(['' if v is None else v for v in column_values], dtype=object)
+                categories[name], codes = np.unique(raw, return_inverse=True)
+                data[name] = codes.astype(np.int32).reshape(-1)
+            else:
+                data[name] = np.array(['' if v is None else v for v in column_values], dtype=object)
+        length = len(values[0]) if values else 0
+        return cls(columns, data, categories, length)
+
+    @classmethod
+    def from_blocks(cls, columns, blocks, categories, length):
+        """Builds a compressed table from encode_block() output (e.g. read back from disk)."""
+        return cls(columns, CompressedColumns(blocks), categories, length)
+
+    def compressed(self):
+        """Returns this table with its columns stored as compressed blocks (self if already compressed)."""
+        if self.is_compressed:
+            return self
+        return InventoryTable(self.columns, CompressedColumns.from_arrays(self._data), self._categories, self._length)
+
+    @property
+    def is_compressed(self):
+        return isinstance(self._data, CompressedColumns)
+
+    def column_block(self, name):
+        """(encoding, zlib-compressed bytes) of a column's stored array."""
+        if self.is_compressed:
+            return self._data.block(name)
+        return encode_block(self._data[name])
+
+    # --- Basic access ---
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        """Yields every row as an ERPRecord (dict-style and attribute access)."""
+        return self.iter_records()
+
+    def codes(self, name):
+        """Returns the integer code array of a categorical column."""
+        return self._data[name]
+
+    def categories(self, name):
+        """Returns the sorted distinct values of a categorical column."""
+        return self._categories[name]
+
+    def column(self, name):
+        """Returns the decoded values of a column as an ndarray (dates as date objects or None)."""
+        if name in self._categories:
+            return self._categories[name][self._data[name]]
+        if name in DATE_COLUMNS:
+            return np.array([from_epoch_day(day) for day in self._data[name].tolist()], dtype=object)
+        return self._data[name]
+
+    def days(self, name):
+        """Returns a date column as its int32 epoch-day array (NO_DATE for blanks)."""
+        return self._data[name]
+
+    def iter_records(self, indices=None):
+        """Yields rows (all, or those at 'indices' in that order) as ERPRecords."""
+        make_record = record_class(self.columns)._make
+        if indices is None:
+            indices = np.arange(self._length)
+        arrays = [self._data[name] for name in self.columns] # Look up (or decompress) each column once
+        for start in range(0, len(indices), _ITER_BLOCK):
+            block = indices[start:start + _ITER_BLOCK]
+            decoded = [self._decode(name, array, block) for name, array in zip(self.columns, arrays)]
+            for values in zip(*decoded):
+                yield make_record(values)
+
+    def _decode(self, name, array, indices):
+        values = array[indices]
+        if name in self._categories:
+            values = self._categories[name][values]
+        elif name in DATE_COLUMNS:
+            return [from_epoch_day(day) for day in values.tolist()]
+        return values.tolist()
+
+    def take(self, indices):
+        """Returns a new table with the rows at 'indices' (an index array or boolean mask)."""
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        data = {name: values[indices] for name, values in self._data.items()}
+        return InventoryTable(self.columns, data, self._categories, len(indices))
+
+    # --- Filtering ---
+
+    def mask_equals(self, name, value):
+        """Boolean mask of rows where column == value."""
+        return self.mask_isin(name, (value,))
+
+    def mask_isin(self, name, values):
+        """Boolean mask of rows whose column value is one of 'values'."""
+        if name in self._categories:
+            categories = self._categories[name]
+            wanted = [code for code in np.searchsorted(categories, list(values))
+                      if code < len(categories) and categories[code] in values]
+            return np.isin(self._data[name], np.array(wanted, dtype=np.int32))
+        return np.isin(self._data[name], list(values))
+
+    def mask_contains(self, text, names):
+        """Boolean mask of rows where any of the given text columns contains 'text' (case-insensitive)."""
+        text = text.lower()
+        mask = np.zeros(self._length, dtype=bool)
+        for name in names:
+            if name in self._categories:
+                # Test each distinct value once, then broadcast through the codes
+                hits = np.array([text in str(v).lower() for v in self._categories[name]], dtype=bool)
+                mask |= hits[self._data[name]] if len(hits) else False
+            else:
+                mask |= np.fromiter((text in str(v).lower() for v in self._data[name]),
+                                    dtype=bool, count=self._length)
+        return mask
+
+    def mask_range(self, name, low=None, high=None):
+        """Boolean mask for a numeric or date column (epoch days) within [low, high]; blank dates never match."""
+        values = self._data[name]
+        mask = np.ones(self._length, dtype=bool) if name not in DATE_COLUMNS else values != NO_DATE
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+        return mask
+
+    # --- Sorting ---
+
+    def _sort_key(self, name):
+        """
+        Rank per row that orders like the grid: text by its trimmed, lowercased
+        value, numbers by value, dates by day with blanks after every real day.
+        """
+        if name in NUMERIC_COLUMNS:
+            return self._data[name]
+        key = self._sort_keys.get(name)
+        if key is None:
+            values = self._data[name]
+            if name in DATE_COLUMNS:
+                # Widened, so negating for descending sorts can't overflow
+                key = np.where(values == NO_DATE, _BLANK_DATE_SORT, values).astype(np.int64)
+            elif name in self._categories:
+                # Rank the distinct values once, then broadcast through the codes
+                key = _text_ranks(self._categories[name])[values]
+            else:
+                key = _text_ranks(values)
+            self._sort_keys[name] = key
+        return key
+
+    def argsort(self, keys, indices=None):
+        """
+        Returns row indices ordered by 'keys', a list of (column, descending)
+        pairs with the primary key first. Sorting is stable: ties keep the
+        order of 'indices' (all rows, in table order, when not given).
+        """
+        if indices is None:
+            indices = np.arange(self._length)
+        if not keys:
+            return indices
+        lex_keys = []
+        for name, descending in reversed(keys): # np.lexsort wants the primary key last
+            key = self._sort_key(name)[indices]
+            lex_keys.append(-key if descending else key)
+        return indices[np.lexsort(lex_keys)]
+
+    # --- Facets ---
+
+    def facet_counts(self, name, mask=None):
+        """Returns [(value, count)] for a categorical column, sorted by value, zero counts omitted."""
+        codes = self._data[name] if mask is None else self._data[name][mask]
+        categories = self._categories[name]
+        counts = np.bincount(codes, minlength=len(categories))
+        present = np.flatnonzero(counts)
+        return list(zip(categories[present].tolist(), counts[present].tolist()))
+
+    def facet_values(self, name, mask=None):
+        """Sorted distinct non-blank values of a categorical column."""
+        return [value for value, _ in self.facet_counts(name, mask) if value]
+
+    # --- Versioning ---
+
+    def content_hash(self):
+        """Stable hash of the table contents, used as the snapshot version / ETag."""
+        digest = hashlib.blake2b(digest_size=12)
+        for name in self.columns:
+            digest.update(name.encode('utf-8'))
+            if name in self._categories:
+                digest.update(repr(self._categories[name].tolist()).encode('utf-8'))
+                digest.update(self._data[name].tobytes())
+            elif name in NUMERIC_COLUMNS or name in DATE_COLUMNS:
+                digest.update(self._data[name].tobytes())
+            else:
+                for start in range(0, self._length, _ITER_BLOCK):
+                    digest.update(repr(self._data[name][start:start + _ITER_BLOCK].tolist()).encode('utf-8'))
+        return digest.hexdigest()
+
+    def memory_usage(self):
+        """
+        Approximate bytes held by the table: 'columns' (arrays, or compressed
+        blocks), 'decoded' (of a compressed table, its columns currently in the
+        hot-column cache), 'categories' and cached 'sort_keys'.
+        """
+        if self.is_compressed:
+            columns, decoded = self._data.compressed_bytes(), self._data.resident_bytes()
+        else:
+            columns, decoded = sum(array_bytes(a) for a in self._data.values()), 0
+        return {
+            'columns': columns,
+            'decoded': decoded,
+            'categories': sum(array_bytes(a) for a in self._categories.values()),
+            'sort_keys': sum(a.nbytes for a in self._sort_keys.values()),
+        }
@@ -0,0 +1,98 @@
+# customer_portal/database/migrations.py
+"""
+Versioned schema migrations for the local database (CustomerPortalDB)
+dbo.SchemaVersion records which migrations have been applied. At startup
+run_migrations() reads the current version with a single query and returns
+if it is up to date. Otherwise it takes an application lock (so worker
+processes starting together don't race), applies the pending migrations in
+order and records each one.
+
+To change the schema, append a Migration with the next version number.
+Never edit or reorder migrations that have already shipped.
+"""
+
+import logging
+from collections import namedtuple
+from .connection import get_db
+
+logger = logging.getLogger(__name__)
+
+Migration = namedtuple('Migration', 'version description apply') # apply(db), raises on failure
+
+_VERSION_SQL = """
+    IF OBJECT_ID(N'dbo.SchemaVersion', N'U') IS NULL
+        SELECT CAST(0 AS INT) AS version;
+    ELSE
+        SELECT ISNULL(MAX(version), 0) AS version FROM dbo.SchemaVersion;
+"""
+
+_CREATE_VERSION_TABLE_SQL = """
+    IF OBJECT_ID(N'dbo.SchemaVersion', N'U') IS NULL
+        CREATE TABLE dbo.SchemaVersion (
+            version INT NOT NULL PRIMARY KEY,
+            description NVARCHAR(200) NOT NULL,
+            applied_at DATETIME NOT NULL DEFAULT GETUTCDATE()
+        );
+"""
+
+_RECORD_SQL = "INSERT INTO dbo.SchemaVersion (version, description) VALUES (?, ?);"
+
+# Session-owned lock: held across the migrations' own commits, released explicitly.
+# Returns sp_getapplock's result: 0/1 granted, negative when not (timeout, deadlock, error).
+_LOCK_SQL = """
+    SET NOCOUNT ON;
+    DECLARE @r INT;
+    EXEC @r = sp_getapplock @Resource = N'CustomerPortal.SchemaMigrations', @LockMode = 'Exclusive', @LockOwner = 'Session', @LockTimeout = 120000;
+    SELECT @r AS result;
+"""
+_UNLOCK_SQL = "EXEC sp_releaseapplock @Resource = N'CustomerPortal.SchemaMigrations', @LockOwner = 'Session';"
+
+_BASELINE_TABLES = ('Customers', 'PasswordResetTokens', 'AuditLog', 'ActiveSessions')
+
+
+def _baseline(db):
+    """The tables created before versioning, via the DAL classes' create-if-missing checks."""
+    from .customer_data import customer_db
+    from .audit_log import audit_db
+    from .session_store import session_db
+
+    customer_db.ensure_tables() # Also adds Customers.must_reset_password to older databases
+    audit_db.ensure_table()
+    session_db.ensure_table()
+    missing = [table for table in _BASELINE_TABLES if not db.check_table_exists(table)]
+    if missing:
+        raise RuntimeError(f"Could not create table(s): {', '.join(missing)}")
+
+
+MIGRATIONS = [
+    Migration(1, 'Baseline: Customers, PasswordResetTokens, AuditLog, ActiveSessions', _baseline),
+]
+
+
+def run_migrations(db=None):
+    """Brings the schema up to date and returns its version (one query when nothing is pending)."""
+    db = db or get_db()
+    latest = MIGRATIONS[-1].version
+    current = db.execute_scalar(_VERSION_SQL) or 0
+    if current >= latest:
+        logger.info(f"[Migrations] Schema is up to date (version {current}).")
+        return current
+
+    result = db.execute_scalar(_LOCK_SQL)
+    if result is None or result < 0:
+        raise RuntimeError(f"Could not acquire the schema migration lock (sp_getapplock returned {result})")
+    try:
+        db.execute_query(_CREATE_VERSION_TABLE_SQL)
+        current = db.execute_scalar(_VERSION_SQL) or 0 # Another worker may have migrated while we waited
+        for migration in MIGRATIONS:
+            if migration.version <= current:
+                continue
+            logger.info(f"[Migrations] Applying {migration.version}: {migration.description}...")
+            migration.apply(db)
+            if not db.execute_query(_RECORD_SQL, (migration.version, migration.description)):
+                raise RuntimeError(f"Could not record schema version {migration.version}")
+            current = migration.version
+    finally:
+        db.execute_query(_UNLOCK_SQL)
+    logger.info(f"[Migrations] Schema migrated to version {current}.")
+    return current
@@ -0,0 +1,139 @@
+# customer_portal/database/search_index.py
+"""
+Full-text search index for inventory snapshots
+Searches run against the *distinct* values of the searchable columns rather
+than every row: a trigram inverted index finds the distinct strings that
+contain each query term, and per-snapshot code arrays map those strings back
+to row ids. The trigram vocabulary is kept per ERP account and grows
+incrementally, so a refreshed snapshot only indexes strings it hasn't seen.
+"""
+
+import sys
+import threading
+import numpy as np
+
+SEARCH_COLUMNS = ('Part', 'Description', 'User_Lot', 'Reference', 'PO', 'BIN')
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramVocabulary:
+    """Distinct lowercased strings with a trigram -> string-id inverted index."""
+
+    def __init__(self):
+        self._ids = {} # string -> id
+        self._strings = [] # id -> string
+        self._postings = {} # trigram -> list of string ids (ascending, ids only ever grow)
+        self._lock = threading.Lock()
+        self.live_strings = 0 # Distinct strings used by the newest snapshot
+
+    def __len__(self):
+        return len(self._strings)
+
+    def memory_bytes(self):
+        """Approximate bytes held (strings, id map and postings), shared by the account's snapshots."""
+        with self._lock:
+            strings = sum(sys.getsizeof(s) for s in self._strings)
+            postings = sum(len(ids) for ids in self._postings.values())
+            # Per string: list slot, id map entry and its int; per trigram: a dict entry and list; per posting: a slot
+            return (strings + (8 + 100 + 28) * len(self._strings)
+                    + (100 + 56) * len(self._postings) + 8 * postings)
+
+    def ids_for(self, values):
+        """Returns the id of each (lowercased) value, indexing new ones."""
+        ids = np.empty(len(values), dtype=np.int32)
+        with self._lock:
+            for i, value in enumerate(values):
+                text = str(value).lower()
+                string_id = self._ids.get(text)
+                if string_id is None:
+                    string_id = len(self._strings)
+                    self._ids[text] = string_id
+                    self._strings.append(text)
+                    for trigram in _trigrams(text):
+                        self._postings.setdefault(trigram, []).append(string_id)
+                ids[i] = string_id
+        return ids
+
+    def matching_ids(self, term):
+        """Ids of the strings containing 'term' (already lowercased), as a sorted array."""
+        with self._lock:
+            if len(term) < 3:
+                # Too short for trigrams: scan the distinct strings (far fewer than rows)
+                return np.array([i for i, s in enumerate(self._strings) if term in s], dtype=np.int32)
+            postings = []
+            for trigram in _trigrams(term):
+                ids = self._postings.get(trigram)
+                if not ids:
+                    return np.empty(0, dtype=np.int32)
+                postings.append(ids)
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for ids in postings[1:]:
+                candidates.intersection_update(ids)
+                if not candidates:
+                    break
+            # Trigrams can match out of order, so confirm the substring
+            strings = self._strings
+            return np.array(sorted(i for i in candidates if term in strings[i]), dtype=np.int32)
+
+
+class SearchIndex:
+    """Maps a snapshot's rows onto a TrigramVocabulary for substring search."""
+
+    def __init__(self, table, vocabulary, columns=SEARCH_COLUMNS):
+        self.table = table
+        self.vocabulary = vocabulary
+        self.columns = tuple(columns)
+        self._row_codes = {} # column -> per-row index into _code_to_string
+        self._code_to_string = {} # column -> vocabulary id of each distinct value
+        live = 0
+        for name in self.columns:
+            try:
+                distinct, codes = table.categories(name), table.codes(name)
+            except KeyError: # Not dictionary-encoded in the table: encode it here
+                values = table.column(name)
+                try:
+                    distinct, codes = np.unique(values, return_inverse=True)
+                except TypeError: # Mixed types can't be ordered; compare as text
+                    distinct, codes = np.unique(values.astype(str), return_inverse=True)
+                codes = codes.astype(np.int32).reshape(-1)
+            self._row_codes[name] = codes
+            self._code_to_string[name] = vocabulary.ids_for(distinct.tolist())
+            live += len(distinct)
+        vocabulary.live_strings = live
+
+    def memory_bytes(self):
+        """Bytes held by the per-snapshot arrays (the vocabulary is counted separately)."""
+        return sum(a.nbytes for arrays in (self._row_codes, self._code_to_string) for a in arrays.values())
+
+    def _term_mask(self, term):
+        string_ids = self.vocabulary.matching_ids(term)
+        mask = np.zeros(len(self.table), dtype=bool)
+        if not len(string_ids):
+            return mask
+        for name in self.columns:
+            local_codes = np.flatnonzero(np.isin(self._code_to_string[name], string_ids, assume_unique=True))
+            if len(local_codes):
+                mask |= np.isin(self._row_codes[name], local_codes)
+        return mask
+
+    def search(self, query):
+        """
+        Returns the sorted row ids matching 'query'. Whitespace-separated terms
+        must all match (each in any column); every term is a case-insensitive
+        substring match, so prefixes and fragments of lot numbers work too.
+        Returns None for an empty query (no filtering).
+        """
+        terms = query.lower().split()
+        if not terms:
+            return None
+        mask = None
+        for term in sorted(set(terms), key=len, reverse=True): # Longest (most selective) first
+            term_mask = self._term_mask(term)
+            mask = term_mask if mask is None else mask & term_mask
+            if not mask.any():
+                break
+        return np.flatnonzero(mask).astype(np.int32)
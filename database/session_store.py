@@ -4,10 +4,13 @@ Active Session database operations (Local DB)
 Manages the ActiveSessions table for customer logins.
 """
 
+import logging
 from .connection import get_db
 from config import Config
 from datetime import datetime, timedelta
 
+logger = logging.getLogger(__name__)
+
 class SessionStoreDB:
     """Active Session database operations"""
 
@@ -22,7 +25,7 @@ class SessionStoreDB:
         """Ensure the ActiveSessions table exists."""
         db = get_db() # === ADDED ===
         if not db.check_table_exists('ActiveSessions'): # === MODIFIED ===
-            print("⏳ Creating ActiveSessions table...")
+            logger.info("Creating ActiveSessions table...")
             create_query = """
                 CREATE TABLE ActiveSessions (
                     session_id NVARCHAR(255) PRIMARY KEY NOT NULL,
@@ -43,9 +46,9 @@ class SessionStoreDB:
                 CREATE INDEX IX_ActiveSessions_LastSeen ON ActiveSessions(last_seen DESC);
             """
             if db.execute_query(create_query): # === MODIFIED ===
-                print("✅ ActiveSessions table created successfully.")
+                logger.info("ActiveSessions table created successfully.")
             else:
-                print("❌ Failed to create ActiveSessions table.")
+                logger.error("Failed to create ActiveSessions table.")
 
     def create_or_update(self, session_id, customer_id, ip_address, user_agent):
         """Creates or updates a session in the database."""
@@ -78,7 +81,7 @@ class SessionStoreDB:
         try:
             return db.execute_query(query, params)
         except Exception as e:
-            print(f"❌ [SessionDB] Error in create_or_update: {e}")
+            logger.error(f"[SessionDB] Error in create_or_update: {e}")
             return False
 
     def get(self, session_id):
@@ -149,13 +152,13 @@ class SessionStoreDB:
         try:
             success = db.execute_query(delete_query, session_ids)
             if success:
-                print(f"ℹ️ [SessionDB] Pruned {len(sessions_to_prune)} sessions older than {hours} hours.")
+                logger.info(f"[SessionDB] Pruned {len(sessions_to_prune)} sessions older than {hours} hours.")
                 return sessions_to_prune # Return list of kicked users
             else:
-                print("⚠️ [SessionDB] Prune delete query failed.")
+                logger.warning("[SessionDB] Prune delete query failed.")
                 return []
         except Exception as e:
-            print(f"⚠️ [SessionDB] Error pruning sessions by hour: {e}")
+            logger.warning(f"[SessionDB] Error pruning sessions by hour: {e}")
             return []
             
     # === MODIFIED: Update prune_inactive to use the new method ===
@@ -0,0 +1,252 @@
+# customer_portal/database/snapshot_store.py
+"""
+On-disk inventory snapshot store
+Persists each account's latest InventorySnapshot so a restart or deploy
+doesn't send every user back to the ERP. One file per ERP customer set:
+
+    b'PINVSNAP' | u32 format version | u32 header length | header (JSON) | blocks
+
+The header holds the account, snapshot version, fetch time, row count and,
+per column, its block encoding and the (offset, size) of its zlib-compressed
+blocks (relative to the end of the header). The blocks are the ones cached
+tables keep in memory (see compressed_columns), so saving and restoring
+never re-encodes a column. At startup only the headers are read, through a
+memory map; a snapshot's blocks are read the first time its account is
+requested. Files older than the TTL are ignored and removed.
+Writes happen on a background thread and replace files atomically; headers
+are re-read before use, so worker processes can share the directory.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from config import Config
+from .compressed_columns import encode_strings, decode_strings
+from .inventory_table import InventoryTable, CATEGORICAL_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PINVSNAP'
+FORMAT_VERSION = 2
+_PREAMBLE = struct.Struct('<8sII') # magic, format version, header length
+_COMPRESSION_LEVEL = 6
+
+
+class StoredSnapshot:
+    """Header of a snapshot file (the column blocks stay on disk until loaded)."""
+
+    __slots__ = ('path', 'account', 'version', 'fetched_at', 'prewarmed', 'length', 'columns', 'data_offset')
+
+    def __init__(self, path, header, data_offset):
+        self.path = path
+        self.account = header['account']
+        self.version = header['version']
+        self.fetched_at = datetime.fromisoformat(header['fetched_at']) # UTC
+        self.prewarmed = header.get('prewarmed', False)
+        self.length = header['length']
+        self.columns = header['columns'] # [{'name', 'encoding', 'block': [offset, size], 'categories': [offset, size] or None}]
+        self.data_offset = data_offset
+
+
+class SnapshotStore:
+    """Directory of per-account snapshot files."""
+
+    def __init__(self, directory, ttl):
+        self.directory = directory
+        self.ttl = ttl # timedelta; older files are never loaded
+        self._index = {} # account -> StoredSnapshot (headers found on disk)
+        self._lock = threading.Lock() # Serializes file reads/replacements (Windows can't replace a mapped file)
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='snapshot-writer')
+        self._scanned = False
+
+    def _path(self, account):
+        name = hashlib.blake2b(account.encode('utf-8'), digest_size=10).hexdigest()
+        return os.path.join(self.directory, f"{name}.snap")
+
+    # --- Reading ---
+
+    def scan(self):
+        """Reads the header of every snapshot file, dropping expired or unreadable ones."""
+        with self._lock:
+            self._scanned = True
+            if not os.path.isdir(self.directory):
+                return
+            cutoff = datetime.utcnow() - self.ttl
+            for filename in os.listdir(self.directory):
+                if not filename.endswith('.snap'):
+                    continue
+                path = os.path.join(self.directory, filename)
+                try:
+                    stored = self._read_header(path)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"[Snapshot Store] Ignoring unreadable snapshot {filename}: {e}")
+                    stored = None
+                if stored is None or stored.fetched_at < cutoff:
+                    self._remove(path)
+                    continue
+                self._index[stored.account] = stored
+        logger.info(f"[Snapshot Store] Found {len(self._index)} persisted inventory snapshots in {self.directory}.")
+
+    @staticmethod
+    def _read_header(path):
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < _PREAMBLE.size:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                magic, format_version, header_length = _PREAMBLE.unpack_from(mapped, 0)
+                if magic != MAGIC or format_version != FORMAT_VERSION:
+                    return None
+                header = json.loads(mapped[_PREAMBLE.size:_PREAMBLE.size + header_length].decode('utf-8'))
+        return StoredSnapshot(path, header, _PREAMBLE.size + header_length)
+
+    def load(self, account):
+        """
+        Returns (InventoryTable, StoredSnapshot) for the account's persisted
+        snapshot, or None if there is none within the TTL.
+        """
+        if not self._scanned:
+            self.scan()
+        with self._lock:
+            stored = self._read_current(account)
+            if stored is None:
+                return None
+            if datetime.utcnow() - stored.fetched_at > self.ttl:
+                del self._index[account]
+                self._remove(stored.path)
+                return None
+            try:
+                table = self._read_table(stored)
+            except (OSError, ValueError, zlib.error) as e:
+                logger.warning(f"[Snapshot Store] Could not load snapshot for '{account}': {e}")
+                del self._index[account]
+                return None
+        logger.info(f"[Snapshot Store] Restored {stored.length} inventory records for '{account}' "
+                    f"(fetched {stored.fetched_at:%Y-%m-%d %H:%M:%S} UTC).")
+        return table, stored
+
+    def _read_current(self, account):
+        """Re-reads the account's header (another worker process may have replaced the file). Caller holds the lock."""
+        path = self._path(account)
+        try:
+            stored = self._read_header(path)
+        except FileNotFoundError:
+            stored = None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"[Snapshot Store] Ignoring unreadable snapshot for '{account}': {e}")
+            stored = None
+        if stored is None or stored.account != account:
+            self._index.pop(account, None)
+            return None
+        self._index[account] = stored
+        return stored
+
+    @staticmethod
+    def _read_table(stored):
+        """Builds a compressed table: column blocks are copied out as-is, only categories are decoded."""
+        blocks, categories = {}, {}
+        with open(stored.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            def read(span):
+                start = stored.data_offset + span[0]
+                return mapped[start:start + span[1]]
+
+            for column in stored.columns:
+                name = column['name']
+                blocks[name] = (column['encoding'], read(column['block']))
+                if column['categories'] is not None:
+                    categories[name] = decode_strings(zlib.decompress(read(column['categories'])))
+        return InventoryTable.from_blocks([c['name'] for c in stored.columns], blocks, categories, stored.length)
+
+    # --- Writing ---
+
+    def save(self, snapshot, on_saved=None):
+        """Queues the snapshot to be written (replacing the account's previous file); on_saved() runs once it is."""
+        self._writer.submit(self._write_logged, snapshot.account, snapshot.table, snapshot.version,
+                            snapshot.fetched_at, snapshot.prewarmed, on_saved)
+
+    def _write_logged(self, account, table, version, fetched_at, prewarmed, on_saved):
+        try:
+            self._write(account, table, version, fetched_at, prewarmed)
+        except Exception as e:
+            logger.warning(f"[Snapshot Store] Could not persist snapshot for '{account}': {e}")
+            return
+        if on_saved is not None:
+            on_saved()
+
+    def _write(self, account, table, version, fetched_at, prewarmed):
+        if not self._scanned:
+            self.scan()
+        with self._lock:
+            existing = self._read_current(account)
+            if existing is not None and existing.version == version:
+                # Same data as on disk: copy the compressed blocks, only the header changes
+                with open(existing.path, 'rb') as f:
+                    f.seek(existing.data_offset)
+                    body = f.read()
+                columns = existing.columns
+            else:
+                columns, body = self._encode_columns(table)
+
+        header = {
+            'account': account,
+            'version': version,
+            'fetched_at': fetched_at.isoformat(),
+            'prewarmed': prewarmed,
+            'length': len(table),
+            'columns': columns,
+        }
+        header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        path = self._path(account)
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            f.write(body)
+        with self._lock:
+            os.replace(temp_path, path)
+            self._index[account] = StoredSnapshot(path, header, _PREAMBLE.size + len(header_bytes))
+
+    @staticmethod
+    def _encode_columns(table):
+        columns, chunks, offset = [], [], 0
+
+        def add_block(compressed):
+            nonlocal offset
+            chunks.append(compressed)
+            offset += len(compressed)
+            return [offset - len(compressed), len(compressed)]
+
+        for name in table.columns:
+            encoding, block = table.column_block(name)
+            categories = None
+            if name in CATEGORICAL_COLUMNS:
+                categories = add_block(zlib.compress(encode_strings(table.categories(name).tolist()), _COMPRESSION_LEVEL))
+            columns.append({'name': name, 'encoding': encoding, 'block': add_block(block), 'categories': categories})
+        return columns, b''.join(chunks)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def flush(self, timeout=None):
+        """Waits for queued writes to finish (used at shutdown and in tools)."""
+        try:
+            self._writer.submit(lambda: None).result(timeout)
+        except RuntimeError:
+            pass # Interpreter exiting: concurrent.futures itself waits for the queued writes
+
+
+# Singleton instance (None when INVENTORY_SNAPSHOT_DIR is blank)
+snapshot_store = SnapshotStore(
+    Config.INVENTORY_SNAPSHOT_DIR,
+    ttl=timedelta(hours=Config.INVENTORY_SNAPSHOT_TTL_HOURS)
+) if Config.INVENTORY_SNAPSHOT_DIR else None
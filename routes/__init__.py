@@ -12,6 +12,8 @@ from .admin.customers import admin_customers_bp
 from .admin.audit import admin_audit_bp
 from .admin.sessions import admin_sessions_bp
 from .admin.analytics import admin_analytics_bp
+from .admin.metrics import admin_metrics_bp
+from .admin.slow_queries import admin_slow_queries_bp
 # === END MODIFICATION ===
 
 
@@ -24,5 +26,7 @@ __all__ = [
     'admin_audit_bp',
     'admin_sessions_bp',
     'admin_analytics_bp',
+    'admin_metrics_bp',
+    'admin_slow_queries_bp',
     # === END MODIFICATION ===
 ]
\ No newline at end of file
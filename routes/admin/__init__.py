@@ -10,6 +10,8 @@ from .audit import admin_audit_bp
 from .sessions import admin_sessions_bp
 # === NEW IMPORT ===
 from .analytics import admin_analytics_bp
+from .metrics import admin_metrics_bp
+from .slow_queries import admin_slow_queries_bp
 
 __all__ = [
     'admin_panel_bp',
@@ -19,4 +21,6 @@ __all__ = [
     'admin_sessions_bp',
     # === NEW EXPORT ===
     'admin_analytics_bp',
+    'admin_metrics_bp',
+    'admin_slow_queries_bp',
 ]
\ No newline at end of file
@@ -2,6 +2,7 @@
 """
 Admin routes for managing customer accounts.
 """
+import logging
 from flask import Blueprint, render_template, redirect, url_for, session, request, flash, jsonify
 from auth import admin_required
 from database.customer_data import customer_db
@@ -11,6 +12,8 @@ from utils.validators import validate_email, validate_password
 from utils.email_service import send_password_reset_email, send_welcome_email # --- MODIFIED IMPORT ---
 import secrets
 
+logger = logging.getLogger(__name__)
+
 admin_customers_bp = Blueprint('admin_customers', __name__)
 
 @admin_customers_bp.route('/customers')
@@ -53,7 +56,7 @@ def manage_customers():
     try:
         erp_customer_names = erp_service.get_all_customer_names()
     except Exception as e:
-        print(f"❌ Error fetching ERP customer names: {e}")
+        logger.error(f"Error fetching ERP customer names: {e}")
         flash("Error fetching ERP customer list.", "error")
         erp_customer_names = []
 
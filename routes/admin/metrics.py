@@ -0,0 +1,29 @@
+# customer_portal/routes/admin/metrics.py
+"""
+Admin routes exposing in-process metrics (Prometheus text format) and inventory cache memory use.
+"""
+from flask import Blueprint, Response, jsonify
+from auth import admin_required
+from utils.metrics import metrics
+from database.inventory_cache import inventory_cache
+from database.compressed_columns import hot_columns
+
+admin_metrics_bp = Blueprint('admin_metrics', __name__)
+
+@admin_metrics_bp.route('/metrics')
+@admin_required
+def view_metrics():
+    """Returns request, query, template and export timings as text."""
+    return Response(
+        metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+@admin_metrics_bp.route('/metrics/inventory-cache')
+@admin_required
+def view_inventory_cache_memory():
+    """Returns memory accounting for each cached inventory snapshot."""
+    return jsonify({
+        'hot_columns': hot_columns.status(),
+        'snapshots': inventory_cache.memory_report(),
+    })
@@ -2,15 +2,19 @@
 """
 Admin route for viewing and managing active sessions.
 """
+import logging
 from flask import Blueprint, render_template, request, jsonify, g, current_app, flash
 from auth import admin_required
 from database.session_store import session_db
 from database.audit_log import audit_db
+from utils.shared_cache import set_shared_setting
 # === MODIFIED IMPORTS: Use pytz for timezone ===
 import pytz # Bundles IANA timezone data, works on Windows
 from datetime import timezone
 # === END MODIFIED IMPORTS ===
 
+logger = logging.getLogger(__name__)
+
 admin_sessions_bp = Blueprint('admin_sessions', __name__)
 
 @admin_sessions_bp.route('/sessions')
@@ -21,7 +25,7 @@ def view_sessions():
     # === NEW: Auto-prune logic ===
     auto_kick_enabled = current_app.config.get('AUTO_KICK_ENABLED', False)
     if auto_kick_enabled:
-        print("ℹ️ [Admin Sessions] Auto-kick is ON. Pruning sessions > 3 hours old.")
+        logger.info("[Admin Sessions] Auto-kick is ON. Pruning sessions > 3 hours old.")
         try:
             kicked_sessions = session_db.prune_by_hours(hours=3)
             if kicked_sessions:
@@ -35,7 +39,7 @@ def view_sessions():
                     )
                 flash(f"Auto-kicked {len(kicked_sessions)} inactive session(s).", 'info')
         except Exception as e:
-            print(f"❌ Error during auto-prune: {e}")
+            logger.error(f"Error during auto-prune: {e}")
             flash("An error occurred during automatic session pruning.", 'error')
     # === END NEW ===
 
@@ -63,12 +67,12 @@ def view_sessions():
                     # Convert to target timezone
                     s['created_at'] = utc_created_at.astimezone(pst_pdt_zone)
         except Exception as tz_e:
-            print(f"⚠️ Error converting timezones with pytz: {tz_e}. Falling back to UTC.")
+            logger.warning(f"Error converting timezones with pytz: {tz_e}. Falling back to UTC.")
             # If conversion fails, the template will just show UTC
         # === END MODIFIED ===
 
     except Exception as e:
-        print(f"❌ Error fetching active sessions: {e}")
+        logger.error(f"Error fetching active sessions: {e}")
         flash("Error fetching active sessions.", "error")
     
     return render_template(
@@ -85,14 +89,14 @@ def set_autokick():
     data = request.get_json()
     enabled = data.get('enabled', False)
     
-    current_app.config['AUTO_KICK_ENABLED'] = enabled
+    set_shared_setting('AUTO_KICK_ENABLED', enabled) # Applies to every worker process
     status_str = "ENABLED" if enabled else "DISABLED"
     
     audit_db.log_event(
         action_type='SYSTEM_SETTING_CHANGE',
         details=f"Admin {g.admin.get('username')} {status_str} 3-hour session auto-kick."
     )
-    print(f"ℹ️ [Admin Sessions] Auto-kick set to: {status_str}")
+    logger.info(f"[Admin Sessions] Auto-kick set to: {status_str}")
 
     kicked_count = 0
     if enabled:
@@ -109,7 +113,7 @@ def set_autokick():
                         details="Kicked on enable: inactive for > 3 hours."
                     )
         except Exception as e:
-            print(f"❌ Error during prune-on-enable: {e}")
+            logger.error(f"Error during prune-on-enable: {e}")
             return jsonify({'success': False, 'message': f'Setting saved, but an error occurred during pruning: {e}'}), 500
 
     return jsonify({
@@ -145,5 +149,5 @@ def kick_session():
         else:
             return jsonify({'success': False, 'message': 'Session not found or already ended.'})
     except Exception as e:
-        print(f"❌ Error kicking session {session_id}: {e}")
+        logger.error(f"Error kicking session {session_id}: {e}")
         return jsonify({'success': False, 'message': 'An error occurred.'}), 500
\ No newline at end of file
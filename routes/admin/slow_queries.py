@@ -0,0 +1,46 @@
+# customer_portal/routes/admin/slow_queries.py
+"""
+Admin route for inspecting the slow-query log.
+"""
+import logging
+from flask import Blueprint, render_template, request, jsonify, g
+from auth import admin_required
+from config import Config
+from utils.slow_query_log import slow_query_log
+
+logger = logging.getLogger(__name__)
+
+admin_slow_queries_bp = Blueprint('admin_slow_queries', __name__)
+
+@admin_slow_queries_bp.route('/slow-queries')
+@admin_required
+def view_slow_queries():
+    """Displays query fingerprints ranked by total time and by p99."""
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    database_filter = request.args.get('database', '').strip() or None
+
+    by_total = slow_query_log.top_by_total_time(limit=Config.SLOW_QUERY_MAX_FINGERPRINTS)
+    by_p99 = slow_query_log.top_by_p99(limit=Config.SLOW_QUERY_MAX_FINGERPRINTS)
+    if database_filter:
+        by_total = [q for q in by_total if q['database'] == database_filter]
+        by_p99 = [q for q in by_p99 if q['database'] == database_filter]
+
+    return render_template(
+        'admin/slow_queries.html',
+        summary=slow_query_log.summary(),
+        by_total=by_total[:limit],
+        by_p99=by_p99[:limit],
+        recent_slow=slow_query_log.recent_slow(),
+        threshold_ms=Config.SLOW_QUERY_THRESHOLD_MS,
+        log_file=Config.SLOW_QUERY_LOG_FILE,
+        current_database=database_filter,
+        limit=limit
+    )
+
+@admin_slow_queries_bp.route('/slow-queries/reset', methods=['POST'])
+@admin_required
+def reset_slow_queries():
+    """Clears the in-memory statistics (the JSONL file is left untouched)."""
+    slow_query_log.reset()
+    logger.info(f"[Admin] Slow-query statistics reset by {g.admin.get('username')}")
+    return jsonify({'success': True, 'message': 'Slow-query statistics reset.'})
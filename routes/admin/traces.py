@@ -0,0 +1,52 @@
+# customer_portal/routes/admin/traces.py
+"""
+Admin routes for inspecting recent request traces.
+"""
+import logging
+from flask import Blueprint, render_template, request, jsonify, g, abort
+from auth import admin_required
+from config import Config
+from utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+admin_traces_bp = Blueprint('admin_traces', __name__)
+
+@admin_traces_bp.route('/traces')
+@admin_required
+def view_traces():
+    """Displays the slowest recent traces as waterfalls."""
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    path_filter = request.args.get('path', '').strip() or None
+
+    traces = tracer.slowest(limit=Config.TRACE_BUFFER_SIZE if path_filter else limit)
+    if path_filter:
+        traces = [t for t in traces if path_filter in t['name']][:limit]
+
+    return render_template(
+        'admin/traces.html',
+        summary=tracer.summary(),
+        traces=traces,
+        tracing_enabled=Config.TRACING_ENABLED,
+        sample_rate=Config.TRACE_SAMPLE_RATE,
+        log_file=Config.TRACE_LOG_FILE,
+        current_path=path_filter,
+        limit=limit
+    )
+
+@admin_traces_bp.route('/traces/<trace_id>.json')
+@admin_required
+def get_trace(trace_id):
+    """Returns one trace (still in the buffer) as JSON."""
+    trace = tracer.get(trace_id)
+    if trace is None:
+        abort(404)
+    return jsonify(trace)
+
+@admin_traces_bp.route('/traces/reset', methods=['POST'])
+@admin_required
+def reset_traces():
+    """Clears the in-memory trace buffer (the JSONL file is left untouched)."""
+    tracer.reset()
+    logger.info(f"[Admin] Trace buffer cleared by {g.admin.get('username')}")
+    return jsonify({'success': True, 'message': 'Trace buffer cleared.'})
@@ -3,23 +3,38 @@
 Routes for customer inventory viewing.
 """
 
-from flask import Blueprint, render_template, session, redirect, url_for, flash, jsonify, send_file, request, g
+import logging
+from flask import Blueprint, session, redirect, url_for, flash, jsonify, send_file, request, g, render_template, make_response
 from auth import login_required # Use the customer login decorator
-from database import get_erp_service
-import openpyxl
+from database import get_erp_service, ERPUnavailableError, ERPBusyError
+from database.inventory_payload import PAYLOAD_FORMAT_VERSION
+from database.inventory_table import EPOCH, NUMERIC_COLUMNS, DATE_COLUMNS
+import numpy as np
+from utils.http_middleware import make_weak_etag, is_not_modified, not_modified_response
+from utils.metrics import timed, XLSX_GENERATION_DURATION
+from utils.tracing import span
+import pytz
 from io import BytesIO
 from datetime import datetime
-import traceback
+
+logger = logging.getLogger(__name__)
 
 inventory_bp = Blueprint('inventory', __name__, url_prefix='/inventory')
 
+# Dropdown filters: request arg -> column (exact match, like the grid's dropdowns)
+_DROPDOWN_FILTERS = (('part', 'Part'), ('bin', 'BIN'), ('status', 'Status'))
+
 @inventory_bp.route('/')
 @login_required # Protect this route
 def view_inventory():
-    """Renders the main customer inventory grid page."""
+    """
+    Renders the inventory page shell (filters, stale banner, empty grid).
+    The rows themselves are loaded by inventory.js from /inventory/api/data.
+    """
     erp_service = get_erp_service()
-    inventory_data = []
     error_message = None
+    snapshot = None
+    data_as_of = None
 
     # === MODIFICATION: Get ERP name from g.customer ===
     erp_customer_name = g.customer.get('erp_customer_name')
@@ -29,58 +44,358 @@ def view_inventory():
         return redirect(url_for('main.logout')) # Force logout if essential info is missing
 
     try:
-        inventory_data = erp_service.get_customer_inventory(erp_customer_name)
+        # Usually already loaded (or loading) by the login prefetch
+        snapshot = erp_service.get_recent_inventory_snapshot(erp_customer_name)
+    except ERPBusyError as e:
+        # Too many of this customer's requests in progress, or no ERP slot freed up in time
+        logger.warning(f"[Inventory] ERP busy for '{erp_customer_name}': {e}")
+        error_message = "The inventory system is busy right now. Please try again in a moment."
+        flash(error_message, 'error')
+    except ERPUnavailableError as e:
+        # Circuit breaker is open and there is no cached copy to fall back to
+        logger.warning(f"[Inventory] ERP unavailable for '{erp_customer_name}': {e}")
+        error_message = "The inventory system is temporarily unavailable. Please try again in a few minutes."
+        flash(error_message, 'error')
     except Exception as e:
         error_message = f"Error fetching inventory data from ERP: {str(e)}"
         flash(error_message, 'error')
-        traceback.print_exc() # Log the full error for debugging
+        logger.exception(f"[Inventory] Error fetching inventory for '{erp_customer_name}'") # Log the full error for debugging
 
-    parts = sorted(list(set(item.get('Part', '') for item in inventory_data if item.get('Part'))))
-    bins = sorted(list(set(item.get('BIN', '') for item in inventory_data if item.get('BIN'))))
-    statuses = sorted(list(set(item.get('Status', '') for item in inventory_data if item.get('Status'))))
+    if snapshot is not None and snapshot.is_stale:
+        data_as_of = _format_local_time(snapshot.fetched_at)
 
-    return render_template(
+    # --- Conditional GET: skip rendering if the browser already has this page ---
+    etag = None
+    if snapshot is not None:
+        etag = make_weak_etag(g.customer.get('customer_id'), erp_customer_name, snapshot.version, snapshot.is_stale)
+    if etag and not error_message and is_not_modified(etag):
+        return not_modified_response(etag)
+
+    # Filter dropdowns come straight from the dictionary-encoded columns
+    parts, bins, statuses = [], [], []
+    if snapshot is not None:
+        parts = snapshot.table.facet_values('Part')
+        bins = snapshot.table.facet_values('BIN')
+        statuses = snapshot.table.facet_values('Status')
+
+    response = make_response(render_template(
         'inventory_view.html',
-        inventory_data=inventory_data,
+        has_inventory=snapshot is not None and len(snapshot.table) > 0,
         error_message=error_message,
         filter_parts=parts,
         filter_bins=bins,
-        filter_statuses=statuses
-    )
+        filter_statuses=statuses,
+        data_as_of=data_as_of
+    ))
+    if etag and not error_message:
+        response.set_etag(etag, weak=True)
+    # Always revalidate: the page is per-user and the ETag makes that cheap
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+@inventory_bp.route('/api/data')
+@login_required
+def inventory_data():
+    """
+    Returns the cached inventory snapshot for the virtual grid in the
+    column-oriented format of database/inventory_payload.py (encoded once
+    per snapshot). Row positions are the row ids used by /inventory/api/search.
+    """
+    erp_customer_name = g.customer.get('erp_customer_name')
+    try:
+        snapshot = get_erp_service().get_cached_inventory_snapshot(erp_customer_name)
+    except ERPUnavailableError:
+        return jsonify({'success': False, 'message': 'The inventory system is temporarily unavailable.'}), 503
+    except Exception as e:
+        logger.error(f"Error loading inventory data: {e}", exc_info=True)
+        return jsonify({'success': False, 'message': 'An error occurred loading inventory data.'}), 500
+
+    etag = make_weak_etag(g.customer.get('customer_id'), snapshot.version, PAYLOAD_FORMAT_VERSION)
+    if is_not_modified(etag):
+        return not_modified_response(etag)
+
+    # The payload is cached gzipped: send it as-is when the browser accepts gzip
+    if request.accept_encodings['gzip']:
+        response = make_response(snapshot.payload_gzip)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+    else:
+        response = make_response(snapshot.payload)
+    response.mimetype = 'application/json'
+    response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+@inventory_bp.route('/api/facets')
+@login_required
+def inventory_facets():
+    """
+    Returns the Part/BIN/Status options (with counts) still available for the
+    current filter selections, computed from the snapshot's facet index.
+    Query args: part, bin, status, q (free-text search), plus the date filters
+    expires_within, received_from, received_to (see _date_filter_rows)
+    """
+    erp_customer_name = g.customer.get('erp_customer_name')
+    try:
+        snapshot = get_erp_service().get_cached_inventory_snapshot(erp_customer_name)
+    except ERPUnavailableError:
+        return jsonify({'success': False, 'message': 'The inventory system is temporarily unavailable.'}), 503
+    except Exception as e:
+        logger.error(f"Error loading inventory facets: {e}", exc_info=True)
+        return jsonify({'success': False, 'message': 'An error occurred loading filter options.'}), 500
+
+    selections = {
+        'Part': request.args.get('part', ''),
+        'BIN': request.args.get('bin', ''),
+        'Status': request.args.get('status', ''),
+    }
+    text = request.args.get('q', '').strip()
+    try:
+        date_rows, date_key = _date_filter_rows(snapshot)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    etag = make_weak_etag(snapshot.version, sorted(selections.items()), text.lower(), date_key)
+    if is_not_modified(etag):
+        return not_modified_response(etag)
+
+    # None means "no filter" for both the text search and the date filters
+    text_rows = _intersect_rows(snapshot.search_index.search(text), date_rows)
+    result = snapshot.facet_index.query(selections, text_rows=text_rows)
+
+    response = jsonify({'success': True, 'version': snapshot.version, **result})
+    response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+@inventory_bp.route('/api/search')
+@login_required
+def inventory_search():
+    """
+    Returns the row ids (positions in the rendered grid) matching a free-text
+    search over Part, Description, User Lot, Reference, PO and BIN and the
+    date filters, in row order, or ordered by 'sort' when it is given.
+    Query args: q (search text), v (snapshot version the page was rendered from),
+    expires_within, received_from, received_to (see _date_filter_rows),
+    part, bin, status (dropdown filters), sort (column id) and dir (asc/desc)
+    """
+    erp_customer_name = g.customer.get('erp_customer_name')
+    try:
+        snapshot = get_erp_service().get_cached_inventory_snapshot(erp_customer_name)
+    except ERPUnavailableError:
+        return jsonify({'success': False, 'message': 'The inventory system is temporarily unavailable.'}), 503
+    except Exception as e:
+        logger.error(f"Error searching inventory: {e}", exc_info=True)
+        return jsonify({'success': False, 'message': 'An error occurred while searching.'}), 500
+
+    # Row ids are only meaningful against the snapshot the page was rendered from
+    page_version = request.args.get('v', '')
+    if page_version and page_version != snapshot.version:
+        return jsonify({
+            'success': False,
+            'reload': True,
+            'message': 'Your inventory has been updated. Refresh the page to search the latest data.'
+        }), 409
+
+    try:
+        row_ids, view_key = _view_rows(snapshot, request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    etag = make_weak_etag(snapshot.version, view_key)
+    if is_not_modified(etag):
+        return not_modified_response(etag)
+
+    response = jsonify({
+        'success': True,
+        'version': snapshot.version,
+        'matching': len(snapshot.table) if row_ids is None else len(row_ids),
+        'row_ids': None if row_ids is None else row_ids.tolist()
+    })
+    response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def _view_rows(snapshot, args):
+    """
+    Row ids passing the text search, date filters and dropdown filters in
+    'args' (see inventory_search), ordered by args['sort'] / args['dir'] when
+    given (stable, like the grid), otherwise in row order.
+    Returns (row ids or None for all rows in row order, a key for the ETag).
+    Raises ValueError for malformed values.
+    """
+    table = snapshot.table
+    text = args.get('q', '').strip()
+    date_rows, date_key = _date_filter_rows(snapshot, args)
+    rows = _intersect_rows(snapshot.search_index.search(text), date_rows)
+
+    selections = [(column, args.get(arg, '')) for arg, column in _DROPDOWN_FILTERS if args.get(arg, '')]
+    if selections:
+        mask = np.ones(len(table), dtype=bool)
+        for column, value in selections:
+            mask &= table.mask_equals(column, value)
+        rows = np.flatnonzero(mask) if rows is None else rows[mask[rows]]
+
+    sort_column = args.get('sort', '')
+    direction = args.get('dir', 'asc')
+    if sort_column and direction != 'none':
+        if sort_column not in table.columns:
+            raise ValueError(f"Unknown sort column '{sort_column}'.")
+        rows = table.argsort([(sort_column, direction == 'desc')], indices=rows)
+
+    return rows, (text.lower(), date_key, selections, sort_column, direction)
+
+def _date_filter_rows(snapshot, args=None):
+    """
+    Applies the date filters in 'args' (the request args by default) using the snapshot's date index:
+      expires_within=N                 Exp_Date from today through today + N days
+      received_from / received_to      Last_Rec_Date range (YYYY-MM-DD, either end optional)
+    Returns (sorted row ids or None when no date filter is set, a key for the ETag).
+    Raises ValueError for malformed values.
+    """
+    args = request.args if args is None else args
+    expires_within = str(args.get('expires_within', '')).strip()
+    received_from = str(args.get('received_from', '')).strip()
+    received_to = str(args.get('received_to', '')).strip()
+    if not (expires_within or received_from or received_to):
+        return None, None
+
+    rows = None
+    today = None
+    if expires_within:
+        try:
+            days_ahead = int(expires_within)
+        except ValueError:
+            raise ValueError('expires_within must be a whole number of days.')
+        if days_ahead < 0:
+            raise ValueError('expires_within cannot be negative.')
+        today = (_local_today() - EPOCH).days # Part of the ETag: the window moves every day
+        rows = snapshot.date_index.rows_between('Exp_Date', today, today + days_ahead)
+
+    if received_from or received_to:
+        first_day, last_day = _parse_epoch_day(received_from), _parse_epoch_day(received_to)
+        rows = _intersect_rows(rows, snapshot.date_index.rows_between('Last_Rec_Date', first_day, last_day))
+
+    return rows, (expires_within, today, received_from, received_to)
+
+def _intersect_rows(rows, other_rows):
+    """Intersects two sorted row-id arrays, where None means 'all rows'."""
+    if rows is None:
+        return other_rows
+    if other_rows is None:
+        return rows
+    return np.intersect1d(rows, other_rows, assume_unique=True)
+
+def _parse_epoch_day(value):
+    """YYYY-MM-DD (as sent by <input type="date">) -> epoch day, or None if blank."""
+    if not value:
+        return None
+    try:
+        return (datetime.strptime(value, '%Y-%m-%d').date() - EPOCH).days
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+
+def _local_today():
+    """Today's date in Pacific time, the zone the portal displays times in."""
+    return datetime.now(pytz.timezone("America/Los_Angeles")).date()
+
+def _format_local_time(utc_dt):
+    """Formats a naive UTC datetime in Pacific time for display (same zone as the admin pages)."""
+    try:
+        local_dt = utc_dt.replace(tzinfo=pytz.utc).astimezone(pytz.timezone("America/Los_Angeles"))
+        return local_dt.strftime('%m/%d/%Y %I:%M %p %Z')
+    except Exception as tz_e:
+        logger.warning(f"Error converting timezones with pytz: {tz_e}. Falling back to UTC.")
+        return utc_dt.strftime('%m/%d/%Y %I:%M %p UTC')
+
+def _export_rows(table, columns, row_ids):
+    """Yields the rows at 'row_ids' (all rows if None) as the grid displays them (see inventory_payload.js formatCell)."""
+    positions = [table.columns.index(column) for column in columns]
+    for record in table.iter_records(row_ids):
+        cells = []
+        for position in positions:
+            name, value = table.columns[position], record[position]
+            if name in NUMERIC_COLUMNS:
+                cells.append(f"{value or 0:,.2f}")
+            elif name in DATE_COLUMNS:
+                cells.append(value.strftime('%m/%d/%Y') if value else '')
+            else:
+                cells.append('' if value is None else str(value).strip())
+        yield cells
 
 @inventory_bp.route('/api/export-xlsx', methods=['POST'])
 @login_required # Protect this route
 def export_inventory_xlsx():
-    """API endpoint to export the visible inventory data to an XLSX file."""
+    """
+    API endpoint to export the visible inventory data to an XLSX file.
+    The browser sends either its view - {headers, columns, version, filters,
+    sort}, and the rows are filtered and sorted here from the cached snapshot
+    (see _view_rows) - or the formatted rows themselves ({headers, rows}).
+    """
     try:
         data = request.get_json()
         headers = data.get('headers', [])
-        rows = data.get('rows', [])
 
-        if not headers or not rows:
+        if data.get('columns') is not None:
+            erp_customer_name = g.customer.get('erp_customer_name')
+            try:
+                snapshot = get_erp_service().get_cached_inventory_snapshot(erp_customer_name)
+            except ERPUnavailableError:
+                return jsonify({'success': False, 'message': 'The inventory system is temporarily unavailable.'}), 503
+            if data.get('version') and data['version'] != snapshot.version:
+                return jsonify({
+                    'success': False,
+                    'reload': True,
+                    'message': 'Your inventory has been updated. Refresh the page to export the latest data.'
+                }), 409
+            columns = data['columns']
+            if len(columns) != len(headers) or any(column not in snapshot.table.columns for column in columns):
+                return jsonify({'success': False, 'message': 'Unknown export columns.'}), 400
+            args = {key: str(value) for key, value in (data.get('filters') or {}).items() if value is not None}
+            sort = data.get('sort') or {}
+            args['sort'] = str(sort.get('column') or '')
+            args['dir'] = str(sort.get('direction') or 'asc')
+            try:
+                row_ids, _ = _view_rows(snapshot, args)
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            row_count = len(snapshot.table) if row_ids is None else len(row_ids)
+            rows = _export_rows(snapshot.table, columns, row_ids)
+        else:
+            rows = data.get('rows', [])
+            row_count = len(rows)
+
+        if not headers or not row_count:
             return jsonify({'success': False, 'message': 'No data to export'}), 400
 
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Inventory Export"
-        ws.append(headers)
-
-        for row_data in rows:
-            processed_row = []
-            for cell_value in row_data:
-                if isinstance(cell_value, str):
-                    cleaned_value = cell_value.replace(',', '') 
-                    try:
-                        processed_row.append(float(cleaned_value))
-                    except ValueError:
-                        processed_row.append(cell_value)
-                else:
-                    processed_row.append(cell_value) 
-            ws.append(processed_row)
-
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
+        import openpyxl # Deferred: only exports need it, and it is the slowest import at startup
+
+        with timed(XLSX_GENERATION_DURATION), span('XLSX generation', 'xlsx', rows=row_count):
+            # Write-only mode streams rows to a temp file instead of keeping every cell object in memory
+            wb = openpyxl.Workbook(write_only=True)
+            ws = wb.create_sheet("Inventory Export")
+            ws.append(headers)
+
+            for row_data in rows:
+                processed_row = []
+                for cell_value in row_data:
+                    if isinstance(cell_value, str):
+                        cleaned_value = cell_value.replace(',', '') 
+                        try:
+                            processed_row.append(float(cleaned_value))
+                        except ValueError:
+                            processed_row.append(cell_value)
+                    else:
+                        processed_row.append(cell_value) 
+                ws.append(processed_row)
+
+            output = BytesIO()
+            wb.save(output)
+            output.seek(0)
 
         # === MODIFICATION: Get name from g.customer ===
         customer_name = g.customer.get('erp_customer_name', 'Export').replace(' ', '_')
@@ -95,6 +410,5 @@ def export_inventory_xlsx():
         )
 
     except Exception as e:
-        print(f"❌ Error exporting inventory: {e}")
-        traceback.print_exc()
+        logger.error(f"Error exporting inventory: {e}", exc_info=True)
         return jsonify({'success': False, 'message': 'An error occurred during export.'}), 500
\ No newline at end of file
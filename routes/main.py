@@ -3,16 +3,19 @@
 Main routes for Customer Portal (Login, Logout, Admin Login)
 """
 
-from flask import Blueprint, render_template, redirect, url_for, session, request, flash, jsonify, g
+import logging
+from flask import Blueprint, render_template, redirect, url_for, session, request, flash, jsonify, g, current_app
 from auth import authenticate_customer, authenticate_admin, login_required
 from config import Config
 from utils import get_client_info, validate_password 
 from database.customer_data import customer_db 
 # === NEW IMPORTS ===
-from database import session_db, audit_db
+from database import session_db, audit_db, get_erp_service
 import secrets
 # === END NEW IMPORTS ===
 
+logger = logging.getLogger(__name__)
+
 main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/')
@@ -38,7 +41,7 @@ def login():
 
     if request.method == 'POST':
         if request.form.get('hp_email'):
-            print("❌ [Bot] Honeypot field filled on customer login page. Bot detected.")
+            logger.error("[Bot] Honeypot field filled on customer login page. Bot detected.")
             return render_template('login.html', email=request.form.get('email', ''))
 
         email = request.form.get('email', '').strip().lower()
@@ -85,17 +88,20 @@ def login():
             )
             # === END NEW SESSION LOGIC ===
             
-            print(f"✅ Customer logged in: {customer_info['email']}")
+            logger.info(f"Customer logged in: {customer_info['email']}")
             
             if customer_info.get('must_reset_password', False):
                 flash('For your security, you must set a new password.', 'info')
                 return redirect(url_for('main.force_password_change'))
 
+            # Warm the inventory cache while the browser follows the redirect
+            get_erp_service().prefetch_customer_inventory(current_app._get_current_object(), customer_info['erp_customer_name'])
+
             next_url = session.pop('next_url', None)
             return redirect(next_url or url_for('inventory.view_inventory'))
         else:
             flash('Invalid email or password, or account inactive.', 'error')
-            print(f"❌ Login failed for customer: {email}")
+            logger.error(f"Login failed for customer: {email}")
             return render_template('login.html', email=email) 
 
     return render_template('login.html')
@@ -124,7 +130,7 @@ def logout():
     # Clear the cookie
     session.clear()
     flash('You have been successfully logged out.', 'success')
-    print(f"🚪 Customer logged out: {customer_email}")
+    logger.info(f"Customer logged out: {customer_email}")
     return redirect(url_for('main.login'))
 
 @main_bp.route('/force-change-password', methods=['GET', 'POST'])
@@ -180,7 +186,7 @@ def admin_login():
     if request.method == 'POST':
         # ... (honeypot check unchanged) ...
         if request.form.get('hp_email'):
-            print("❌ [Bot] Honeypot field filled on admin login page. Bot detected.")
+            logger.error("[Bot] Honeypot field filled on admin login page. Bot detected.")
             return render_template('admin_login.html', username=request.form.get('username', ''))
 
         username = request.form.get('username', '').strip()
@@ -196,11 +202,11 @@ def admin_login():
             session.permanent = True
             session['admin'] = admin_info
             g.admin = admin_info # === MODIFICATION: Set g.admin ===
-            print(f"🔑 Admin logged in: {username} (Method: {admin_info.get('auth_method', 'unknown')})")
+            logger.info(f"Admin logged in: {username} (Method: {admin_info.get('auth_method', 'unknown')})")
             return redirect(url_for('admin_panel.panel'))
         else:
             flash('Invalid admin credentials.', 'error')
-            print(f"❌ Admin login failed for: {username}. See auth logs for details.")
+            logger.error(f"Admin login failed for: {username}. See auth logs for details.")
             return render_template('admin_login.html', username=username)
 
     return render_template('admin_login.html') 
@@ -213,5 +219,5 @@ def admin_logout():
     session.pop('admin', None)
     g.admin = None # === MODIFICATION: Clear g.admin ===
     flash('Administrator logged out.', 'success')
-    print(f"🚪 Admin logged out: {admin_user}")
+    logger.info(f"Admin logged out: {admin_user}")
     return redirect(url_for('main.admin_login'))
\ No newline at end of file
@@ -0,0 +1,220 @@
+# customer_portal/serve.py
+"""
+Customer Portal - Production Server
+Serves the app with Waitress. With SERVER_WORKERS > 1, this process binds
+the port once and supervises that many worker processes, each running its
+own Waitress server (SERVER_THREADS threads) on the shared listening
+socket, so requests are spread across CPU cores. A worker that dies is
+restarted. On Ctrl+C / SIGTERM every worker stops accepting connections,
+keeps its event loop running until the requests in progress have been
+answered and written out (at most SERVER_SHUTDOWN_TIMEOUT seconds), then
+runs the shutdown hooks (utils/lifecycle.py: prefetches, snapshot writes,
+ERP pool) before exiting.
+
+    python serve.py [--workers N] [--threads N] [--host HOST] [--port PORT]
+"""
+
+import _thread
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_RESTART_DELAY = 2 # Seconds before replacing a crashed worker (doubles while it keeps crashing at startup)
+_MAX_RESTART_DELAY = 60
+_STABLE_SECONDS = 60 # A worker that ran this long resets the restart delay
+_DRAIN_POLL_SECONDS = 0.1
+
+
+def bind_socket(host, port):
+    """Creates the listening socket the workers share."""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    if os.name != 'nt': # On Windows SO_REUSEADDR would let another process take over the port
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    return sock
+
+
+def _stop_on_signals(stop_event=None):
+    """SIGTERM (and Windows' SIGBREAK) behave like Ctrl+C; so does setting stop_event (from the supervisor)."""
+    for name in ('SIGINT', 'SIGTERM', 'SIGBREAK'): # SIGINT too: service managers may start us with it ignored
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), signal.default_int_handler)
+    if stop_event is not None:
+        def watch():
+            stop_event.wait()
+            _thread.interrupt_main()
+        threading.Thread(target=watch, name='stop-watcher', daemon=True).start()
+
+
+def _socket_map(server):
+    """The asyncore map of a Waitress server (a single TcpWSGIServer, or a MultiSocketServer)."""
+    return server.map if hasattr(server, 'map') else server._map
+
+
+def serve_until_stopped(server, drain_timeout):
+    """
+    Runs the Waitress event loop until Ctrl+C / SIGTERM, then drains.
+    Waitress's own run() shuts the task threads down straight away on an
+    interrupt, so its loop is driven here instead.
+    """
+    from waitress import wasyncore
+    adj = server.adj
+    try:
+        wasyncore.loop(timeout=adj.asyncore_loop_timeout, map=_socket_map(server), use_poll=adj.asyncore_use_poll)
+    except KeyboardInterrupt:
+        logger.info(f"[Server] Stopping (pid {os.getpid()}): finishing running requests...")
+        drain(server, drain_timeout)
+
+
+def drain(server, timeout):
+    """
+    Stops accepting connections and keeps the event loop running until no
+    request is queued, running or still being written out, or until
+    'timeout' seconds have passed; then closes the server.
+    """
+    from waitress import wasyncore
+    from waitress.channel import HTTPChannel
+    from waitress.server import BaseWSGIServer
+
+    socket_map = _socket_map(server)
+    dispatcher = server.task_dispatcher
+    for listener in [d for d in socket_map.values() if isinstance(d, BaseWSGIServer)]:
+        listener.accepting = False # No longer readable, so nothing more is accepted (the socket stays open)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            channels = [d for d in list(socket_map.values()) if isinstance(d, HTTPChannel)]
+            for channel in channels:
+                if not channel.requests and not channel.total_outbufs_len:
+                    channel.will_close = True # Idle keep-alive connection
+            with dispatcher.lock:
+                busy = bool(dispatcher.queue) or dispatcher.active_count > 0
+            if not busy and not any(channel.requests or channel.total_outbufs_len for channel in channels):
+                break
+            if time.monotonic() >= deadline:
+                logger.warning(f"[Server] Requests still running after {timeout}s; closing anyway.")
+                break
+            wasyncore.loop(timeout=_DRAIN_POLL_SECONDS, map=socket_map, use_poll=server.adj.asyncore_use_poll, count=1)
+    finally:
+        dispatcher.shutdown(timeout=1)
+        wasyncore.close_all(socket_map)
+
+
+def run_worker(sock, options, index=0, stop_event=None):
+    """Serves requests on 'sock' until interrupted, then drains and runs the shutdown hooks."""
+    from waitress import create_server
+    if index > 0:
+        Config.SCHEDULER_ENABLED = False # Scheduled jobs (inventory prewarm) run in worker 0 only
+    from app import create_app
+    from utils.lifecycle import shutdown
+
+    _stop_on_signals(stop_event)
+    app = create_app()
+    server = create_server(
+        app,
+        sockets=[sock],
+        threads=options['threads'],
+        connection_limit=Config.SERVER_CONNECTION_LIMIT,
+        channel_timeout=Config.SERVER_CHANNEL_TIMEOUT,
+        ident='Customer Portal',
+    )
+    logger.info(f"[Server] Worker {index} (pid {os.getpid()}) serving with {options['threads']} threads.")
+    try:
+        serve_until_stopped(server, Config.SERVER_SHUTDOWN_TIMEOUT)
+    except KeyboardInterrupt:
+        pass # Interrupted again while draining
+    finally:
+        shutdown()
+    logger.info(f"[Server] Worker {index} (pid {os.getpid()}) stopped.")
+
+
+def supervise(sock, options):
+    """Runs options['workers'] worker processes on the shared socket until interrupted."""
+    context = multiprocessing.get_context('spawn') # Same behaviour on Windows and Linux
+    stop_event = context.Event()
+    workers = {} # index -> (Process, started at, restart delay)
+
+    def start(index, delay=_RESTART_DELAY):
+        process = context.Process(target=run_worker, args=(sock, options, index, stop_event), name=f"portal-worker-{index}")
+        process.start()
+        workers[index] = (process, time.monotonic(), delay)
+
+    _stop_on_signals()
+    for index in range(options['workers']):
+        start(index)
+    try:
+        while True:
+            time.sleep(1)
+            for index, (process, started, delay) in list(workers.items()):
+                if process.is_alive():
+                    continue
+                if time.monotonic() - started >= _STABLE_SECONDS:
+                    delay = _RESTART_DELAY
+                logger.warning(f"[Server] Worker {index} (pid {process.pid}) exited with code {process.exitcode}; "
+                               f"restarting in {delay}s.")
+                time.sleep(delay)
+                start(index, min(delay * 2, _MAX_RESTART_DELAY))
+    except KeyboardInterrupt:
+        logger.info("[Server] Stopping workers (finishing running requests)...")
+    finally:
+        stop_event.set()
+        deadline = time.monotonic() + Config.SERVER_SHUTDOWN_TIMEOUT + 10 # Drain + shutdown hooks
+        for process, _, _ in workers.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+        for index, (process, _, _) in workers.items():
+            if process.is_alive():
+                logger.warning(f"[Server] Worker {index} (pid {process.pid}) did not stop in time; terminating.")
+                process.terminate()
+        sock.close()
+    logger.info("[Server] Stopped.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run the Customer Portal with Waitress.')
+    parser.add_argument('--workers', type=int, default=Config.SERVER_WORKERS, help='Worker processes (0 = one per CPU core)')
+    parser.add_argument('--threads', type=int, default=Config.SERVER_THREADS, help='Request threads per worker')
+    parser.add_argument('--host', default=Config.SERVER_HOST)
+    parser.add_argument('--port', type=int, default=Config.SERVER_PORT)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+
+    print("\n" + "="*50)
+    print("🚀 LAUNCHING CUSTOMER PORTAL (Waitress)")
+    print("="*50)
+    if not Config.validate():
+        print("\n❌ Aborting due to configuration errors.")
+        raise SystemExit(1)
+
+    sock = bind_socket(args.host, args.port)
+    print(f"   Listening on http://{args.host}:{args.port}")
+    print(f"   Workers: {workers} x {args.threads} threads "
+          f"(connection limit {Config.SERVER_CONNECTION_LIMIT}, channel timeout {Config.SERVER_CHANNEL_TIMEOUT}s)")
+    print("\n   Press CTRL+C to stop the server.\n")
+
+    options = {'workers': workers, 'threads': args.threads}
+    if workers == 1:
+        try:
+            run_worker(sock, options)
+        finally:
+            sock.close()
+    else:
+        supervise(sock, options)
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    main()
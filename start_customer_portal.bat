@@ -20,11 +20,11 @@ echo Activating virtual environment...
 call .\venv\Scripts\activate.bat
 
 echo.
-echo Starting Waitress server on port 5001 with more threads...
+echo Starting Waitress server (workers/threads/port from .env, see SERVER_* settings)...
 echo (Press CTRL+C to stop the server)
 echo.
-REM Run the Waitress server with increased threads (e.g., 20) on port 5001
-waitress-serve --host=0.0.0.0 --port=5001 --threads=20 --call app:create_app
+REM serve.py runs SERVER_WORKERS Waitress processes on one port and drains them on CTRL+C
+python serve.py
 
 echo.
 echo Server stopped.
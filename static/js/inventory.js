@@ -8,7 +8,8 @@ document.addEventListener('DOMContentLoaded', function() {
     restoreFilters(); // Restore filters from sessionStorage
     restoreSortState(); // Restore sort state
     updateSortIndicators(); // Update visual indicators for sort
-    filterInventoryTable(); // Apply initial filter and sort
+    initializeVirtualGrid(); // Scroll handling for the windowed grid
+    loadInventoryData(); // Fetch rows, hand them to the worker, then apply filter and sort
     updateDynamicFilters(null); // Populate dynamic filters on first load
 
     // Export button listener
@@ -25,6 +26,25 @@ let sortState = { // Default sort
     columnType: 'string'
 };
 
+// --- Virtual Grid State ---
+// Rows live column-wise in inventoryData (decoded by inventory_payload.js, in the
+// server's order, so a row's position is its search row id). The worker answers each
+// filter/sort change with currentView, the row positions to show in order; only the
+// rows scrolled into view are ever turned into <tr> elements.
+const ROW_OVERSCAN = 15; // Extra rows rendered above/below the viewport
+const DEFAULT_ROW_HEIGHT = 34; // Until the first real row is measured
+let gridColumns = []; // [{ id, type, className, label, data }] in header order
+let inventoryData = null; // { version, rowCount, names, columns }
+let inventoryVersion = '';
+let inventoryLoaded = false;
+let currentView = new Int32Array(0);
+let inventoryWorker = null;
+let viewRequestSeq = 0; // Used to ignore worker answers to superseded queries
+let currentSearch = { matchingRowIds: null, fallback: null };
+let rowHeight = 0;
+let renderScheduled = false;
+let renderedWindow = null; // 'first:last:seq' of what the tbody currently shows
+
 // --- Event Listeners ---
 function attachFilterListeners() {
     document.getElementById('partFilter').addEventListener('change', (e) => {
@@ -44,6 +64,13 @@ function attachFilterListeners() {
         filterInventoryTable();
         updateDynamicFilters('textSearch');
     }, 250));
+    // Date filters are answered by the server's date index, like the text search
+    ['expiresFilter', 'receivedFrom', 'receivedTo'].forEach(id => {
+        document.getElementById(id).addEventListener('change', () => {
+            filterInventoryTable();
+            updateDynamicFilters('dateFilter');
+        });
+    });
     document.getElementById('resetBtn').addEventListener('click', () => {
         resetFilters(); // This already calls filterInventoryTable
         updateDynamicFilters(null); // 'null' signifies a full reset
@@ -57,6 +84,9 @@ function saveFilters() {
         bin: document.getElementById('binFilter').value,
         status: document.getElementById('statusFilter').value,
         text: document.getElementById('textSearch').value,
+        expires: document.getElementById('expiresFilter').value,
+        receivedFrom: document.getElementById('receivedFrom').value,
+        receivedTo: document.getElementById('receivedTo').value,
     };
     sessionStorage.setItem(FILTER_STORAGE_KEY, JSON.stringify(filters));
 }
@@ -68,6 +98,9 @@ function restoreFilters() {
         document.getElementById('binFilter').value = savedFilters.bin || '';
         document.getElementById('statusFilter').value = savedFilters.status || '';
         document.getElementById('textSearch').value = savedFilters.text || '';
+        document.getElementById('expiresFilter').value = savedFilters.expires || '';
+        document.getElementById('receivedFrom').value = savedFilters.receivedFrom || '';
+        document.getElementById('receivedTo').value = savedFilters.receivedTo || '';
     }
 }
 
@@ -76,79 +109,280 @@ function resetFilters() {
     document.getElementById('binFilter').value = '';
     document.getElementById('statusFilter').value = '';
     document.getElementById('textSearch').value = '';
+    document.getElementById('expiresFilter').value = '';
+    document.getElementById('receivedFrom').value = '';
+    document.getElementById('receivedTo').value = '';
     sessionStorage.removeItem(FILTER_STORAGE_KEY);
     filterInventoryTable(); // Re-apply empty filters
 }
 
+// --- Text search and date filters run on the server's indexes (/inventory/api/search) ---
+let searchRequestSeq = 0; // Used to ignore responses to superseded searches
+let lastSearch = null; // { key, rowIds: Int32Array } for the most recent successful search
+let searchFallbackNotified = false;
+
+/** The filters answered by /inventory/api/search (empty strings when unset). */
+function getServerFilters() {
+    return {
+        q: document.getElementById('textSearch').value.trim().toLowerCase(),
+        expires_within: document.getElementById('expiresFilter').value,
+        received_from: document.getElementById('receivedFrom').value,
+        received_to: document.getElementById('receivedTo').value,
+    };
+}
+
 function filterInventoryTable() {
-    const partFilter = document.getElementById('partFilter').value;
-    const binFilter = document.getElementById('binFilter').value;
-    const statusFilter = document.getElementById('statusFilter').value;
-    const textSearch = document.getElementById('textSearch').value.toLowerCase();
-
-    const tableBody = document.getElementById('inventory-body');
-    const rows = tableBody.querySelectorAll('tr');
-    let visibleCount = 0;
-
-    rows.forEach(row => {
-        // Updated cell count check to 12
-        if (row.cells.length < 12) return;
-
-        const part = row.cells[0].textContent;
-        const bin = row.cells[4].textContent;
-        const status = row.cells[9].textContent;
-
-        // --- MODIFIED: Get all row text content for searching ---
-        const rowText = row.textContent.toLowerCase();
-
-        let show = true;
-
-        if (partFilter && part !== partFilter) show = false;
-        if (binFilter && bin !== binFilter) show = false;
-        if (statusFilter && status !== statusFilter) show = false;
-        
-        // --- MODIFIED: Check if rowText includes the search term ---
-        if (textSearch && !rowText.includes(textSearch)) {
-            show = false;
+    const serverFilters = getServerFilters();
+    const searchKey = JSON.stringify(serverFilters);
+    const requestSeq = ++searchRequestSeq;
+    saveFilters();
+    if (!inventoryLoaded) return; // Applied once the data arrives
+
+    if (!Object.values(serverFilters).some(value => value)) {
+        applyInventoryFilters(null, null);
+        return;
+    }
+    if (lastSearch && lastSearch.key === searchKey) {
+        applyInventoryFilters(lastSearch.rowIds, null);
+        return;
+    }
+
+    const params = new URLSearchParams({ ...serverFilters, v: inventoryVersion });
+
+    fetch(`/inventory/api/search?${params.toString()}`, { headers: { 'Accept': 'application/json' } })
+    .then(response => response.json().then(data => {
+        if (!response.ok || !data.success) {
+            const error = new Error(data.message || `HTTP error ${response.status}`);
+            error.reload = Boolean(data.reload);
+            throw error;
         }
+        return data;
+    }))
+    .then(data => {
+        if (requestSeq !== searchRequestSeq) return; // The user has typed something newer
+        lastSearch = { key: searchKey, rowIds: data.row_ids ? Int32Array.from(data.row_ids) : null };
+        applyInventoryFilters(lastSearch.rowIds, null);
+    })
+    .catch(error => {
+        if (requestSeq !== searchRequestSeq) return;
+        // Fall back to filtering the loaded rows in the worker
+        console.warn('Search index unavailable, filtering in the browser:', error.message);
+        if (error.reload && !searchFallbackNotified) {
+            dtUtils.showAlert(error.message, 'info');
+            searchFallbackNotified = true;
+        }
+        applyInventoryFilters(null, buildFallbackFilters(serverFilters));
+    });
+}
+
+/** Translates the server filters into what the worker can apply itself (dates as epoch days). */
+function buildFallbackFilters(serverFilters) {
+    const toDay = (isoDate) => (isoDate ? Math.floor(Date.parse(isoDate) / 86400000) : null); // 'YYYY-MM-DD' parses as UTC
+    const dates = {};
+    if (serverFilters.expires_within) {
+        const now = new Date();
+        const today = Math.floor(Date.UTC(now.getFullYear(), now.getMonth(), now.getDate()) / 86400000);
+        dates.Exp_Date = [today, today + Number(serverFilters.expires_within)];
+    }
+    if (serverFilters.received_from || serverFilters.received_to) {
+        dates.Last_Rec_Date = [toDay(serverFilters.received_from), toDay(serverFilters.received_to)];
+    }
+    return { text: serverFilters.q, dates };
+}
+
+/**
+ * Asks the worker for the rows that pass the dropdown filters, the text search and the date filters.
+ * @param {Int32Array | null} matchingRowIds - Row ids from the server's indexes (null = no index filtering).
+ * @param {{text: string, dates: Object} | null} fallback - Filters for the worker to apply itself when the server is unavailable.
+ */
+function applyInventoryFilters(matchingRowIds, fallback) {
+    currentSearch = { matchingRowIds, fallback };
+    requestView();
+}
+
+// --- Virtual Grid ---
 
-        row.classList.toggle('hidden-row', !show);
-        if (show) visibleCount++;
+function initializeVirtualGrid() {
+    gridColumns = Array.from(document.querySelectorAll('.grid-table thead th')).map(th => ({
+        id: th.dataset.columnId,
+        type: th.dataset.type || 'string',
+        className: ['numeric', 'date', 'col-description'].filter(name => th.classList.contains(name)).join(' '),
+        label: th.textContent.replace('↑', '').replace('↓', '').trim(),
+        data: null // The decoded column, once loaded
+    }));
+
+    const container = document.getElementById('gridContainer');
+    container.addEventListener('scroll', scheduleRender, { passive: true });
+    window.addEventListener('resize', scheduleRender);
+}
+
+function loadInventoryData() {
+    const container = document.getElementById('gridContainer');
+    if (container.dataset.loadInventory !== 'true') return; // Server already rendered the empty/error message
+
+    fetch('/inventory/api/data', { headers: { 'Accept': 'application/json' } })
+    .then(response => response.json().then(data => {
+        if (!response.ok || !data.success) {
+            throw new Error(data.message || `HTTP error ${response.status}`);
+        }
+        return data;
+    }))
+    .then(payload => {
+        inventoryData = inventoryPayload.decode(payload);
+        inventoryVersion = inventoryData.version;
+        gridColumns.forEach(column => { column.data = inventoryData.columns[column.id] || null; });
+
+        inventoryWorker = new Worker(container.dataset.workerUrl);
+        inventoryWorker.onmessage = handleWorkerMessage;
+        inventoryWorker.onerror = (e) => console.error('Inventory worker error:', e.message);
+        inventoryWorker.postMessage({ type: 'load', data: inventoryData });
+    })
+    .catch(error => {
+        console.error('Inventory load error:', error);
+        showGridMessage(`Error loading inventory: ${error.message}`, true);
+        dtUtils.showAlert(error.message, 'error');
     });
+}
 
-    updateRowCount(visibleCount, rows.length);
-    saveFilters();
-    sortTable(); // Re-apply sort after filtering
+function handleWorkerMessage(e) {
+    const message = e.data;
+    if (message.type === 'loaded') {
+        inventoryLoaded = true;
+        filterInventoryTable(); // Apply the restored filters and sort
+    } else if (message.type === 'view') {
+        if (message.seq !== viewRequestSeq) return; // A newer filter/sort is already queued
+        currentView = message.view;
+        updateRowCount(currentView.length, message.total);
+        renderedWindow = null;
+        renderVisibleRows();
+    }
+}
+
+function requestView() {
+    if (!inventoryWorker || !inventoryLoaded) return;
+    inventoryWorker.postMessage({
+        type: 'query',
+        seq: ++viewRequestSeq,
+        filters: {
+            Part: document.getElementById('partFilter').value,
+            BIN: document.getElementById('binFilter').value,
+            Status: document.getElementById('statusFilter').value,
+        },
+        matchingRowIds: currentSearch.matchingRowIds,
+        fallback: currentSearch.fallback,
+        sort: { column: sortState.column, direction: sortState.direction },
+    });
+}
+
+function scheduleRender() {
+    if (renderScheduled) return;
+    renderScheduled = true;
+    requestAnimationFrame(() => {
+        renderScheduled = false;
+        renderVisibleRows();
+    });
+}
+
+function renderVisibleRows() {
+    if (!inventoryLoaded) return;
+    const container = document.getElementById('gridContainer');
+    const tbody = document.getElementById('inventory-body');
+
+    if (currentView.length === 0) {
+        showGridMessage(inventoryData.rowCount ? 'No inventory matches the current filters.' : 'No inventory data found for your account.');
+        renderedWindow = null;
+        return;
+    }
+
+    const height = rowHeight || DEFAULT_ROW_HEIGHT;
+    const visibleRows = Math.ceil(container.clientHeight / height);
+    const first = Math.max(0, Math.min(Math.floor(container.scrollTop / height) - ROW_OVERSCAN, currentView.length - 1));
+    const last = Math.min(currentView.length, first + visibleRows + 2 * ROW_OVERSCAN);
+
+    const windowKey = `${first}:${last}:${viewRequestSeq}`;
+    if (windowKey === renderedWindow) return; // Scrolled within the rendered window
+    renderedWindow = windowKey;
+
+    const html = [];
+    if (first > 0) html.push(spacerRowHtml(first * height));
+    for (let i = first; i < last; i++) {
+        html.push(rowHtml(currentView[i]));
+    }
+    if (last < currentView.length) html.push(spacerRowHtml((currentView.length - last) * height));
+    tbody.innerHTML = html.join('');
+
+    if (!rowHeight) {
+        // Measure a real row once, then redraw with the correct spacer heights
+        const sample = tbody.querySelector('tr:not(.spacer-row)');
+        if (sample && sample.offsetHeight) {
+            rowHeight = sample.offsetHeight;
+            renderedWindow = null;
+            renderVisibleRows();
+        }
+    }
+}
+
+function spacerRowHtml(height) {
+    return `<tr class="spacer-row" style="height: ${height}px;"><td colspan="${gridColumns.length}"></td></tr>`;
+}
+
+function rowHtml(rowIndex) {
+    const cells = gridColumns.map(column => {
+        const text = escapeHtml(inventoryPayload.formatCell(column.data, rowIndex));
+        const classAttr = column.className ? ` class="${column.className}"` : '';
+        const titleAttr = column.id === 'Description' ? ` title="${text}"` : '';
+        return `<td${classAttr}${titleAttr}>${text}</td>`;
+    });
+    return `<tr>${cells.join('')}</tr>`;
+}
+
+function escapeHtml(text) {
+    return text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;');
+}
+
+function showGridMessage(message, isError = false) {
+    const cell = document.createElement('td');
+    cell.colSpan = gridColumns.length || 12;
+    cell.className = 'grid-message';
+    if (isError) cell.style.color = 'var(--accent-red)';
+    cell.textContent = message;
+    const row = document.createElement('tr');
+    row.appendChild(cell);
+    document.getElementById('inventory-body').replaceChildren(row);
 }
 
 // --- NEW: Dynamic Filter Population Logic ---
+// Options and counts come from the server's facet index (/inventory/api/facets),
+// so updating the dropdowns no longer rescans every table row.
+let facetRequestSeq = 0; // Used to ignore responses to superseded requests
 
 /**
- * Rebuilds a single filter dropdown based on the currently visible table rows.
+ * Rebuilds a single filter dropdown from the server's facet list.
  * @param {string} selectId - The ID of the <select> element to rebuild.
- * @param {Set<string>} availableOptions - A Set of strings containing the options that are valid.
+ * @param {Array<[string, number]>} facetValues - Sorted [value, count] pairs that are still valid.
  */
-function rebuildDropdown(selectId, availableOptions) {
+function rebuildDropdown(selectId, facetValues) {
     const select = document.getElementById(selectId);
     if (!select) return;
 
     const currentValue = select.value; // Save the user's current selection
     const firstOption = select.options[0]; // Save the "All..." option
 
-    select.innerHTML = ''; // Clear all existing options
-    select.appendChild(firstOption); // Add the "All..." option back
+    const fragment = document.createDocumentFragment();
+    fragment.appendChild(firstOption); // Add the "All..." option back
 
-    const sortedOptions = Array.from(availableOptions).sort();
-    
-    sortedOptions.forEach(value => {
+    facetValues.forEach(([value, count]) => {
         if (value) { // Ensure value is not empty
             const option = document.createElement('option');
             option.value = value;
-            option.textContent = value;
-            select.appendChild(option);
+            option.textContent = `${value} (${count.toLocaleString()})`;
+            fragment.appendChild(option);
         }
     });
 
+    select.innerHTML = ''; // Clear all existing options
+    select.appendChild(fragment);
+
     // Restore the user's selection
     // If their previous selection is still in the list, it will be selected.
     // If not, it will default to "All...".
@@ -160,64 +394,47 @@ function rebuildDropdown(selectId, availableOptions) {
  * @param {string | null} changedFilterId - The ID of the filter that was just changed (or null/textSearch if all should be updated).
  */
 function updateDynamicFilters(changedFilterId) {
-    const partFilter = document.getElementById('partFilter').value;
-    const binFilter = document.getElementById('binFilter').value;
-    const statusFilter = document.getElementById('statusFilter').value;
-    const textSearch = document.getElementById('textSearch').value.toLowerCase();
-
-    const tableBody = document.getElementById('inventory-body');
-    const allRows = tableBody.querySelectorAll('tr');
-
-    const availableParts = new Set();
-    const availableBins = new Set();
-    const availableStatuses = new Set();
-
-    allRows.forEach(row => {
-        if (row.cells.length < 12) return;
-        
-        const part = row.cells[0].textContent;
-        const bin = row.cells[4].textContent;
-        const status = row.cells[9].textContent;
-
-        // --- MODIFIED: Get all row text content for searching ---
-        const rowText = row.textContent.toLowerCase();
-
-        // Check if row matches text search (this applies to all calculations)
-        const matchesText = !textSearch || rowText.includes(textSearch);
-
-        if (!matchesText) return; // If it doesn't match text, it's irrelevant
+    const params = new URLSearchParams({
+        part: document.getElementById('partFilter').value,
+        bin: document.getElementById('binFilter').value,
+        status: document.getElementById('statusFilter').value,
+        q: document.getElementById('textSearch').value.trim(),
+        expires_within: document.getElementById('expiresFilter').value,
+        received_from: document.getElementById('receivedFrom').value,
+        received_to: document.getElementById('receivedTo').value,
+    });
+    const requestSeq = ++facetRequestSeq;
 
-        // Check which options are available *given the other filters*
-        const matchesPart = !partFilter || part === partFilter;
-        const matchesBin = !binFilter || bin === binFilter;
-        const matchesStatus = !statusFilter || status === statusFilter;
+    fetch(`/inventory/api/facets?${params.toString()}`, { headers: { 'Accept': 'application/json' } })
+    .then(response => {
+        if (!response.ok) {
+            throw new Error(`HTTP error ${response.status}`);
+        }
+        return response.json();
+    })
+    .then(data => {
+        if (requestSeq !== facetRequestSeq) return; // A newer filter change is already in flight
+        if (!data.success) {
+            console.warn('Facet update failed:', data.message);
+            return;
+        }
 
-        // Add to available Parts if it matches everything *except* Part
-        if (matchesBin && matchesStatus) {
-            availableParts.add(part);
+        // Rebuild the dropdowns, but *skip* the one the user just changed
+        // (unless it was a reset or text search, in which case rebuild all)
+        if (changedFilterId !== 'partFilter') {
+            rebuildDropdown('partFilter', data.facets.Part);
         }
-        // Add to available Bins if it matches everything *except* Bin
-        if (matchesPart && matchesStatus) {
-            availableBins.add(bin);
+        if (changedFilterId !== 'binFilter') {
+            rebuildDropdown('binFilter', data.facets.BIN);
         }
-        // Add to available Statuses if it matches everything *except* Status
-        if (matchesPart && matchesBin) {
-            availableStatuses.add(status);
+        if (changedFilterId !== 'statusFilter') {
+            rebuildDropdown('statusFilter', data.facets.Status);
         }
+    })
+    .catch(error => {
+        // The dropdowns keep their current options; filtering itself still works
+        console.error('Facet update error:', error);
     });
-
-    // Now, rebuild the dropdowns, but *skip* the one the user just changed
-    // (unless it was a reset or text search, in which case rebuild all)
-    
-    if (changedFilterId !== 'partFilter' || changedFilterId === null || changedFilterId === 'textSearch') {
-        rebuildDropdown('partFilter', availableParts);
-    }
-    if (changedFilterId !== 'binFilter' || changedFilterId === null || changedFilterId === 'textSearch') {
-        rebuildDropdown('binFilter', availableBins);
-    }
-    if (changedFilterId !== 'statusFilter' || changedFilterId === null || changedFilterId === 'textSearch') {
-        rebuildDropdown('statusFilter', availableStatuses);
-    }
 }
 // --- END NEW ---
 
@@ -330,64 +547,13 @@ function updateSortIndicators() {
     });
 }
 
-function getSortValue(cell, type) {
-    if (!cell) return null; // Handle missing cells
-    const text = cell.textContent.trim();
-    if (!text || text.toLowerCase() === 'n/a') {
-        // Consistent handling for empty/N/A values
-        switch (type) {
-            case 'numeric': return -Infinity; // Sort N/A numbers first/last depending on direction
-            case 'date':    return new Date('2999-12-31'); // Sort N/A dates last
-            default:        return ''; // Sort N/A strings first
-        }
-    }
-
-    switch (type) {
-        case 'numeric':
-            return parseFloat(text.replace(/,/g, '')) || 0; // Remove commas for parsing
-        case 'date':
-            // Assuming MM/DD/YYYY format from the SQL query
-            const parts = text.match(/(\d{2})\/(\d{2})\/(\d{4})/);
-            if (parts) {
-                // parts[0] is full match, parts[1]=MM, parts[2]=DD, parts[3]=YYYY
-                return new Date(parts[3], parts[1] - 1, parts[2]); // Month is 0-indexed
-            }
-            return new Date('2999-12-31'); // Treat invalid dates as far future
-        default: // string
-            return text.toLowerCase();
-    }
-}
-
 function sortTable() {
     if (!sortState.column || sortState.direction === 'none' || sortState.columnIndex < 0) {
         console.log("Skipping sort, invalid state:", sortState);
         return; // Don't sort if no column selected or index invalid
     }
-
-    const tbody = document.getElementById('inventory-body');
-    // Get only visible rows for sorting
-    const rows = Array.from(tbody.querySelectorAll('tr:not(.hidden-row)'));
-
-    rows.sort((a, b) => {
-        // Ensure rows have enough cells before trying to access them
-        if (a.cells.length <= sortState.columnIndex || b.cells.length <= sortState.columnIndex) {
-            return 0; // Keep relative order if a row is malformed
-        }
-        const valA = getSortValue(a.cells[sortState.columnIndex], sortState.columnType);
-        const valB = getSortValue(b.cells[sortState.columnIndex], sortState.columnType);
-
-        let comparison = 0;
-        if (valA === null && valB === null) comparison = 0;
-        else if (valA === null) comparison = -1; // Put nulls first (or last if desc)
-        else if (valB === null) comparison = 1;
-        else if (valA < valB) comparison = -1;
-        else if (valA > valB) comparison = 1;
-
-        return sortState.direction === 'asc' ? comparison : (comparison * -1);
-    });
-
-    // Re-append sorted visible rows. Hidden rows remain untouched in their original positions.
-    rows.forEach(row => tbody.appendChild(row));
+    // The worker sorts on precomputed keys; ties keep the server's order
+    requestView();
 }
 
 
@@ -397,35 +563,40 @@ function exportVisibleDataToXlsx() {
     exportBtn.disabled = true;
     exportBtn.textContent = '📥 Generating...';
 
-    // Get visible headers
-    const headers = Array.from(document.querySelectorAll('.grid-table thead th'))
-        .filter(th => th.style.display !== 'none' && th.dataset.columnId !== 'Customer_Part') // Exclude hidden columns
-        .map(th => th.textContent.replace('↑','').replace('↓','').trim()); // Clean header text
-
-    const rows = [];
-    document.querySelectorAll('#inventory-body tr:not(.hidden-row)').forEach(row => {
-        const rowData = [];
-        // Iterate through cells corresponding to visible headers
-        Array.from(row.cells).forEach((cell, index) => {
-             const headerCell = document.querySelector(`.grid-table thead th:nth-child(${index + 1})`);
-             if (headerCell && headerCell.style.display !== 'none' && headerCell.dataset.columnId !== 'Customer_Part') {
-                 rowData.push(cell.textContent.trim());
-             }
-        });
-        rows.push(rowData);
-    });
+    // Export exactly what the grid shows. The server rebuilds the view (same filters and sort)
+    // from its cached snapshot; if it can't (data refreshed, ERP down), the formatted rows are sent instead.
+    const headers = gridColumns.map(column => column.label);
 
-    if (rows.length === 0) {
+    if (currentView.length === 0) {
         dtUtils.showAlert('No data currently visible to export.', 'info');
         exportBtn.disabled = false;
         exportBtn.textContent = '📥 Download XLSX';
         return;
     }
 
-    fetch('/inventory/api/export-xlsx', { // Correct API endpoint
+    const postExport = (body) => fetch('/inventory/api/export-xlsx', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ headers, rows })
+        body: JSON.stringify(body)
+    });
+    const viewRequest = {
+        headers,
+        columns: gridColumns.map(column => column.id),
+        version: inventoryVersion,
+        filters: {
+            ...getServerFilters(),
+            part: document.getElementById('partFilter').value,
+            bin: document.getElementById('binFilter').value,
+            status: document.getElementById('statusFilter').value,
+        },
+        sort: { column: sortState.column, direction: sortState.direction },
+    };
+
+    postExport(viewRequest)
+    .then(response => {
+        if (response.status !== 409 && response.status !== 503) return response;
+        const rows = Array.from(currentView, index => gridColumns.map(column => inventoryPayload.formatCell(column.data, index)));
+        return postExport({ headers, rows });
     })
     .then(response => {
         if (!response.ok) {
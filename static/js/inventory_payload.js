@@ -0,0 +1,82 @@
+// customer_portal/static/js/inventory_payload.js
+// Decoder for the column-oriented inventory payload (/inventory/api/data).
+// Loaded by the inventory page and by inventory_worker.js (importScripts),
+// so it only touches `self`, never `window` or the DOM.
+//
+// Wire format (database/inventory_payload.py), format_version 1:
+//   { format: 'inventory-columns', format_version: 1, version, row_count,
+//     columns: [ { name, encoding: 'dict',   values: [...], codes: [...] }
+//              | { name, encoding: 'number', data: [...] }
+//              | { name, encoding: 'date',   data: [epochDay | null, ...] }
+//              | { name, encoding: 'text',   data: [...] } ] }
+
+(function(scope) {
+    const FORMAT = 'inventory-columns';
+    const FORMAT_VERSION = 1;
+    const NO_DATE = 2147483647; // Blank dates: larger than any real day, so they sort last
+    const MS_PER_DAY = 86400000;
+
+    /**
+     * Decodes a parsed payload into typed column arrays.
+     * @returns {{version: string, rowCount: number, names: string[], columns: Object<string, Object>}}
+     */
+    function decode(payload) {
+        if (payload.format !== FORMAT || payload.format_version !== FORMAT_VERSION) {
+            throw new Error(`Unsupported inventory data format ${payload.format} v${payload.format_version}`);
+        }
+        const columns = {};
+        payload.columns.forEach(column => {
+            switch (column.encoding) {
+                case 'dict':
+                    columns[column.name] = { name: column.name, encoding: 'dict', values: column.values, codes: Int32Array.from(column.codes) };
+                    break;
+                case 'number':
+                    columns[column.name] = { name: column.name, encoding: 'number', data: Float64Array.from(column.data) };
+                    break;
+                case 'date':
+                    columns[column.name] = { name: column.name, encoding: 'date', data: Int32Array.from(column.data, day => (day === null ? NO_DATE : day)) };
+                    break;
+                default:
+                    columns[column.name] = { name: column.name, encoding: 'text', data: column.data };
+            }
+        });
+        return {
+            version: payload.version,
+            rowCount: payload.row_count,
+            names: payload.columns.map(column => column.name),
+            columns,
+        };
+    }
+
+    /** Raw value of one cell: string, number, or epoch day (NO_DATE when blank). */
+    function cellValue(column, row) {
+        if (!column) return '';
+        if (column.encoding === 'dict') return column.values[column.codes[row]];
+        return column.data[row];
+    }
+
+    /** Epoch day -> MM/DD/YYYY, the format the grid has always shown. */
+    function formatDay(day) {
+        if (day === NO_DATE || day === undefined) return '';
+        const d = new Date(day * MS_PER_DAY);
+        const mm = String(d.getUTCMonth() + 1).padStart(2, '0');
+        const dd = String(d.getUTCDate()).padStart(2, '0');
+        return `${mm}/${dd}/${d.getUTCFullYear()}`;
+    }
+
+    /** Display text of one cell (quantities with 2 decimals and thousands separators). */
+    function formatCell(column, row) {
+        if (!column) return '';
+        const value = cellValue(column, row);
+        switch (column.encoding) {
+            case 'number':
+                return Number(value || 0).toLocaleString('en-US', { minimumFractionDigits: 2, maximumFractionDigits: 2 });
+            case 'date':
+                return formatDay(value);
+            default:
+                return value === null || value === undefined ? '' : String(value).trim();
+        }
+    }
+
+    scope.inventoryPayload = { FORMAT, FORMAT_VERSION, NO_DATE, decode, cellValue, formatCell, formatDay };
+})(self);
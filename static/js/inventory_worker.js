@@ -0,0 +1,148 @@
+// customer_portal/static/js/inventory_worker.js
+// Filters and sorts the inventory grid off the main thread.
+// The page posts the decoded column arrays once ('load'); the worker
+// precomputes a typed sort key per column and answers each 'query' with
+// the row indices of the current view (an Int32Array, transferred back
+// without copying).
+
+importScripts('inventory_payload.js'); // Resolved relative to this file
+
+let data = { rowCount: 0, names: [], columns: {} }; // Decoded payload (see inventory_payload.js)
+let sortKeys = {}; // column name -> typed array ranking each row, built on first use
+let rowText = null; // Lowercased text of each row, only built for the fallback search
+
+let pendingQuery = null; // Only the newest query is worth answering
+let queryScheduled = false;
+
+const FILTER_COLUMNS = ['Part', 'BIN', 'Status'];
+
+self.onmessage = function(e) {
+    const message = e.data;
+    if (message.type === 'load') {
+        data = message.data;
+        sortKeys = {};
+        rowText = null;
+        self.postMessage({ type: 'loaded', total: data.rowCount });
+    } else if (message.type === 'query') {
+        pendingQuery = message;
+        if (!queryScheduled) {
+            queryScheduled = true;
+            setTimeout(runPendingQuery, 0); // Let queued keystrokes collapse into one query
+        }
+    }
+};
+
+// --- Precomputed keys ---
+
+function rankStrings(values) {
+    // Rank of each value by its lowercased text (equal text = equal rank)
+    const lowered = values.map(value => String(value ?? '').trim().toLowerCase());
+    const ranks = new Map();
+    Array.from(new Set(lowered)).sort().forEach((value, rank) => ranks.set(value, rank));
+    return Int32Array.from(lowered, value => ranks.get(value));
+}
+
+function getSortKey(name) {
+    if (sortKeys[name]) return sortKeys[name];
+    const column = data.columns[name];
+    if (!column) return null;
+
+    let key;
+    switch (column.encoding) {
+        case 'number':
+        case 'date':
+            key = column.data; // Already numeric; blank dates decode to NO_DATE and sort last
+            break;
+        case 'dict': {
+            const valueRanks = rankStrings(column.values); // Rank the distinct values once
+            key = Int32Array.from(column.codes, code => valueRanks[code]);
+            break;
+        }
+        default:
+            key = rankStrings(column.data);
+    }
+    sortKeys[name] = key;
+    return key;
+}
+
+function getRowText() {
+    if (!rowText) {
+        const columns = data.names.map(name => data.columns[name]);
+        rowText = new Array(data.rowCount);
+        for (let i = 0; i < data.rowCount; i++) {
+            rowText[i] = columns.map(column => inventoryPayload.formatCell(column, i)).join(' ').toLowerCase();
+        }
+    }
+    return rowText;
+}
+
+// --- Queries ---
+
+function runPendingQuery() {
+    queryScheduled = false;
+    const query = pendingQuery;
+    pendingQuery = null;
+    if (!query) return;
+
+    const view = filterRows(query);
+    sortView(view, query.sort);
+    self.postMessage({ type: 'view', seq: query.seq, view, total: data.rowCount }, [view.buffer]);
+}
+
+function filterRows(query) {
+    const total = data.rowCount;
+    const filters = query.filters || {};
+    const checks = [];
+    FILTER_COLUMNS.forEach(name => {
+        const value = filters[name];
+        const column = data.columns[name];
+        if (!value || !column || column.encoding !== 'dict') return;
+        checks.push({ codes: column.codes, code: column.values.indexOf(value) }); // -1 matches nothing
+    });
+
+    let allowed = null; // Rows the search index matched
+    if (query.matchingRowIds) {
+        allowed = new Uint8Array(total);
+        query.matchingRowIds.forEach(id => { if (id < total) allowed[id] = 1; });
+    }
+    const fallback = query.fallback || {};
+    const text = fallback.text || '';
+    const texts = text ? getRowText() : null;
+    const dateChecks = []; // [days, first, last] per date range (null ends are open)
+    Object.entries(fallback.dates || {}).forEach(([name, [first, last]]) => {
+        const column = data.columns[name];
+        if (column && column.encoding === 'date') dateChecks.push([column.data, first, last]);
+    });
+
+    const matches = new Int32Array(total);
+    let count = 0;
+    for (let i = 0; i < total; i++) {
+        let show = true;
+        for (let c = 0; c < checks.length; c++) {
+            if (checks[c].codes[i] !== checks[c].code) { show = false; break; }
+        }
+        if (show && allowed && !allowed[i]) show = false;
+        if (show && texts && !texts[i].includes(text)) show = false;
+        for (let d = 0; show && d < dateChecks.length; d++) {
+            const [days, first, last] = dateChecks[d];
+            const day = days[i];
+            if (day === inventoryPayload.NO_DATE || (first !== null && day < first) || (last !== null && day > last)) show = false;
+        }
+        if (show) matches[count++] = i;
+    }
+    return matches.slice(0, count);
+}
+
+function sortView(view, sort) {
+    if (!sort || !sort.column || sort.direction === 'none') return;
+    const key = getSortKey(sort.column);
+    if (!key) return;
+    const direction = sort.direction === 'desc' ? -1 : 1;
+    // Ties keep the original (server) order, so the sort is stable
+    view.sort((a, b) => {
+        const ka = key[a], kb = key[b];
+        if (ka < kb) return -direction;
+        if (ka > kb) return direction;
+        return a - b;
+    });
+}
@@ -0,0 +1,40 @@
+# customer_portal/tests/test_erp_sharded_query.py
+"""The sharded 'All' inventory query returns the same rows, in the same order, as the single query."""
+
+from collections import Counter
+import pytest
+from flask import Flask
+from benchmarks.fakes import FakeDataStore, install_fakes
+from config import Config
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    FakeDataStore.configure(lots=2000, erp_customers=6, local_customers=10, audit_rows=10)
+    install_fakes()
+    monkeypatch.setattr(Config, 'ERP_FACTS_ONLY_INVENTORY', False)
+    from database.erp_queries import ERPInventoryQueries
+    with Flask(__name__).app_context():
+        yield ERPInventoryQueries()
+
+
+def _fetch_all(queries, monkeypatch, shards):
+    monkeypatch.setattr(Config, 'ERP_ALL_QUERY_SHARDS', shards)
+    return [tuple(record) for record in queries.iter_inventory_by_customer('All')]
+
+
+def test_sharded_and_single_query_order_match(queries, monkeypatch):
+    single = _fetch_all(queries, monkeypatch, shards=1)
+    sharded = _fetch_all(queries, monkeypatch, shards=4)
+    # Lots split over several bins tie on (Customer, Part, User_Lot): only the BIN tiebreak orders them
+    lots = Counter((row['Customer'], row['Part'], row['User_Lot']) for row in FakeDataStore.inventory_rows)
+    assert any(count > 1 for count in lots.values())
+    assert len(single) == len(FakeDataStore.inventory_rows)
+    assert sharded == single
+
+
+def test_facts_only_query_order_matches(queries, monkeypatch):
+    single = _fetch_all(queries, monkeypatch, shards=1)
+    monkeypatch.setattr(Config, 'ERP_FACTS_ONLY_INVENTORY', True)
+    facts = [tuple(record) for record in queries.iter_inventory_by_customer('All')]
+    assert facts == single
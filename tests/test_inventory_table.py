@@ -0,0 +1,56 @@
+# customer_portal/tests/test_inventory_table.py
+"""Filtering and sorting of the columnar InventoryTable."""
+
+from datetime import date
+import numpy as np
+from database.inventory_table import InventoryTable
+
+
+def _table():
+    rows = [
+        {'Part': 'b-200', 'Description': 'Carton', 'On_Hand_Qty': 5, 'BIN': 'A01', 'User_Lot': 'L3',
+         'Exp_Date': date(2025, 3, 1), 'Status': 'Available'},
+        {'Part': 'A-100', 'Description': ' box', 'On_Hand_Qty': 12.5, 'BIN': 'B02', 'User_Lot': 'l1',
+         'Exp_Date': None, 'Status': 'Pending QC'},
+        {'Part': 'a-100', 'Description': 'Carton lid', 'On_Hand_Qty': 1, 'BIN': 'A01', 'User_Lot': 'L2',
+         'Exp_Date': date(2024, 1, 15), 'Status': 'Available'},
+        {'Part': 'C-300', 'Description': 'Tape', 'On_Hand_Qty': 0, 'BIN': 'C03', 'User_Lot': None,
+         'Exp_Date': date(2025, 3, 1), 'Status': 'Quarantined'},
+    ]
+    return InventoryTable.from_records(rows)
+
+
+def test_argsort_is_case_insensitive_and_stable():
+    table = _table()
+    # 'A-100' and 'a-100' tie: they keep table order
+    assert table.argsort([('Part', False)]).tolist() == [1, 2, 0, 3]
+    assert table.argsort([('Part', True)]).tolist() == [3, 0, 1, 2]
+
+
+def test_argsort_puts_blank_dates_last_like_the_grid():
+    table = _table()
+    assert table.argsort([('Exp_Date', False)]).tolist() == [2, 0, 3, 1]
+    assert table.argsort([('Exp_Date', True)]).tolist() == [1, 0, 3, 2]
+
+
+def test_argsort_multiple_keys_and_subset():
+    table = _table()
+    assert table.argsort([('Exp_Date', False), ('Part', True)]).tolist() == [2, 3, 0, 1]
+    assert table.argsort([('On_Hand_Qty', True)], indices=np.array([0, 2, 3])).tolist() == [0, 2, 3]
+
+
+def test_masks():
+    table = _table()
+    assert np.flatnonzero(table.mask_equals('BIN', 'A01')).tolist() == [0, 2]
+    assert np.flatnonzero(table.mask_isin('Status', ('Pending QC', 'Quarantined'))).tolist() == [1, 3]
+    assert not table.mask_equals('BIN', 'Z99').any()
+    assert np.flatnonzero(table.mask_contains('CART', ['Description'])).tolist() == [0, 2]
+    assert np.flatnonzero(table.mask_range('On_Hand_Qty', low=1, high=5)).tolist() == [0, 2]
+    # Blank dates never match a date range
+    assert np.flatnonzero(table.mask_range('Exp_Date', low=0)).tolist() == [0, 2, 3]
+
+
+def test_take_keeps_the_selected_rows_in_order():
+    table = _table()
+    subset = table.take(table.argsort([('Part', False)], indices=np.flatnonzero(table.mask_equals('BIN', 'A01'))))
+    assert [record.Part for record in subset] == ['a-100', 'b-200']
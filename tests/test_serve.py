@@ -0,0 +1,73 @@
+# customer_portal/tests/test_serve.py
+"""Graceful shutdown of the Waitress worker (serve.py)."""
+
+import http.client
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A worker serving one slow endpoint; prints its port, then serves until SIGINT
+_WORKER_SCRIPT = '''
+import time
+from waitress import create_server
+import serve
+
+BODY = b'x' * (40 * 1024 * 1024) # Above waitress's outbuf high watermark: the event loop has to write it out
+
+def app(environ, start_response):
+    time.sleep(1.5)
+    start_response('200 OK', [('Content-Type', 'text/plain'), ('Content-Length', str(len(BODY)))])
+    return [BODY]
+
+sock = serve.bind_socket('127.0.0.1', 0)
+server = create_server(app, sockets=[sock], threads=2)
+serve._stop_on_signals()
+print('PORT', sock.getsockname()[1], flush=True)
+serve.serve_until_stopped(server, drain_timeout=10)
+print('STOPPED', flush=True)
+'''
+
+
+def _read_marker(process, marker):
+    for line in process.stdout:
+        if line.startswith(marker):
+            return line.split()
+    raise AssertionError(f"worker exited before printing {marker}")
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='sends SIGINT to the worker process')
+def test_signal_during_slow_request_still_delivers_full_response():
+    process = subprocess.Popen([sys.executable, '-c', _WORKER_SCRIPT], cwd=PROJECT_ROOT,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        port = int(_read_marker(process, 'PORT')[1])
+        result = {}
+
+        def fetch():
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=20)
+            conn.request('GET', '/slow')
+            response = conn.getresponse()
+            result['status'] = response.status
+            result['body'] = response.read()
+            conn.close()
+
+        client = threading.Thread(target=fetch)
+        client.start()
+        time.sleep(0.5) # The request is now running in a task thread
+        process.send_signal(signal.SIGINT)
+        client.join(20)
+
+        assert result.get('status') == 200
+        assert result.get('body') == b'x' * (40 * 1024 * 1024)
+        _read_marker(process, 'STOPPED')
+        assert process.wait(20) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
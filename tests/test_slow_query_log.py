@@ -0,0 +1,42 @@
+# customer_portal/tests/test_slow_query_log.py
+"""Percentiles and fingerprint retention of the slow-query recorder."""
+
+import random
+from config import Config
+from utils.slow_query_log import QueryStats, SlowQueryLog, nearest_rank
+
+
+def test_nearest_rank_over_100_known_samples():
+    samples = list(range(1, 101)) # 1..100: the p-th percentile is p
+    assert nearest_rank(samples, 50) == 50
+    assert nearest_rank(samples, 99) == 99
+    assert nearest_rank(samples, 57) == 57
+    assert nearest_rank(samples, 100) == 100
+    assert nearest_rank(samples, 0) == 1
+    assert nearest_rank([], 99) is None
+
+
+def test_query_stats_percentiles_over_100_samples():
+    stats = QueryStats('abc', 'erp', 'SELECT ?', sample_size=200)
+    durations = [n / 1000.0 for n in range(1, 101)]
+    random.Random(7).shuffle(durations)
+    for seconds in durations:
+        stats.add('q', seconds, rows=1, param_count=0)
+    assert stats.percentile(50) == 0.050
+    assert stats.percentile(99) == 0.099 # Not the maximum (0.100)
+    assert stats.to_dict()['p99_ms'] == 99.0
+
+
+def test_recurring_fingerprints_survive_a_burst_of_one_offs(monkeypatch):
+    monkeypatch.setattr(Config, 'SLOW_QUERY_LOG_ENABLED', True)
+    monkeypatch.setattr(Config, 'SLOW_QUERY_MAX_FINGERPRINTS', 10)
+    monkeypatch.setattr(Config, 'SLOW_QUERY_LOG_FILE', None)
+    log = SlowQueryLog()
+    for i in range(5):
+        for _ in range(3):
+            log.record('erp', f'recurring{i}', f'SELECT * FROM recurring_{i}', None, 0.001, 1)
+    for i in range(200):
+        log.record('erp', 'one_off', f'SELECT * FROM one_off_{i}', None, 0.5, 1)
+    kept = {name for stats in log.top_by_total_time(50) for name in stats['query_names']}
+    assert {f'recurring{i}' for i in range(5)} <= kept
+    assert log.summary()['fingerprints'] == 10
@@ -11,6 +11,13 @@ from .helpers import (
     safe_int
 )
 
+from .http_middleware import (
+    init_http_middleware,
+    make_weak_etag,
+    is_not_modified,
+    not_modified_response
+)
+
 from .validators import (
     validate_email,
     validate_password # Add password validator
@@ -21,6 +28,10 @@ __all__ = [
     'format_datetime',
     'safe_str',
     'safe_int',
+    'init_http_middleware',
+    'make_weak_etag',
+    'is_not_modified',
+    'not_modified_response',
     'validate_email',
     'validate_password'
 ]
\ No newline at end of file
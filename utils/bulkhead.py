@@ -0,0 +1,144 @@
+# customer_portal/utils/bulkhead.py
+"""
+Request bulkheads
+Waitress serves every route from one thread pool, so slow ERP-bound
+requests could occupy all of it and leave logins and admin pages queued
+behind them. This WSGI middleware classifies requests by path and caps how
+many worker threads each compartment may hold (running plus briefly
+queued). ERP-bound requests beyond that get an immediate 503, and the
+remaining threads stay free for everything else.
+"""
+
+import json
+import logging
+import threading
+import time
+from werkzeug.wsgi import ClosingIterator
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class BulkheadFullError(Exception):
+    """Raised when a compartment's running slots and queue are both full (or the wait timed out)."""
+
+
+class Bulkhead:
+    """A bounded compartment: max_concurrent running requests, max_queue waiting up to queue_timeout."""
+
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._running = 0
+        self._queued = 0
+        self.rejected = 0 # Total requests turned away
+
+    def enter(self):
+        """Takes a running slot, waiting in the queue if there is room. Raises BulkheadFullError."""
+        with self._cond:
+            if self._running < self.max_concurrent:
+                self._running += 1
+                return
+            if self._queued >= self.max_queue:
+                self.rejected += 1
+                raise BulkheadFullError(f"'{self.name}' bulkhead is full.")
+            self._queued += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self._running >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise BulkheadFullError(f"Timed out waiting in the '{self.name}' bulkhead queue.")
+                    self._cond.wait(remaining)
+                self._running += 1
+            finally:
+                self._queued -= 1
+
+    def leave(self):
+        with self._cond:
+            self._running -= 1
+            self._cond.notify_all() # Waiters that timed out meanwhile must not swallow the wakeup
+
+    def status(self):
+        """Snapshot for diagnostics."""
+        with self._cond:
+            return {
+                'name': self.name,
+                'running': self._running,
+                'max_concurrent': self.max_concurrent,
+                'queued': self._queued,
+                'max_queue': self.max_queue,
+                'rejected': self.rejected,
+            }
+
+
+class BulkheadMiddleware:
+    """Routes each request to the compartment for its path prefix; unmatched paths are not limited."""
+
+    def __init__(self, wsgi_app, compartments):
+        self.wsgi_app = wsgi_app
+        self.compartments = compartments # list of (path prefixes, Bulkhead)
+
+    def classify(self, path):
+        for prefixes, bulkhead in self.compartments:
+            if path.startswith(prefixes):
+                return bulkhead
+        return None
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        bulkhead = self.classify(path)
+        if bulkhead is None:
+            return self.wsgi_app(environ, start_response)
+        try:
+            bulkhead.enter()
+        except BulkheadFullError as e:
+            logger.warning(f"[Bulkhead] Rejected {environ.get('REQUEST_METHOD')} {path}: {e}")
+            return self._unavailable(path, start_response)
+        try:
+            app_iter = self.wsgi_app(environ, start_response)
+        except BaseException:
+            bulkhead.leave()
+            raise
+        # The slot is held until the response body has been sent
+        return ClosingIterator(app_iter, [bulkhead.leave])
+
+    @staticmethod
+    def _unavailable(path, start_response):
+        message = 'The inventory system is busy right now. Please try again in a moment.'
+        if '/api/' in path:
+            body = json.dumps({'success': False, 'message': message}).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            body = f"<!DOCTYPE html><title>Busy</title><p>{message}</p>".encode('utf-8')
+            content_type = 'text/html; charset=utf-8'
+        start_response('503 SERVICE UNAVAILABLE', [
+            ('Content-Type', content_type),
+            ('Content-Length', str(len(body))),
+            ('Retry-After', str(Config.BULKHEAD_RETRY_AFTER)),
+            ('Cache-Control', 'no-store'),
+        ])
+        return [body]
+
+
+# Singleton ERP compartment (inventory page, its API calls and exports)
+erp_bulkhead = Bulkhead(
+    'erp',
+    max_concurrent=Config.BULKHEAD_ERP_MAX_CONCURRENT,
+    max_queue=Config.BULKHEAD_ERP_MAX_QUEUE,
+    queue_timeout=Config.BULKHEAD_ERP_QUEUE_TIMEOUT
+)
+
+
+def init_bulkheads(app):
+    """Wraps app.wsgi_app so ERP-bound paths run in their own bounded compartment."""
+    if not Config.BULKHEAD_ENABLED:
+        return
+    erp_prefixes = tuple(p.strip() for p in Config.BULKHEAD_ERP_PATHS.split(',') if p.strip())
+    app.wsgi_app = BulkheadMiddleware(app.wsgi_app, [(erp_prefixes, erp_bulkhead)])
+    logger.info(f"[Bulkhead] ERP-bound paths {', '.join(erp_prefixes)} limited to "
+                f"{erp_bulkhead.max_concurrent} running + {erp_bulkhead.max_queue} queued requests.")
@@ -3,13 +3,17 @@
 Handles sending emails for the application.
 """
 
+import logging
 import smtplib
 import ssl
 from email.message import EmailMessage
 from config import Config # Import Config class
+from utils.tracing import span
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 import os
 
+logger = logging.getLogger(__name__)
+
 # Set up Jinja environment to load email templates
 template_dir = os.path.join(os.path.dirname(__file__), '..', 'templates')
 jinja_env = Environment(
@@ -20,10 +24,11 @@ jinja_env = Environment(
 def _render_email_template(template_name, **context):
     """Helper function to render an email template."""
     try:
-        template = jinja_env.get_template(template_name)
-        return template.render(context)
+        with span(f"render {template_name}", 'template'):
+            template = jinja_env.get_template(template_name)
+            return template.render(context)
     except Exception as e:
-        print(f"❌ [Email] Error rendering template '{template_name}': {e}")
+        logger.error(f"[Email] Error rendering template '{template_name}': {e}")
         return None
 
 # === NEW: Welcome Email Function ===
@@ -33,7 +38,7 @@ def send_welcome_email(to_email, first_name, temp_password):
     Includes Bcc if configured.
     """
     if not Config.SMTP_SERVER or not Config.SMTP_USERNAME:
-        print("⚠️ [Email] SMTP settings not configured. Cannot send email.")
+        logger.warning("[Email] SMTP settings not configured. Cannot send email.")
         return False, "Email server is not configured."
 
     subject = "Welcome to the WePackItAll Customer Portal"
@@ -59,7 +64,7 @@ def send_welcome_email(to_email, first_name, temp_password):
     # Add Bcc if configured
     if Config.EMAIL_BCC:
         msg['Bcc'] = Config.EMAIL_BCC
-        print(f"ℹ️ [Email] Bcc'ing {Config.EMAIL_BCC}")
+        logger.info(f"[Email] Bcc'ing {Config.EMAIL_BCC}")
 
     # Set plain text content as fallback
     msg.set_content(
@@ -73,22 +78,22 @@ def send_welcome_email(to_email, first_name, temp_password):
 
     try:
         context = ssl.create_default_context()
-        with smtplib.SMTP(Config.SMTP_SERVER, Config.SMTP_PORT) as server:
+        with span('SMTP send', 'smtp', email='welcome'), smtplib.SMTP(Config.SMTP_SERVER, Config.SMTP_PORT) as server:
             if Config.SMTP_USE_TLS:
                 server.starttls(context=context)
             if Config.SMTP_USERNAME and Config.SMTP_PASSWORD:
                  server.login(Config.SMTP_USERNAME, Config.SMTP_PASSWORD)
             server.send_message(msg)
-        print(f"✅ [Email] Welcome email sent to {to_email}")
+        logger.info(f"[Email] Welcome email sent to {to_email}")
         return True, "Email sent successfully."
     except smtplib.SMTPAuthenticationError as e:
-        print(f"❌ [Email] SMTP Authentication Error: {e}. Check username/password in .env")
+        logger.error(f"[Email] SMTP Authentication Error: {e}. Check username/password in .env")
         return False, "Failed to send email due to authentication error."
     except smtplib.SMTPException as e:
-        print(f"❌ [Email] SMTP error sending email to {to_email}: {e}")
+        logger.error(f"[Email] SMTP error sending email to {to_email}: {e}")
         return False, "Failed to send email due to an SMTP error."
     except Exception as e:
-        print(f"❌ [Email] Unknown error sending email: {e}")
+        logger.error(f"[Email] Unknown error sending email: {e}")
         return False, "An unknown error occurred while sending the email."
 
 # === END NEW ===
@@ -99,7 +104,7 @@ def send_password_reset_email(to_email, first_name, temp_password):
     Includes Bcc if configured.
     """
     if not Config.SMTP_SERVER or not Config.SMTP_USERNAME:
-        print("⚠️ [Email] SMTP settings not configured. Cannot send email.")
+        logger.warning("[Email] SMTP settings not configured. Cannot send email.")
         return False, "Email server is not configured."
 
     subject = "Your Customer Portal Password Has Been Reset"
@@ -125,7 +130,7 @@ def send_password_reset_email(to_email, first_name, temp_password):
     # === Add Bcc if configured ===
     if Config.EMAIL_BCC:
         msg['Bcc'] = Config.EMAIL_BCC
-        print(f"ℹ️ [Email] Bcc'ing {Config.EMAIL_BCC}")
+        logger.info(f"[Email] Bcc'ing {Config.EMAIL_BCC}")
     # === END ===
 
     # Set plain text content as fallback
@@ -139,7 +144,7 @@ def send_password_reset_email(to_email, first_name, temp_password):
 
     try:
         context = ssl.create_default_context()
-        with smtplib.SMTP(Config.SMTP_SERVER, Config.SMTP_PORT) as server:
+        with span('SMTP send', 'smtp', email='password_reset'), smtplib.SMTP(Config.SMTP_SERVER, Config.SMTP_PORT) as server:
             if Config.SMTP_USE_TLS:
                 server.starttls(context=context)
             # Ensure login happens *after* starttls if TLS is used
@@ -147,14 +152,14 @@ def send_password_reset_email(to_email, first_name, temp_password):
                  server.login(Config.SMTP_USERNAME, Config.SMTP_PASSWORD)
             # send_message handles To, Cc, Bcc automatically
             server.send_message(msg)
-        print(f"✅ [Email] Password reset email sent to {to_email}")
+        logger.info(f"[Email] Password reset email sent to {to_email}")
         return True, "Email sent successfully."
     except smtplib.SMTPAuthenticationError as e:
-        print(f"❌ [Email] SMTP Authentication Error: {e}. Check username/password in .env")
+        logger.error(f"[Email] SMTP Authentication Error: {e}. Check username/password in .env")
         return False, "Failed to send email due to authentication error."
     except smtplib.SMTPException as e:
-        print(f"❌ [Email] SMTP error sending email to {to_email}: {e}")
+        logger.error(f"[Email] SMTP error sending email to {to_email}: {e}")
         return False, "Failed to send email due to an SMTP error."
     except Exception as e:
-        print(f"❌ [Email] Unknown error sending email: {e}")
+        logger.error(f"[Email] Unknown error sending email: {e}")
         return False, "An unknown error occurred while sending the email."
\ No newline at end of file
@@ -4,9 +4,12 @@ Helper utility functions
 Common functions used across the application
 """
 
+import logging
 from datetime import datetime
 from flask import request
 
+logger = logging.getLogger(__name__)
+
 def get_client_info():
     """
     Get client IP address and user agent for logging
@@ -25,7 +28,7 @@ def get_client_info():
         if value:
             # Take the first IP if multiple are present (e.g., in X-Forwarded-For)
             ip = value.split(',')[0].strip()
-            print(f"ℹ️ [IP_Check] Found IP in header '{header}': {ip}") # Add log
+            logger.debug("[IP_Check] Found IP in header '%s': %s", header, ip) # Every request: debug only
             break
             
     user_agent = request.headers.get('User-Agent', '')[:500]  # Limit to 500 chars
@@ -0,0 +1,144 @@
+# customer_portal/utils/http_middleware.py
+"""
+HTTP response middleware
+Adds on-the-fly gzip/deflate compression and weak ETag / 304 handling
+to text responses (HTML pages and JSON endpoints).
+"""
+
+import hashlib
+import zlib
+from flask import request, session, make_response
+from config import Config
+
+# Mimetypes worth compressing. Images (other than SVG), XLSX and other
+# binary downloads are already compressed and are left untouched.
+COMPRESSIBLE_MIMETYPES = {
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/csv',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'image/svg+xml',
+}
+
+# zlib window bits for each supported Content-Encoding
+_ENCODING_WBITS = {
+    'gzip': 31,     # gzip header + trailer
+    'deflate': 15,  # zlib stream, which is what HTTP 'deflate' actually means
+}
+
+
+def make_weak_etag(*parts):
+    """
+    Build a weak ETag value from a content version.
+    Args: parts: anything that identifies the content (snapshot version, user id, ...)
+    Returns: str: opaque ETag value (without the W/ prefix or quotes)
+    """
+    digest = hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=16)
+    return digest.hexdigest()
+
+
+def is_not_modified(etag):
+    """
+    Checks the request's If-None-Match header against a weak ETag.
+    Pages with pending flash messages are never reported as unchanged,
+    otherwise the browser would show a cached page without the message.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if session.get('_flashes'):
+        return False
+    return request.if_none_match.contains_weak(etag)
+
+
+def not_modified_response(etag):
+    """Returns an empty '304 Not Modified' response carrying the ETag."""
+    response = make_response('', 304)
+    response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _negotiate_encoding():
+    """Picks the best supported Content-Encoding the client accepts."""
+    return request.accept_encodings.best_match(list(_ENCODING_WBITS))
+
+
+def _compress_stream(chunks, wbits):
+    """Compresses a streamed response body chunk by chunk."""
+    compressor = zlib.compressobj(Config.COMPRESSION_LEVEL, zlib.DEFLATED, wbits)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _add_conditional_etag(response):
+    """
+    Adds a weak ETag computed from the body to cacheable GET responses that
+    don't already carry one, then answers matching requests with 304.
+    Views that know their content version (e.g. the inventory page) set the
+    ETag themselves and short-circuit before rendering.
+    """
+    if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+        return response
+    if response.direct_passthrough or response.is_streamed:
+        return response
+    if response.cache_control.no_store:
+        return response
+    if 'ETag' in response.headers:
+        return response # The view answers its own conditional requests
+    response.set_etag(make_weak_etag(response.get_data()), weak=True)
+    return response.make_conditional(request)
+
+
+def _compress_response(response):
+    """Compresses text responses above the configured size threshold."""
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    if 'Content-Encoding' in response.headers or response.direct_passthrough:
+        return response
+
+    # The body varies on Accept-Encoding even when we decide not to compress
+    response.vary.add('Accept-Encoding')
+
+    encoding = _negotiate_encoding()
+    if not encoding:
+        return response
+    wbits = _ENCODING_WBITS[encoding]
+
+    if response.is_streamed:
+        # Size is unknown up front: compress as the body is produced
+        response.response = _compress_stream(response.response, wbits)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < Config.COMPRESSION_MIN_SIZE:
+            return response
+        compressor = zlib.compressobj(Config.COMPRESSION_LEVEL, zlib.DEFLATED, wbits)
+        response.set_data(compressor.compress(data) + compressor.flush())
+
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_http_middleware(app):
+    """Registers the ETag and compression hooks on the Flask app."""
+
+    @app.after_request
+    def conditional_and_compress(response):
+        # Static files are served with their own validators by Flask
+        if request.endpoint == 'static':
+            return response
+        response = _add_conditional_etag(response)
+        if Config.COMPRESSION_ENABLED:
+            response = _compress_response(response)
+        return response
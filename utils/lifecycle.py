@@ -0,0 +1,75 @@
+# customer_portal/utils/lifecycle.py
+"""
+Process shutdown hooks
+Background threads, pools and write-behind queues register a hook here;
+shutdown() runs them once, newest first, so work that feeds a queue stops
+before the queue is flushed. serve.py calls it after Waitress has drained
+its requests, and atexit covers other entry points (app.py, tools).
+"""
+
+import atexit
+import logging
+import threading
+import time
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_hooks = [] # (name, callback)
+_lock = threading.Lock()
+_done = False
+_initialized = False
+
+
+def register_shutdown(name, callback):
+    """Adds a no-argument callback to run at shutdown."""
+    with _lock:
+        _hooks.append((name, callback))
+
+
+def shutdown():
+    """Runs the registered hooks (newest first), once; errors are logged and don't stop the rest."""
+    global _done
+    with _lock:
+        if _done:
+            return
+        _done = True
+        hooks = list(reversed(_hooks))
+    logger.info("[Lifecycle] Shutting down...")
+    for name, callback in hooks:
+        started = time.perf_counter()
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"[Lifecycle] '{name}' failed during shutdown: {e}", exc_info=True)
+            continue
+        logger.info(f"[Lifecycle] {name}: done in {time.perf_counter() - started:.2f}s.")
+    logger.info("[Lifecycle] Shutdown complete.")
+
+
+def init_lifecycle(app):
+    """Registers the portal's shutdown hooks (run in reverse: stop producers, drain, flush, close)."""
+    global _initialized
+    if _initialized: # create_app() may run more than once in a process (tools, benchmarks)
+        return
+    _initialized = True
+    from database.erp_connection_pool import erp_pool
+    from database.snapshot_store import snapshot_store
+    from database.erp_service import shutdown_prefetch
+    from utils.scheduler import scheduler
+    from utils.shared_cache import invalidation_bus
+    from utils.logging_setup import stop_logging
+    from utils.tracing import tracer
+    from utils.slow_query_log import slow_query_log
+
+    timeout = Config.SERVER_SHUTDOWN_TIMEOUT
+    register_shutdown('Flush log writer', stop_logging) # Last: the other hooks log
+    register_shutdown('Flush trace exporter', lambda: tracer.flush(timeout))
+    register_shutdown('Flush slow-query log', lambda: slow_query_log.flush(timeout))
+    register_shutdown('Close ERP connection pool', erp_pool.close_all)
+    if snapshot_store is not None:
+        register_shutdown('Flush inventory snapshot writes', lambda: snapshot_store.flush(timeout))
+    register_shutdown('Finish inventory prefetches', shutdown_prefetch)
+    register_shutdown('Stop invalidation bus', invalidation_bus.stop)
+    register_shutdown('Stop scheduler', lambda: scheduler.stop(timeout))
+    atexit.register(shutdown)
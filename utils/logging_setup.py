@@ -0,0 +1,206 @@
+# customer_portal/utils/logging_setup.py
+"""
+Logging pipeline
+Modules log through the standard library (logger = logging.getLogger(__name__)).
+The thread that logs only puts the record on an in-memory queue; one
+background thread (QueueListener) formats it and writes to stdout and,
+optionally, a rotating file. Request threads never wait on console or
+disk I/O, and lines from different threads never interleave.
+
+Records are JSON lines (LOG_FORMAT=json) carrying the id, method and path
+of the request that logged them; LOG_FORMAT=text is easier to read in a
+console. LOG_LEVEL is the default level; LOG_LEVELS overrides it per module
+("database=WARNING,utils.scheduler=DEBUG"). Messages logged on every
+request pass extra=SAMPLED and only 1 in LOG_SAMPLE_RATE is kept.
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from flask import g, has_request_context, request
+
+SAMPLED = {'sampled': True} # logger.info(..., extra=SAMPLED) for high-frequency messages
+
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'sampled'}
+
+_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+_writers = [] # The handlers the listener writes to
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps the first and then every 'rate'-th record logged with extra=SAMPLED, counted per call site."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = max(1, rate)
+        self._counters = {} # (pathname, lineno) -> itertools.count
+
+    def filter(self, record):
+        if self.rate == 1 or not getattr(record, 'sampled', False):
+            return True
+        key = (record.pathname, record.lineno)
+        counter = self._counters.get(key) or self._counters.setdefault(key, itertools.count())
+        if next(counter) % self.rate:
+            return False
+        record.sample_rate = self.rate # So readers can scale counts back up
+        return True
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records logged while handling a request with its id, method and path."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.method = request.method
+            record.path = request.path
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Resolves message and traceback in the logging thread; drops (and counts) records when the queue is full."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1 # Never block a request on logging
+
+    def prepare(self, record):
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None # args may not be safe to format later
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if self.dropped:
+            record.dropped_before, self.dropped = self.dropped, 0
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, pid, thread, request fields and any extra= fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Console format; appends the request id and extra= fields to the first line."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = {key: value for key, value in vars(record).items()
+                  if key not in _RECORD_ATTRS and key not in ('method', 'path')}
+        if fields:
+            first, _, rest = line.partition('\n')
+            suffix = ' '.join(f"{key}={value!r}" for key, value in fields.items())
+            line = f"{first} | {suffix}" + (f"\n{rest}" if rest else '')
+        return line
+
+
+def _parse_levels(spec):
+    """'database=WARNING, utils.scheduler=DEBUG' -> {'database': 'WARNING', 'utils.scheduler': 'DEBUG'}"""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, sep, level = item.partition('=')
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def init_logging(settings):
+    """Routes all logging through the queue and background writer (once per process); 'settings' is Config."""
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is not None:
+            return
+        formatter = TextFormatter() if settings.LOG_FORMAT == 'text' else JsonFormatter()
+        writers = [logging.StreamHandler(sys.stdout)]
+        if settings.LOG_FILE:
+            writers.append(logging.handlers.RotatingFileHandler(
+                settings.LOG_FILE, maxBytes=settings.LOG_FILE_MAX_MB * 1024 * 1024,
+                backupCount=settings.LOG_FILE_BACKUPS, encoding='utf-8'))
+        for writer in writers:
+            writer.setFormatter(formatter)
+
+        log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        handler = _QueueHandler(log_queue)
+        handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATE)) # Cheapest rejection first
+        handler.addFilter(RequestContextFilter())
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(settings.LOG_LEVEL.upper())
+        for name, level in _parse_levels(settings.LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, *writers, respect_handler_level=True)
+        _listener.start()
+        _queue_handler = handler
+        _writers[:] = writers
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Writes out everything queued and stops the background writer; later records are written directly."""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+        root = logging.getLogger()
+        root.removeHandler(_queue_handler)
+        for writer in _writers:
+            root.addHandler(writer)
+
+
+def init_request_ids(app):
+    """Gives each request an id (the caller's X-Request-ID if it is sane) for log records and the response."""
+
+    @app.before_request
+    def _assign_request_id():
+        incoming = request.headers.get('X-Request-ID', '')
+        g.request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex[:16]
+
+    @app.after_request
+    def _echo_request_id(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers.setdefault('X-Request-ID', request_id)
+        return response
@@ -0,0 +1,254 @@
+# customer_portal/utils/metrics.py
+"""
+Lightweight in-process metrics
+Histogram buckets for request, query, template and XLSX timings,
+rendered in the Prometheus text exposition format at /admin/metrics.
+The query decorators also open a tracing span per query (utils/tracing.py).
+"""
+
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, request, before_render_template, template_rendered
+from utils.slow_query_log import record_query, count_rows
+from utils.tracing import span, start_span
+
+# Seconds. Covers fast local-DB lookups up to slow 'All' inventory queries.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape_label(value):
+    """Escapes a label value for the text exposition format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    """A thread-safe histogram with a fixed set of label names."""
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {} # label values tuple -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, **labels):
+        """Records one observation for the given label values."""
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * len(self.buckets), 0.0, 0]
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self):
+        """Returns this histogram's lines in the text exposition format."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((key, list(s[0]), s[1], s[2]) for key, s in self._series.items())
+        for key, bucket_counts, total, count in snapshot:
+            labels = [f'{name}="{_escape_label(value)}"' for name, value in zip(self.label_names, key)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                bucket_labels = ','.join(labels + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            bucket_labels = ','.join(labels + ['le="+Inf"'])
+            lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+            label_str = '{' + ','.join(labels) + '}' if labels else ''
+            lines.append(f"{self.name}_sum{label_str} {total:.6f}")
+            lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every histogram created by the application."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        """Gets or creates a histogram by name."""
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name, help_text, label_names, buckets)
+            return self._histograms[name]
+
+    def render(self):
+        """Renders all metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP portal_uptime_seconds Seconds since this process started collecting metrics",
+            "# TYPE portal_uptime_seconds gauge",
+            f"portal_uptime_seconds {time.time() - self.started_at:.3f}",
+        ]
+        with self._lock:
+            histograms = list(self._histograms.values())
+        for histogram in histograms:
+            lines.extend(histogram.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Singleton registry
+metrics = MetricsRegistry()
+
+REQUEST_DURATION = metrics.histogram(
+    'portal_http_request_duration_seconds',
+    'Time spent handling HTTP requests, by Flask endpoint',
+    ('endpoint', 'method', 'status'))
+DB_QUERY_DURATION = metrics.histogram(
+    'portal_db_query_duration_seconds',
+    'Time spent executing database queries, by database and calling function',
+    ('database', 'query'))
+TEMPLATE_RENDER_DURATION = metrics.histogram(
+    'portal_template_render_duration_seconds',
+    'Time spent rendering Jinja templates',
+    ('template',))
+XLSX_GENERATION_DURATION = metrics.histogram(
+    'portal_xlsx_generation_duration_seconds',
+    'Time spent building XLSX exports with openpyxl')
+INVENTORY_FETCH_DURATION = metrics.histogram(
+    'portal_inventory_fetch_duration_seconds',
+    'Time spent fetching inventory from the ERP, by ERP customer account',
+    ('account',))
+INVENTORY_PREWARM_DURATION = metrics.histogram(
+    'portal_inventory_prewarm_duration_seconds',
+    'Time spent by the scheduled prewarm refreshing each ERP customer set (including queueing behind other fetches)',
+    ('account',),
+    buckets=(1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0))
+
+
+@contextmanager
+def timed(histogram, **labels):
+    """Context manager that observes the duration of its block."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+def _caller_name(depth=2):
+    """Returns 'Class.method' (or 'function') of the code that called the wrapped query method."""
+    code = sys._getframe(depth).f_code
+    return getattr(code, 'co_qualname', code.co_name)
+
+
+def instrument_query(database):
+    """
+    Decorator for DatabaseConnection / ERPConnection query methods that return lists.
+    The query name is the calling DAL function, e.g. 'CustomerDataDB.get_customer_by_id'.
+    Each execution is also fed to the slow-query log with its row count.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, sql, params=None, *args, **kwargs):
+            query_name = _caller_name()
+            result = None
+            start = time.perf_counter()
+            try:
+                with span(query_name, database, sql=sql[:300]) as query_span:
+                    result = func(self, sql, params, *args, **kwargs)
+                    if query_span is not None:
+                        query_span.set(rows=count_rows(result))
+                return result
+            finally:
+                elapsed = time.perf_counter() - start
+                DB_QUERY_DURATION.observe(elapsed, database=database, query=query_name)
+                record_query(database, query_name, sql, params, elapsed, result)
+        return wrapper
+    return decorator
+
+
+def instrument_stream(database):
+    """
+    Decorator for generator query methods (ERPConnection.iter_query).
+    Times the query from the call until the generator is exhausted or closed,
+    which includes the time the consumer spends between batches.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, sql, params=None, *args, **kwargs):
+            # Resolve the caller now; once the generator runs its caller is whoever iterates it
+            query_name = _caller_name()
+            stream_span = start_span(query_name, database, sql=sql[:300]) # Attached to the caller's span, not the consumer's
+            return _timed_stream(func(self, sql, params, *args, **kwargs), database, query_name, sql, params, stream_span)
+        return wrapper
+    return decorator
+
+
+def _timed_stream(records, database, query_name, sql, params, stream_span=None):
+    rows = 0
+    start = time.perf_counter()
+    try:
+        for record in records:
+            rows += 1
+            yield record
+    except Exception as e: # Not GeneratorExit: a consumer closing the stream early is not an error
+        if stream_span is not None:
+            stream_span.finish(e)
+        raise
+    finally:
+        if stream_span is not None:
+            stream_span.set(rows=rows)
+            stream_span.finish()
+        elapsed = time.perf_counter() - start
+        DB_QUERY_DURATION.observe(elapsed, database=database, query=query_name)
+        record_query(database, query_name, sql, params, elapsed, rows=rows)
+
+
+def init_request_metrics(app):
+    """
+    Registers request timing and template render timing on the app.
+    Call this before other before_request hooks so their time is included.
+    """
+
+    @app.before_request
+    def start_request_timer():
+        g._metrics_request_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_duration(response):
+        start = g.pop('_metrics_request_start', None)
+        if start is not None:
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                endpoint=request.endpoint or 'unknown',
+                method=request.method,
+                status=response.status_code
+            )
+        return response
+
+    @app.teardown_request
+    def record_failed_request(exception=None):
+        # after_request is skipped when a view raises; record those as 500s
+        start = g.pop('_metrics_request_start', None)
+        if start is not None:
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                endpoint=request.endpoint or 'unknown',
+                method=request.method,
+                status=500
+            )
+
+    def on_before_render(sender, template, context, **extra):
+        g.setdefault('_metrics_template_starts', []).append(time.perf_counter())
+
+    def on_rendered(sender, template, context, **extra):
+        starts = g.get('_metrics_template_starts')
+        if starts:
+            TEMPLATE_RENDER_DURATION.observe(time.perf_counter() - starts.pop(), template=template.name)
+
+    # weak=False: the handlers are closures that would otherwise be garbage collected
+    before_render_template.connect(on_before_render, app, weak=False)
+    template_rendered.connect(on_rendered, app, weak=False)
@@ -0,0 +1,223 @@
+# customer_portal/utils/scheduler.py
+"""
+Background job scheduler
+A single daemon thread that runs registered jobs on cron-like schedules
+("minute hour day-of-month month day-of-week", several separated by ';'),
+evaluated in Config.SCHEDULER_TIMEZONE. Each run gets its own thread and a
+job never overlaps itself: a run that is due while the previous one is
+still going is skipped.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+import pytz
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# (name, lowest, highest) for the five cron fields
+_CRON_FIELDS = (('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 7))
+
+# Upper bound when searching for the next run (e.g. "0 0 31 2 *" never matches)
+_MAX_LOOKAHEAD = timedelta(days=366)
+
+
+def _parse_cron_field(text, lowest, highest):
+    """'*', 'a', 'a-b', 'a,b', with optional '/step' -> set of allowed values."""
+    values = set()
+    for part in text.split(','):
+        part, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if part == '*':
+            start, end = lowest, highest
+        elif '-' in part:
+            start, end = (int(v) for v in part.split('-', 1))
+        else:
+            start = end = int(part)
+            if step > 1:
+                end = highest # "5/15" means every 15 starting at 5
+        if start < lowest or end > highest or start > end or step < 1:
+            raise ValueError(f"Invalid cron field '{text}' (allowed {lowest}-{highest})")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """One or more 5-field cron expressions; day-of-week 0 (or 7) is Sunday."""
+
+    def __init__(self, expression):
+        self.expression = expression
+        self._entries = []
+        for cron in filter(None, (e.strip() for e in expression.split(';'))):
+            fields = cron.split()
+            if len(fields) != 5:
+                raise ValueError(f"Cron expression needs 5 fields: '{cron}'")
+            parsed = [_parse_cron_field(text, lo, hi) for text, (_, lo, hi) in zip(fields, _CRON_FIELDS)]
+            parsed[4] = {weekday % 7 for weekday in parsed[4]} # 7 is also Sunday
+            # Standard cron: when both day fields are restricted, either one may match
+            parsed.append(fields[2] != '*' and fields[4] != '*')
+            self._entries.append(parsed)
+        if not self._entries:
+            raise ValueError("Empty cron schedule")
+
+    def matches(self, when):
+        cron_weekday = (when.weekday() + 1) % 7 # Python: Monday=0; cron: Sunday=0
+        for minutes, hours, days, months, weekdays, either_day in self._entries:
+            if when.minute not in minutes or when.hour not in hours or when.month not in months:
+                continue
+            day_ok, weekday_ok = when.day in days, cron_weekday in weekdays
+            if (day_ok or weekday_ok) if either_day else (day_ok and weekday_ok):
+                return True
+        return False
+
+    def next_after(self, when):
+        """First matching minute strictly after 'when' (a naive local datetime), or None."""
+        candidate = when.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = when + _MAX_LOOKAHEAD
+        while candidate <= limit:
+            if self.matches(candidate):
+                return candidate
+            candidate += timedelta(minutes=1)
+        return None
+
+
+class ScheduledJob:
+    """A named callable plus its schedule and run bookkeeping."""
+
+    def __init__(self, name, schedule, func):
+        self.name = name
+        self.schedule = schedule
+        self.func = func
+        self.next_run = None # Naive local datetime
+        self.last_started = None
+        self.last_duration = None # Seconds
+        self.last_error = None
+        self.running = False
+        self.thread = None # Thread of the current/last run
+
+
+class Scheduler:
+    """Runs ScheduledJobs from one background thread."""
+
+    def __init__(self, timezone):
+        self.timezone = pytz.timezone(timezone)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def _now(self):
+        return datetime.now(self.timezone).replace(tzinfo=None)
+
+    def add_job(self, name, schedule, func):
+        """Registers (or replaces) a job. 'schedule' is a cron string or a CronSchedule."""
+        if isinstance(schedule, str):
+            schedule = CronSchedule(schedule)
+        job = ScheduledJob(name, schedule, func)
+        job.next_run = schedule.next_after(self._now())
+        with self._lock:
+            self._jobs[name] = job
+        self._wakeup.set()
+        logger.info(f"[Scheduler] Job '{name}' scheduled ({schedule.expression}); next run {job.next_run}.")
+        return job
+
+    def start(self):
+        """Starts the scheduler thread (no-op if already running)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+        self._thread.start()
+        logger.info("[Scheduler] Started.")
+
+    def stop(self, timeout=None):
+        """Stops scheduling new runs; with a timeout, also waits up to that long for running jobs."""
+        self._stopping = True
+        self._wakeup.set()
+        if timeout is None:
+            return
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            threads = [job.thread for job in self._jobs.values() if job.running]
+        for thread in [self._thread, *threads]:
+            if thread is not None:
+                thread.join(max(0.0, deadline - time.monotonic()))
+
+    def run_now(self, name):
+        """Starts a job immediately (outside its schedule). Returns False if it is already running."""
+        with self._lock:
+            job = self._jobs[name]
+        return self._launch(job)
+
+    def _run(self):
+        while not self._stopping:
+            now = self._now()
+            with self._lock:
+                jobs = list(self._jobs.values())
+            for job in jobs:
+                if job.next_run is not None and job.next_run <= now:
+                    job.next_run = job.schedule.next_after(now)
+                    if not self._launch(job):
+                        logger.warning(f"[Scheduler] Skipping '{job.name}': previous run still in progress.")
+            upcoming = [job.next_run for job in jobs if job.next_run is not None]
+            timeout = (min(upcoming) - self._now()).total_seconds() if upcoming else 3600
+            self._wakeup.wait(max(1.0, min(timeout, 3600)))
+            self._wakeup.clear()
+
+    def _launch(self, job):
+        with self._lock:
+            if job.running:
+                return False
+            job.running = True
+            job.thread = threading.Thread(target=self._execute, args=(job,), name=f"job-{job.name}", daemon=True)
+        job.thread.start()
+        return True
+
+    def _execute(self, job):
+        job.last_started = datetime.utcnow()
+        started = time.perf_counter()
+        try:
+            job.func()
+            job.last_error = None
+        except Exception as e:
+            job.last_error = str(e)
+            logger.error(f"[Scheduler] Job '{job.name}' failed: {e}", exc_info=True)
+        finally:
+            job.last_duration = time.perf_counter() - started
+            with self._lock:
+                job.running = False
+
+    def status(self):
+        """Snapshot for diagnostics."""
+        with self._lock:
+            return [{
+                'name': job.name,
+                'schedule': job.schedule.expression,
+                'next_run': job.next_run,
+                'last_started': job.last_started,
+                'last_duration': job.last_duration,
+                'last_error': job.last_error,
+                'running': job.running,
+            } for job in self._jobs.values()]
+
+
+# Singleton instance
+scheduler = Scheduler(timezone=Config.SCHEDULER_TIMEZONE)
+
+
+def init_scheduler(app):
+    """Registers the portal's background jobs and starts the scheduler (if enabled)."""
+    if not Config.SCHEDULER_ENABLED:
+        logger.info("[Scheduler] Disabled (SCHEDULER_ENABLED=False).")
+        return
+    from database import get_erp_service
+    if Config.INVENTORY_PREWARM_SCHEDULE:
+        scheduler.add_job(
+            'inventory_prewarm',
+            Config.INVENTORY_PREWARM_SCHEDULE,
+            lambda: get_erp_service().prewarm_inventory(app)
+        )
+    scheduler.start()
@@ -0,0 +1,311 @@
+# customer_portal/utils/shared_cache.py
+"""
+Cross-process shared cache and invalidation bus
+With several worker processes, state kept in one process (app.config
+settings, cached inventory snapshots, the ERP dimension cache) goes stale
+in the others. The shared cache is a small key/value store visible to every
+worker, and the invalidation bus carries events over it: publish() records
+an event and runs the local subscribers at once; a poller thread in every
+other process picks the event up within SHARED_CACHE_POLL_SECONDS and runs
+its subscribers.
+
+Backends are chosen by SHARED_CACHE_URL:
+  memory://               single process only (events stay in-process)
+  sqlite:///path/to/file  workers on one host, through a SQLite file (WAL)
+A network backend only needs to implement SharedCacheBackend and be added
+to _BACKENDS.
+"""
+
+import abc
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_EVENT_RETENTION_SECONDS = 3600 # Events older than this are pruned (pollers are far more frequent)
+
+
+class SharedCacheBackend(abc.ABC):
+    """Interface of a shared cache backend. Values must be JSON-serializable."""
+
+    @abc.abstractmethod
+    def get(self, key, default=None):
+        """Returns the value stored under key, or default if it is missing or expired."""
+
+    @abc.abstractmethod
+    def set(self, key, value, ttl=None):
+        """Stores value under key, expiring after ttl seconds (None = never)."""
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """Removes key (no error if it is missing)."""
+
+    @abc.abstractmethod
+    def append_event(self, channel, message, origin):
+        """Records an event and returns its id (ids increase)."""
+
+    @abc.abstractmethod
+    def events_after(self, event_id):
+        """[(id, channel, message, origin)] recorded after event_id, oldest first."""
+
+    @abc.abstractmethod
+    def last_event_id(self):
+        """Id of the newest recorded event (0 if none)."""
+
+
+class MemoryBackend(SharedCacheBackend):
+    """In-process backend, for a single worker (and tools/benchmarks)."""
+
+    def __init__(self):
+        self._values = {} # key -> (value, expires_at or None)
+        self._events = []
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None or (entry[1] is not None and entry[1] < time.time()):
+                return default
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._values[key] = (value, time.time() + ttl if ttl else None)
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def append_event(self, channel, message, origin):
+        with self._lock:
+            self._events.append((len(self._events) + 1, channel, message, origin))
+            return len(self._events)
+
+    def events_after(self, event_id):
+        with self._lock:
+            return self._events[event_id:]
+
+    def last_event_id(self):
+        with self._lock:
+            return len(self._events)
+
+
+class SQLiteBackend(SharedCacheBackend):
+    """
+    Shared file on the local host; each thread uses its own connection.
+    Reads are single autocommit SELECTs (WAL readers never wait for the
+    writer); only writes take the write lock, with BEGIN IMMEDIATE.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._last_prune = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._write() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_values ("
+                         "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_events ("
+                         "id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, message TEXT NOT NULL, "
+                         "origin TEXT NOT NULL, created_at REAL NOT NULL)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None) # Autocommit
+            conn.execute("PRAGMA journal_mode=WAL") # Readers don't block the writer (and vice versa)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self):
+        """'with' block holding the write lock for the duration of one transaction."""
+        return _Transaction(self._connection())
+
+    def get(self, key, default=None):
+        row = self._connection().execute("SELECT value, expires_at FROM cache_values WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return default
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        with self._write() as conn:
+            conn.execute("INSERT OR REPLACE INTO cache_values (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, json.dumps(value), time.time() + ttl if ttl else None))
+
+    def delete(self, key):
+        with self._write() as conn:
+            conn.execute("DELETE FROM cache_values WHERE key = ?", (key,))
+
+    def append_event(self, channel, message, origin):
+        now = time.time()
+        with self._write() as conn:
+            cursor = conn.execute("INSERT INTO cache_events (channel, message, origin, created_at) VALUES (?, ?, ?, ?)",
+                                  (channel, json.dumps(message), origin, now))
+            if now - self._last_prune > 60:
+                self._last_prune = now
+                conn.execute("DELETE FROM cache_events WHERE created_at < ?", (now - _EVENT_RETENTION_SECONDS,))
+                conn.execute("DELETE FROM cache_values WHERE expires_at < ?", (now,))
+            return cursor.lastrowid
+
+    def events_after(self, event_id):
+        rows = self._connection().execute("SELECT id, channel, message, origin FROM cache_events WHERE id > ? ORDER BY id",
+                                          (event_id,)).fetchall()
+        return [(row[0], row[1], json.loads(row[2]), row[3]) for row in rows]
+
+    def last_event_id(self):
+        row = self._connection().execute("SELECT MAX(id) FROM cache_events").fetchone()
+        return row[0] or 0
+
+
+class _Transaction:
+    """'with' block running as one IMMEDIATE transaction on an autocommit sqlite3 connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def _sqlite_backend(location):
+    # 'sqlite:///data/x.sqlite3' is relative to the working directory, 'sqlite:////srv/x.sqlite3' absolute
+    return SQLiteBackend(location[1:] if location.startswith('//') else location.lstrip('/'))
+
+
+# URL scheme -> factory(url remainder)
+_BACKENDS = {
+    'memory': lambda location: MemoryBackend(),
+    'sqlite': _sqlite_backend,
+}
+
+
+def create_backend(url):
+    """Builds the backend for a SHARED_CACHE_URL ('memory://' or 'sqlite:///relative/or//absolute/path')."""
+    scheme, _, location = (url or 'memory://').partition('://')
+    factory = _BACKENDS.get(scheme)
+    if factory is None:
+        raise ValueError(f"Unsupported SHARED_CACHE_URL scheme '{scheme}' (supported: {', '.join(_BACKENDS)})")
+    return factory(location)
+
+
+class InvalidationBus:
+    """Publish/subscribe over a shared backend; subscribers run in every process, including the publisher."""
+
+    def __init__(self, backend, poll_interval):
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._subscribers = defaultdict(list) # channel -> [callback(message)]
+        self._last_id = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.received = 0 # Events from other processes handled
+
+    def subscribe(self, channel, callback):
+        self._subscribers[channel].append(callback)
+
+    def publish(self, channel, **message):
+        """Records the event for the other processes and runs this process's subscribers now."""
+        try:
+            self.backend.append_event(channel, message, self.origin)
+        except Exception as e:
+            logger.warning(f"[Shared Cache] Could not publish '{channel}' event: {e}")
+        self._dispatch(channel, message)
+
+    def _dispatch(self, channel, message):
+        for callback in self._subscribers.get(channel, ()):
+            try:
+                callback(message)
+            except Exception as e:
+                logger.error(f"[Shared Cache] '{channel}' subscriber failed: {e}", exc_info=True)
+
+    def start(self):
+        """Starts polling for other processes' events (from now on; older events are not replayed)."""
+        if self._thread is not None or isinstance(self.backend, MemoryBackend):
+            return
+        self._last_id = self.backend.last_event_id()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='invalidation-bus', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            self.poll()
+
+    def poll(self):
+        """Handles events published by other processes since the last poll."""
+        try:
+            events = self.backend.events_after(self._last_id or 0)
+        except Exception as e:
+            logger.warning(f"[Shared Cache] Could not read events: {e}")
+            return
+        for event_id, channel, message, origin in events:
+            self._last_id = event_id
+            if origin != self.origin:
+                self.received += 1
+                self._dispatch(channel, message)
+
+    def status(self):
+        """Snapshot for diagnostics."""
+        return {
+            'backend': type(self.backend).__name__,
+            'origin': self.origin,
+            'polling': self._thread is not None,
+            'last_event_id': self._last_id,
+            'received': self.received,
+            'channels': sorted(self._subscribers),
+        }
+
+
+# Singleton instances
+shared_cache = create_backend(Config.SHARED_CACHE_URL)
+invalidation_bus = InvalidationBus(shared_cache, poll_interval=Config.SHARED_CACHE_POLL_SECONDS)
+
+# app.config settings admins change at runtime; kept in the shared cache under 'settings:<name>'
+SHARED_SETTINGS = ('AUTO_KICK_ENABLED',)
+
+
+def set_shared_setting(name, value):
+    """Changes a runtime setting in every worker process."""
+    shared_cache.set(f"settings:{name}", value)
+    invalidation_bus.publish('settings', name=name)
+
+
+def init_shared_cache(app):
+    """Loads shared settings into app.config and subscribes the app's caches to the invalidation bus."""
+    from database.inventory_cache import inventory_cache
+    from database.erp_dimensions import erp_dimensions
+
+    def reload_setting(message):
+        name = message.get('name')
+        if name in SHARED_SETTINGS:
+            app.config[name] = shared_cache.get(f"settings:{name}", app.config.get(name))
+
+    for name in SHARED_SETTINGS:
+        reload_setting({'name': name})
+    invalidation_bus.subscribe('settings', reload_setting)
+    invalidation_bus.subscribe('inventory', lambda message: inventory_cache.sync(message['account'], message['version'], message['fetched_at']))
+    invalidation_bus.subscribe('erp_dimensions', lambda message: erp_dimensions.mark_stale(message.get('signature')))
+    invalidation_bus.start()
+    logger.info(f"[Shared Cache] Using {type(shared_cache).__name__} ({Config.SHARED_CACHE_URL}).")
@@ -0,0 +1,292 @@
+# customer_portal/utils/slow_query_log.py
+"""
+Slow-query recorder for the local DB and the ERP
+Fingerprints every statement (literals stripped), keeps rolling per-fingerprint
+statistics in memory and optionally appends slow executions to a JSONL file
+(through a background writer, so the query's thread never waits on disk).
+
+Fingerprints are kept in a segmented LRU: a new fingerprint enters the
+probation segment and moves to the protected one when it is seen again.
+When SLOW_QUERY_MAX_FINGERPRINTS is reached the least recently used
+probation entry is evicted first, so a burst of one-off statements can't
+push out the queries that keep recurring.
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import math
+import queue
+import re
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from functools import lru_cache
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_PROTECTED_SHARE = 0.8 # Part of SLOW_QUERY_MAX_FINGERPRINTS reserved for fingerprints seen more than once
+
+# --- Fingerprinting ---
+
+_COMMENT_RE = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+_STRING_RE = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=1024) # The app issues a small, fixed set of SQL texts
+def fingerprint_sql(sql):
+    """
+    Normalizes a SQL statement so executions that differ only in literal
+    values (or IN-list length) share one fingerprint.
+    Returns: tuple: (fingerprint_id, normalized_sql)
+    """
+    normalized = _COMMENT_RE.sub(' ', sql or '')
+    normalized = _STRING_RE.sub('?', normalized)
+    normalized = _NUMBER_RE.sub('?', normalized)
+    normalized = _IN_LIST_RE.sub('IN (?+)', normalized)
+    normalized = _WHITESPACE_RE.sub(' ', normalized).strip().rstrip(';').strip()
+    fingerprint_id = hashlib.blake2b(normalized.encode('utf-8'), digest_size=6).hexdigest()
+    return fingerprint_id, normalized
+
+
+def nearest_rank(sorted_samples, pct):
+    """
+    Nearest-rank percentile of an already sorted sequence: the smallest sample
+    with at least pct% of the samples at or below it (None when empty).
+    """
+    if not sorted_samples:
+        return None
+    # pct * n / 100 rather than pct / 100 * n: exact for integer ranks (57% of 100 is 57, not 56.99...)
+    index = max(0, math.ceil(pct * len(sorted_samples) / 100.0) - 1)
+    return sorted_samples[min(index, len(sorted_samples) - 1)]
+
+
+class QueryStats:
+    """Rolling statistics for one fingerprint."""
+
+    __slots__ = ('fingerprint_id', 'database', 'sql', 'query_names', 'count', 'total_seconds',
+                 'max_seconds', 'total_rows', 'max_rows', 'param_count', 'last_seen', 'durations')
+
+    def __init__(self, fingerprint_id, database, sql, sample_size):
+        self.fingerprint_id = fingerprint_id
+        self.database = database
+        self.sql = sql
+        self.query_names = set()
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.total_rows = 0
+        self.max_rows = 0
+        self.param_count = 0
+        self.last_seen = None
+        self.durations = deque(maxlen=sample_size) # Recent samples for percentiles
+
+    def add(self, query_name, seconds, rows, param_count):
+        self.query_names.add(query_name)
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        if rows is not None:
+            self.total_rows += rows
+            self.max_rows = max(self.max_rows, rows)
+        self.param_count = param_count
+        self.last_seen = datetime.utcnow()
+        self.durations.append(seconds)
+
+    def percentile(self, pct):
+        """Nearest-rank percentile over the recent samples, in seconds."""
+        if not self.durations:
+            return 0.0
+        return nearest_rank(sorted(self.durations), pct)
+
+    def to_dict(self):
+        return {
+            'fingerprint_id': self.fingerprint_id,
+            'database': self.database,
+            'sql': self.sql,
+            'query_names': sorted(self.query_names),
+            'count': self.count,
+            'total_ms': round(self.total_seconds * 1000, 1),
+            'avg_ms': round(self.total_seconds * 1000 / self.count, 1) if self.count else 0,
+            'p50_ms': round(self.percentile(50) * 1000, 1),
+            'p99_ms': round(self.percentile(99) * 1000, 1),
+            'max_ms': round(self.max_seconds * 1000, 1),
+            'avg_rows': round(self.total_rows / self.count, 1) if self.count else 0,
+            'max_rows': self.max_rows,
+            'param_count': self.param_count,
+            'last_seen': self.last_seen,
+        }
+
+
+class SlowQueryLog:
+    """In-memory slow-query recorder with an optional JSONL sink."""
+
+    def __init__(self):
+        # (database, fingerprint_id) -> QueryStats, least recently used first
+        self._probation = OrderedDict() # Seen once since entering the table
+        self._protected = OrderedDict() # Seen again
+        self._recent_slow = deque(maxlen=100)
+        self._lock = threading.Lock()
+        self._sink_queue = queue.Queue(maxsize=1000)
+        self._writer = None
+        self.written = 0
+        self.dropped_writes = 0
+        self.started_at = datetime.utcnow()
+
+    def record(self, database, query_name, sql, params, seconds, rows):
+        """Records one execution. Called for every query by the instrumentation wrapper."""
+        if not Config.SLOW_QUERY_LOG_ENABLED:
+            return
+        fingerprint_id, normalized = fingerprint_sql(sql)
+        param_count = len(params) if params else 0
+        key = (database, fingerprint_id)
+
+        with self._lock:
+            stats = self._protected.get(key)
+            if stats is not None:
+                self._protected.move_to_end(key)
+            else:
+                stats = self._probation.pop(key, None)
+                if stats is not None:
+                    self._protect(key, stats)
+                else:
+                    if len(self._probation) + len(self._protected) >= Config.SLOW_QUERY_MAX_FINGERPRINTS:
+                        self._evict()
+                    stats = QueryStats(fingerprint_id, database, normalized[:4000], Config.SLOW_QUERY_SAMPLE_SIZE)
+                    self._probation[key] = stats
+            stats.add(query_name, seconds, rows, param_count)
+
+        if seconds * 1000 >= Config.SLOW_QUERY_THRESHOLD_MS:
+            entry = {
+                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'database': database,
+                'query_name': query_name,
+                'fingerprint_id': fingerprint_id,
+                'elapsed_ms': round(seconds * 1000, 1),
+                'rows': rows,
+                'param_count': param_count,
+            }
+            with self._lock:
+                self._recent_slow.appendleft(entry)
+            self._write_sink(dict(entry, sql=normalized))
+
+    def _protect(self, key, stats):
+        """Moves a fingerprint seen again into the protected segment (caller holds the lock)."""
+        self._protected[key] = stats
+        if len(self._protected) > max(1, int(Config.SLOW_QUERY_MAX_FINGERPRINTS * _PROTECTED_SHARE)):
+            # Demote the least recently used protected entry; it gets another chance in probation
+            demoted_key, demoted = self._protected.popitem(last=False)
+            self._probation[demoted_key] = demoted
+
+    def _evict(self):
+        """Drops the least recently used fingerprint, from probation first (caller holds the lock)."""
+        if self._probation:
+            self._probation.popitem(last=False)
+        elif self._protected:
+            self._protected.popitem(last=False)
+
+    def _all_stats(self):
+        """Every tracked fingerprint's QueryStats (caller holds the lock)."""
+        return itertools.chain(self._probation.values(), self._protected.values())
+
+    def _write_sink(self, entry):
+        """Queues a slow execution for the JSONL writer thread, if a file is configured (dropped if it has fallen behind)."""
+        if not Config.SLOW_QUERY_LOG_FILE:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name='slow-query-writer', daemon=True)
+                self._writer.start()
+        try:
+            self._sink_queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped_writes += 1
+
+    def _write_loop(self):
+        stopping = False
+        while not stopping:
+            batch = [self._sink_queue.get()]
+            while True: # Take whatever else is waiting, so the file is opened once per batch
+                try:
+                    batch.append(self._sink_queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = None in batch # Sentinel from flush()
+            batch = [entry for entry in batch if entry is not None]
+            if not batch:
+                continue
+            try:
+                with open(Config.SLOW_QUERY_LOG_FILE, 'a', encoding='utf-8') as f:
+                    for entry in batch:
+                        f.write(json.dumps(entry) + '\n')
+                self.written += len(batch)
+            except OSError as e:
+                logger.warning(f"[SlowQueryLog] Could not write to {Config.SLOW_QUERY_LOG_FILE}: {e}")
+
+    def flush(self, timeout=None):
+        """Writes out queued slow executions and stops the writer (shutdown hook)."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is None:
+            return
+        self._sink_queue.put(None)
+        writer.join(timeout)
+
+    def top_by_total_time(self, limit=20):
+        with self._lock:
+            ranked = sorted(self._all_stats(), key=lambda s: s.total_seconds, reverse=True)[:limit]
+            return [s.to_dict() for s in ranked]
+
+    def top_by_p99(self, limit=20):
+        with self._lock:
+            ranked = sorted(self._all_stats(), key=lambda s: s.percentile(99), reverse=True)[:limit]
+            return [s.to_dict() for s in ranked]
+
+    def recent_slow(self):
+        with self._lock:
+            return list(self._recent_slow)
+
+    def summary(self):
+        with self._lock:
+            stats = list(self._all_stats())
+        return {
+            'fingerprints': len(stats),
+            'executions': sum(s.count for s in stats),
+            'total_ms': round(sum(s.total_seconds for s in stats) * 1000, 1),
+            'written': self.written,
+            'dropped_writes': self.dropped_writes,
+            'since': self.started_at,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._probation.clear()
+            self._protected.clear()
+            self._recent_slow.clear()
+            self.started_at = datetime.utcnow()
+
+
+# Singleton instance
+slow_query_log = SlowQueryLog()
+
+
+def count_rows(result):
+    """Row count of a query result: list length for SELECTs, None otherwise."""
+    if isinstance(result, list):
+        return len(result)
+    return None
+
+
+def record_query(database, query_name, sql, params, seconds, result=None, rows=None):
+    """
+    Convenience wrapper used by the query instrumentation.
+    Pass 'rows' directly for streamed queries, whose result is never a list.
+    """
+    if rows is None:
+        rows = count_rows(result)
+    slow_query_log.record(database, query_name, sql, params, seconds, rows)
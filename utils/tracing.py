@@ -0,0 +1,305 @@
+# customer_portal/utils/tracing.py
+"""
+In-process request tracing
+Each request gets a trace (id = its X-Request-ID) whose root span covers the
+whole request. Code that waits on something opens child spans, so a slow
+request shows where its time went: local DB and ERP queries (through the
+query instrumentation in utils/metrics.py), AD binds, SMTP sends, XLSX
+generation and template rendering.
+
+    with span('AD bind (user)', 'ldap'):
+        ...
+
+Finished traces are kept in a ring buffer (the slowest are shown as
+waterfalls at /admin/traces) and, if TRACE_LOG_FILE is set, appended to it
+as JSON lines by a background writer. The current span is tracked with
+contextvars: work handed to another thread is only attached to the request
+if it runs in a copy of the context (see erp_sharded_query).
+"""
+
+import contextvars
+import itertools
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from flask import g, request, before_render_template, template_rendered
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'kind', 'attrs', 'start', 'end', 'error', 'thread')
+
+    def __init__(self, trace, span_id, parent_id, name, kind, attrs):
+        self.trace = trace
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end = None
+        self.error = None
+        self.thread = threading.current_thread().name
+
+    def set(self, **attrs):
+        """Adds attributes (row counts, status codes) to the span."""
+        self.attrs.update(attrs)
+
+    def finish(self, error=None):
+        if error is not None and self.error is None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self.end is None:
+            self.end = time.perf_counter()
+
+
+class Trace:
+    """The spans recorded for one request; the first span is the root."""
+
+    def __init__(self, trace_id, name, attrs):
+        self.trace_id = trace_id
+        self.started_at = datetime.utcnow()
+        self.spans = []
+        self.dropped_spans = 0
+        self._ids = itertools.count(1)
+        self.root = self.start_span(name, 'request', None, attrs)
+
+    def start_span(self, name, kind, parent, attrs):
+        """Creates a span under 'parent', or returns None once the trace has TRACE_MAX_SPANS spans."""
+        if len(self.spans) >= Config.TRACE_MAX_SPANS:
+            self.dropped_spans += 1
+            return None
+        span = Span(self, next(self._ids), parent.span_id if parent else None, name, kind, attrs)
+        self.spans.append(span)
+        return span
+
+    @property
+    def duration_ms(self):
+        end = self.root.end or time.perf_counter()
+        return (end - self.root.start) * 1000
+
+    def to_dict(self):
+        """Serializable form; span start/duration are milliseconds relative to the request start."""
+        origin = self.root.start
+        request_end = self.root.end or time.perf_counter()
+        depths = {None: -1}
+        spans = []
+        for span in list(self.spans): # Parents are always created before their children
+            depth = depths.get(span.parent_id, 0) + 1
+            depths[span.span_id] = depth
+            end = span.end or request_end # Left open (e.g. abandoned by another thread)
+            spans.append({
+                'id': span.span_id,
+                'parent_id': span.parent_id,
+                'depth': depth,
+                'name': span.name,
+                'kind': span.kind,
+                'start_ms': round((span.start - origin) * 1000, 2),
+                'duration_ms': round((end - span.start) * 1000, 2),
+                'unfinished': span.end is None,
+                'error': span.error,
+                'thread': span.thread,
+                'attrs': span.attrs,
+            })
+        return {
+            'trace_id': self.trace_id,
+            'name': self.root.name,
+            'started_at': self.started_at.isoformat() + 'Z',
+            'duration_ms': round(self.duration_ms, 2),
+            'status': self.root.attrs.get('status'),
+            'error': self.root.error,
+            'span_count': len(spans),
+            'dropped_spans': self.dropped_spans,
+            'spans': spans,
+        }
+
+
+@contextmanager
+def span(name, kind, **attrs):
+    """Times the block as a child of the current span. Outside a traced request it does nothing (yields None)."""
+    parent = _current_span.get()
+    child = parent.trace.start_span(name, kind, parent, attrs) if parent is not None else None
+    if child is None:
+        yield None
+        return
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.finish(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.finish()
+
+
+def start_span(name, kind, **attrs):
+    """Starts a child of the current span without making it current (for generators); call finish() on it."""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    return parent.trace.start_span(name, kind, parent, attrs)
+
+
+class Tracer:
+    """Ring buffer of finished traces plus the optional JSONL exporter."""
+
+    def __init__(self):
+        self._recent = deque(maxlen=Config.TRACE_BUFFER_SIZE)
+        self._lock = threading.Lock()
+        self._export_queue = queue.Queue(maxsize=1000)
+        self._writer = None
+        self.exported = 0
+        self.dropped_exports = 0
+        self.started_at = datetime.utcnow()
+
+    def start_trace(self, trace_id, name, **attrs):
+        """Starts a trace and makes its root span current; returns (trace, token) for finish_trace."""
+        trace = Trace(trace_id, name, attrs)
+        return trace, _current_span.set(trace.root)
+
+    def finish_trace(self, trace, token, error=None):
+        try:
+            _current_span.reset(token)
+        except ValueError: # Token from another context (should not happen within one request)
+            _current_span.set(None)
+        trace.root.finish(error)
+        with self._lock:
+            self._recent.append(trace)
+        if Config.TRACE_LOG_FILE and trace.duration_ms >= Config.TRACE_EXPORT_MIN_MS:
+            self._export(trace)
+
+    def _export(self, trace):
+        """Queues the trace for the writer thread (dropped if it has fallen behind)."""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name='trace-exporter', daemon=True)
+                self._writer.start()
+        try:
+            self._export_queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped_exports += 1
+
+    def _write_loop(self):
+        stopping = False
+        while not stopping:
+            batch = [self._export_queue.get()]
+            while True: # Take whatever else is waiting, so the file is opened once per batch
+                try:
+                    batch.append(self._export_queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = None in batch # Sentinel from flush()
+            batch = [trace for trace in batch if trace is not None]
+            if not batch:
+                continue
+            try:
+                with open(Config.TRACE_LOG_FILE, 'a', encoding='utf-8') as f:
+                    for trace in batch:
+                        f.write(json.dumps(trace.to_dict(), default=str) + '\n')
+                self.exported += len(batch)
+            except OSError as e:
+                logger.warning(f"[Tracing] Could not write to {Config.TRACE_LOG_FILE}: {e}")
+
+    def flush(self, timeout=None):
+        """Writes out queued traces and stops the writer (shutdown hook)."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is None:
+            return
+        self._export_queue.put(None)
+        writer.join(timeout)
+
+    def slowest(self, limit=20):
+        with self._lock:
+            traces = list(self._recent)
+        traces.sort(key=lambda t: t.duration_ms, reverse=True)
+        return [t.to_dict() for t in traces[:limit]]
+
+    def get(self, trace_id):
+        with self._lock:
+            for trace in reversed(self._recent):
+                if trace.trace_id == trace_id:
+                    return trace.to_dict()
+        return None
+
+    def summary(self):
+        with self._lock:
+            durations = sorted(t.duration_ms for t in self._recent)
+        return {
+            'traces': len(durations),
+            'capacity': self._recent.maxlen,
+            'p50_ms': round(durations[len(durations) // 2], 1) if durations else 0,
+            'max_ms': round(durations[-1], 1) if durations else 0,
+            'exported': self.exported,
+            'dropped_exports': self.dropped_exports,
+            'since': self.started_at,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self.started_at = datetime.utcnow()
+
+
+# Singleton instance
+tracer = Tracer()
+
+
+def init_tracing(app):
+    """
+    Traces requests (except static files) and template rendering.
+    Register after init_request_ids so traces share the request id.
+    """
+    if not Config.TRACING_ENABLED:
+        return
+
+    @app.before_request
+    def start_request_trace():
+        if request.endpoint == 'static' or random.random() >= Config.TRACE_SAMPLE_RATE:
+            return
+        trace_id = g.get('request_id') or uuid.uuid4().hex[:16]
+        g._trace = tracer.start_trace(trace_id, f"{request.method} {request.path}", endpoint=request.endpoint)
+
+    @app.after_request
+    def record_trace_status(response):
+        entry = g.get('_trace')
+        if entry is not None:
+            entry[0].root.set(status=response.status_code)
+        return response
+
+    @app.teardown_request
+    def finish_request_trace(exception=None):
+        # Teardown runs even when a view raises, so every started trace is finished here
+        entry = g.pop('_trace', None)
+        if entry is not None:
+            tracer.finish_trace(*entry, error=exception)
+
+    def on_before_render(sender, template, context, **extra):
+        render_span = start_span(f"render {template.name}", 'template')
+        token = _current_span.set(render_span) if render_span is not None else None
+        g.setdefault('_trace_renders', []).append((render_span, token))
+
+    def on_rendered(sender, template, context, **extra):
+        renders = g.get('_trace_renders')
+        if renders:
+            render_span, token = renders.pop()
+            if render_span is not None:
+                _current_span.reset(token)
+                render_span.finish()
+
+    # weak=False: the handlers are closures that would otherwise be garbage collected
+    before_render_template.connect(on_before_render, app, weak=False)
+    template_rendered.connect(on_rendered, app, weak=False)